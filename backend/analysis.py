@@ -0,0 +1,336 @@
+# analysis.py
+"""
+    Motor de análisis FIRST/FOLLOW/anulables sobre producciones ya tokenizadas
+    (las de grammar.GrammarIR; las reglas de texto sólo se separan en grammar.py).
+
+    - Los terminales son posiciones de bit dentro de un int de Python.
+    - Anulables: lista de trabajo con contadores por producción (lineal).
+    - FIRST y FOLLOW: se plantean como F(x) = base(x) ∪ ⋃ F(y) y se resuelven
+      con el algoritmo digraph (una pasada por componente fuertemente conexa).
+    - reanalyze: tras editar la gramática sólo se resuelven las ecuaciones de
+      los no terminales afectados; el resto entra como constante.
+"""
+from __future__ import annotations
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Set, Tuple
+
+EPS = "''"   # epsilon
+END = "$"    # fin de entrada
+
+
+def digraph(nodes, rel, init, empty=0):
+    """
+    Algoritmo "digraph" de DeRemer–Pennello: F(x) = init(x) ∪ ⋃{F(y) | x rel y},
+    resolviendo cada componente fuertemente conexa de una vez (versión iterativa).
+    Funciona con bitsets (int) o conjuntos: sólo usa el operador |.
+    """
+    INF = len(nodes) + 1
+    N: Dict = {x: 0 for x in nodes}
+    F: Dict = {x: init.get(x, empty) for x in nodes}
+    stack: List = []
+
+    for root in nodes:
+        if N[root]:
+            continue
+        stack.append(root)
+        N[root] = len(stack)
+        call = [(root, iter(rel.get(root, ())), len(stack))]
+        while call:
+            x, it, d = call[-1]
+            descended = False
+            for y in it:
+                if N[y] == 0:
+                    stack.append(y)
+                    N[y] = len(stack)
+                    call.append((y, iter(rel.get(y, ())), len(stack)))
+                    descended = True
+                    break
+                N[x] = min(N[x], N[y])
+                F[x] = F[x] | F[y]
+            if descended:
+                continue
+            call.pop()
+            if N[x] == d:
+                while True:
+                    top = stack.pop()
+                    N[top] = INF
+                    F[top] = F[x]
+                    if top == x:
+                        break
+            if call:
+                parent = call[-1][0]
+                N[parent] = min(N[parent], N[x])
+                F[parent] = F[parent] | F[x]
+    return F
+
+
+@dataclass
+class GrammarAnalysis:
+    """Resultado del análisis: conjuntos como bitsets sobre `terminals`."""
+    nonterminals: List[str]
+    terminals: List[str]                    # bit i <-> terminals[i]
+    start: str = ""                         # símbolo inicial usado para FOLLOW
+    nullable: Set[str] = field(default_factory=set)
+    first_bits: Dict[str, int] = field(default_factory=dict)
+    follow_bits: Dict[str, int] = field(default_factory=dict)
+    prods: List[Tuple[str, List[str]]] = field(default_factory=list)   # producciones analizadas
+
+    def bits_to_set(self, bits: int) -> Set[str]:
+        out: Set[str] = set()
+        while bits:
+            low = bits & -bits
+            out.add(self.terminals[low.bit_length() - 1])
+            bits ^= low
+        return out
+
+    def first_sets(self) -> Dict[str, Set[str]]:
+        """FIRST por no terminal; incluye EPS si el no terminal es anulable."""
+        out: Dict[str, Set[str]] = {}
+        for A in self.nonterminals:
+            s = self.bits_to_set(self.first_bits.get(A, 0))
+            if A in self.nullable:
+                s.add(EPS)
+            out[A] = s
+        return out
+
+    def follow_sets(self) -> Dict[str, Set[str]]:
+        return {A: self.bits_to_set(self.follow_bits.get(A, 0)) for A in self.nonterminals}
+
+
+def analyze(prods: List[Tuple[str, List[str]]], nonterminals: Iterable[str],
+            start: str = "") -> GrammarAnalysis:
+    """
+    Calcula anulables, FIRST y FOLLOW de las producciones (A, [X1..Xn]).
+    Todo símbolo que no sea no terminal se trata como terminal.
+    """
+    nts: List[str] = list(dict.fromkeys(list(nonterminals) + [A for A, _ in prods]))
+    nt_set = set(nts)
+    terms: List[str] = []
+    bit: Dict[str, int] = {}
+
+    def tbit(t: str) -> int:
+        b = bit.get(t)
+        if b is None:
+            b = bit[t] = 1 << len(terms)
+            terms.append(t)
+        return b
+
+    # --- Anulables: contador de símbolos aún no anulables por producción ---
+    nullable: Set[str] = set()
+    pending: List[int] = []
+    occurs: Dict[str, List[int]] = {}
+    work: List[str] = []
+    for i, (A, rhs) in enumerate(prods):
+        cnt = 0
+        for X in rhs:
+            if X in nt_set:
+                occurs.setdefault(X, []).append(i)
+            cnt += 1
+        pending.append(cnt)
+        if cnt == 0 and A not in nullable:
+            nullable.add(A)
+            work.append(A)
+    while work:
+        X = work.pop()
+        for i in occurs.get(X, ()):
+            pending[i] -= 1
+            A = prods[i][0]
+            if pending[i] == 0 and A not in nullable:
+                nullable.add(A)
+                work.append(A)
+
+    # --- FIRST: FIRST(A) ⊇ FIRST(Xi) mientras X1..Xi-1 sean anulables ---
+    first_base: Dict[str, int] = {A: 0 for A in nts}
+    first_rel: Dict[str, List[str]] = {A: [] for A in nts}
+    for A, rhs in prods:
+        for X in rhs:
+            if X in nt_set:
+                first_rel[A].append(X)
+                if X not in nullable:
+                    break
+            else:
+                first_base[A] |= tbit(X)
+                break
+    first_bits = digraph(nts, first_rel, first_base)
+
+    # --- FOLLOW: FOLLOW(Xi) ⊇ FIRST(Xi+1..Xn); si el sufijo es anulable, ⊇ FOLLOW(A) ---
+    follow_base: Dict[str, int] = {A: 0 for A in nts}
+    follow_rel: Dict[str, List[str]] = {A: [] for A in nts}
+    if start:
+        follow_base[start] = tbit(END)
+    for A, rhs in prods:
+        suffix = 0            # FIRST del sufijo a la derecha de la posición actual
+        suffix_nullable = True
+        for X in reversed(rhs):
+            if X in nt_set:
+                follow_base[X] |= suffix
+                if suffix_nullable:
+                    follow_rel[X].append(A)
+                if X in nullable:
+                    suffix |= first_bits[X]
+                else:
+                    suffix = first_bits[X]
+                    suffix_nullable = False
+            else:
+                suffix = tbit(X)
+                suffix_nullable = False
+    follow_bits = digraph(nts, follow_rel, follow_base)
+
+    return GrammarAnalysis(nonterminals=nts, terminals=terms, start=start, nullable=nullable,
+                           first_bits=first_bits, follow_bits=follow_bits, prods=prods)
+
+
+def reanalyze(prev: GrammarAnalysis, prods: List[Tuple[str, List[str]]],
+              nonterminals: Iterable[str], start: str = "") -> GrammarAnalysis:
+    """
+    Igual que analyze, reutilizando el análisis `prev` de una versión anterior
+    de la gramática:
+    - FIRST/anulables se recalculan sólo para los no terminales que dependen
+      (transitivamente) de alguno cuyas producciones cambiaron.
+    - FOLLOW sólo para los que aparecen en producciones cambiadas o antes de
+      un símbolo cuyo FIRST cambió, y los que heredan su FOLLOW.
+    Los bits de terminales conservan la numeración de prev. Si cambia el
+    símbolo inicial o algún símbolo pasa de terminal a no terminal (o al
+    revés) se hace el análisis completo.
+    """
+    nts: List[str] = list(dict.fromkeys(list(nonterminals) + [A for A, _ in prods]))
+    nt_set = set(nts)
+    if start != prev.start or not set(prev.nonterminals) <= nt_set or nt_set & set(prev.terminals):
+        return analyze(prods, nts, start)
+
+    old = Counter((A, tuple(rhs)) for A, rhs in prev.prods)
+    new = Counter((A, tuple(rhs)) for A, rhs in prods)
+    edited = (old - new) + (new - old)
+    changed = {A for A, _ in edited}
+
+    # --- No terminales cuyo FIRST/anulabilidad puede cambiar ---
+    users: Dict[str, Set[str]] = {}
+    for A, rhs in prods:
+        for X in rhs:
+            if X in nt_set:
+                users.setdefault(X, set()).add(A)
+    affected = set(changed)
+    work = list(changed)
+    while work:
+        for A in users.get(work.pop(), ()):
+            if A not in affected:
+                affected.add(A)
+                work.append(A)
+
+    terms: List[str] = list(prev.terminals)
+    bit: Dict[str, int] = {t: 1 << i for i, t in enumerate(terms)}
+
+    def tbit(t: str) -> int:
+        b = bit.get(t)
+        if b is None:
+            b = bit[t] = 1 << len(terms)
+            terms.append(t)
+        return b
+
+    # --- Anulables: los no afectados conservan su valor ---
+    nullable: Set[str] = {A for A in prev.nullable if A not in affected}
+    pending: List[int] = [0] * len(prods)
+    occurs: Dict[str, List[int]] = {}
+    work = []
+    for i, (A, rhs) in enumerate(prods):
+        if A not in affected:
+            continue
+        cnt = 0
+        for X in rhs:
+            if X in affected:
+                occurs.setdefault(X, []).append(i)
+                cnt += 1
+            elif X not in nullable:
+                cnt += 1
+        pending[i] = cnt
+        if cnt == 0 and A not in nullable:
+            nullable.add(A)
+            work.append(A)
+    while work:
+        X = work.pop()
+        for i in occurs.get(X, ()):
+            pending[i] -= 1
+            A = prods[i][0]
+            if pending[i] == 0 and A not in nullable:
+                nullable.add(A)
+                work.append(A)
+
+    # --- FIRST de los afectados; FIRST de los demás entra como constante ---
+    aff_nts = [A for A in nts if A in affected]
+    first_base: Dict[str, int] = {A: 0 for A in aff_nts}
+    first_rel: Dict[str, List[str]] = {A: [] for A in aff_nts}
+    for A, rhs in prods:
+        if A not in affected:
+            continue
+        for X in rhs:
+            if X in affected:
+                first_rel[A].append(X)
+            elif X in nt_set:
+                first_base[A] |= prev.first_bits.get(X, 0)
+            else:
+                first_base[A] |= tbit(X)
+                break
+            if X not in nullable:
+                break
+    first_bits = {A: prev.first_bits.get(A, 0) for A in nts if A not in affected}
+    first_bits.update(digraph(aff_nts, first_rel, first_base))
+
+    first_changed = {A for A in aff_nts
+                     if first_bits[A] != prev.first_bits.get(A, 0)
+                     or (A in nullable) != (A in prev.nullable)}
+
+    # --- No terminales cuyo FOLLOW puede cambiar ---
+    follow_aff: Set[str] = {X for _, rhs in edited for X in rhs if X in nt_set}
+    inherits: Dict[str, List[str]] = {}     # A -> X si FOLLOW(X) ⊇ FOLLOW(A)
+    for A, rhs in prods:
+        suffix_nullable = True
+        suffix_changed = False
+        for X in reversed(rhs):
+            if X in nt_set:
+                if suffix_changed:
+                    follow_aff.add(X)
+                if suffix_nullable:
+                    inherits.setdefault(A, []).append(X)
+                suffix_changed = suffix_changed or X in first_changed
+                suffix_nullable = suffix_nullable and X in nullable
+            else:
+                suffix_nullable = False
+    work = list(follow_aff)
+    while work:
+        for X in inherits.get(work.pop(), ()):
+            if X not in follow_aff:
+                follow_aff.add(X)
+                work.append(X)
+
+    # --- FOLLOW de los afectados (misma recurrencia que analyze) ---
+    faff_nts = [A for A in nts if A in follow_aff]
+    follow_base: Dict[str, int] = {A: 0 for A in faff_nts}
+    follow_rel: Dict[str, List[str]] = {A: [] for A in faff_nts}
+    if start in follow_aff:
+        follow_base[start] = tbit(END)
+    for A, rhs in prods:
+        suffix = 0
+        suffix_nullable = True
+        for X in reversed(rhs):
+            if X in nt_set:
+                if X in follow_aff:
+                    follow_base[X] |= suffix
+                    if suffix_nullable:
+                        if A in follow_aff:
+                            follow_rel[X].append(A)
+                        else:
+                            follow_base[X] |= prev.follow_bits.get(A, 0)
+                if X in nullable:
+                    suffix |= first_bits[X]
+                else:
+                    suffix = first_bits[X]
+                    suffix_nullable = False
+            else:
+                suffix = tbit(X)
+                suffix_nullable = False
+    follow_bits = {A: prev.follow_bits.get(A, 0) for A in nts if A not in follow_aff}
+    follow_bits.update(digraph(faff_nts, follow_rel, follow_base))
+
+    return GrammarAnalysis(nonterminals=nts, terminals=terms, start=start, nullable=nullable,
+                           first_bits=first_bits, follow_bits=follow_bits, prods=prods)
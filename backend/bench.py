@@ -0,0 +1,431 @@
+# bench.py
+"""
+    Benchmarks de construcción y parseo sobre gramáticas sintéticas.
+
+    Familias de gramáticas (parametrizadas por tamaño):
+        expr      expresiones con N niveles de precedencia
+        stmt      lenguaje de sentencias con N palabras clave
+        nullable  cadenas profundas de no terminales anulables
+        lr1only   N copias del caso clásico LR(1) que no es LALR(1)
+        exprll    el lenguaje de expr sin recursión izquierda (LL(1))
+
+    Por caso se cronometran por separado First, build_nfa (sólo casos
+    pequeños), build_dfa, build_tables y LR1Parser.parse, y se registran
+    estados, ítems y el pico de memoria de la construcción. Si la gramática
+    es LL(1) también se cronometra LL1Parser.parse con la misma entrada.
+
+    Uso:
+        python bench.py                      # corre y muestra la tabla
+        python bench.py --quick              # sólo los tamaños pequeños
+        python bench.py --save --repeat 10   # guarda la línea base
+        python bench.py --compare            # compara con la línea base;
+                                             # sale con 1 si algo empeoró
+    La línea base (bench_baseline.json) guarda los tiempos en unidades de
+    un trabajo de calibración en Python puro que se mide en cada corrida
+    con --save o --compare, así que sirve en otra máquina. Ambos piden
+    --repeat >= MIN_REPEAT (con una sola corrida el ruido parece
+    regresión), y --compare vuelve a medir lo que parezca haber empeorado
+    antes de darlo por regresión. La guardada se midió con --repeat 10.
+    Si cambia el intérprete conviene regenerarla.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, replace
+from typing import Callable, Dict, List, Optional, Tuple
+from grammar import Grammar
+from first_ import First
+from follow import Follow
+from table import Table
+from lr1 import LR1Builder, LR1Parser
+from parser import LL1Parser
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+TIME_FIELDS = ("first_s", "nfa_s", "dfa_s", "tables_s", "build_s", "parse_s", "ll1_parse_s")
+MIN_DELTA_S = 0.002   # diferencias menores son ruido del reloj, no regresiones
+MIN_REPEAT = 3
+RECHECKS = 2          # veces que se vuelve a medir un caso que parece haber empeorado
+# La unidad de los tiempos de la línea base es lo que tarda _calibration_work,
+# trabajo fijo en Python puro ajeno al código medido: así la línea base sirve
+# en otra máquina y una regresión que frena todos los casos por igual no se
+# cancela con la unidad.
+CALIBRATION_REPEAT = 10
+
+
+# ---------------------------------------------------------------
+# Generadores de gramáticas y entradas
+# ---------------------------------------------------------------
+def expr_grammar(levels: int) -> str:
+    """E0 -> E0 op0 E1 | E1, ..., P -> ( E0 ) | id | num."""
+    lines = []
+    for i in range(levels):
+        nxt = f"E{i + 1}" if i + 1 < levels else "P"
+        lines.append(f"E{i} -> E{i} op{i} {nxt} | {nxt}")
+    lines.append("P -> ( E0 ) | id | num")
+    return "\n".join(lines)
+
+def expr_input(levels: int, n_tokens: int, rng: random.Random) -> List[str]:
+    def operand() -> List[str]:
+        if rng.random() < 0.1:
+            return ["(", rng.choice(("id", "num")), f"op{rng.randrange(levels)}", rng.choice(("id", "num")), ")"]
+        return [rng.choice(("id", "num"))]
+    toks = operand()
+    while len(toks) < n_tokens:
+        toks.append(f"op{rng.randrange(levels)}")
+        toks += operand()
+    return toks
+
+def exprll_grammar(levels: int) -> str:
+    """E0 -> E1 R0, R0 -> op0 E1 R0 | ε, ..., P -> ( E0 ) | id | num (mismo lenguaje que expr)."""
+    lines = []
+    for i in range(levels):
+        nxt = f"E{i + 1}" if i + 1 < levels else "P"
+        lines.append(f"E{i} -> {nxt} R{i}")
+        lines.append(f"R{i} -> op{i} {nxt} R{i} | ''")
+    lines.append("P -> ( E0 ) | id | num")
+    return "\n".join(lines)
+
+def stmt_grammar(keywords: int) -> str:
+    """Programa de sentencias: asignaciones y N construcciones kw_i ( Expr ) { Stmts } | kw_i Expr ;"""
+    lines = ["Prog -> Stmts", "Stmts -> Stmts Stmt | Stmt", "Stmt -> id = E0 ;"]
+    for i in range(keywords):
+        lines.append(f"Stmt -> kw{i} ( E0 ) {{ Stmts }} | kw{i} E0 ;")
+    lines.append(expr_grammar(4))
+    return "\n".join(lines)
+
+def stmt_input(keywords: int, n_tokens: int, rng: random.Random) -> List[str]:
+    toks: List[str] = []
+    open_blocks = 0
+    while len(toks) < n_tokens or open_blocks:
+        r = rng.random()
+        if open_blocks and (r < 0.2 or len(toks) >= n_tokens):
+            toks += ["id", "=", "num", ";", "}"]
+            open_blocks -= 1
+        elif r < 0.5:
+            toks += ["id", "="] + expr_input(4, 5, rng) + [";"]
+        elif r < 0.75 and open_blocks < 20:
+            toks += [f"kw{rng.randrange(keywords)}", "("] + expr_input(4, 3, rng) + [")", "{"]
+            open_blocks += 1
+        else:
+            toks += [f"kw{rng.randrange(keywords)}"] + expr_input(4, 3, rng) + [";"]
+    return toks
+
+def nullable_grammar(depth: int) -> str:
+    """Líneas L -> L N0 ; con N_i -> a_i N_{i+1} | N_{i+1} y N_depth -> ε."""
+    lines = ["S -> L", "L -> L N0 ; | N0 ;"]
+    for i in range(depth):
+        lines.append(f"N{i} -> a{i} N{i + 1} | N{i + 1}")
+    lines.append(f"N{depth} -> ''")
+    return "\n".join(lines)
+
+def nullable_input(depth: int, n_tokens: int, rng: random.Random) -> List[str]:
+    toks: List[str] = []
+    while len(toks) < n_tokens:
+        toks += [f"a{i}" for i in range(depth) if rng.random() < 0.3] + [";"]
+    return toks
+
+def lr1only_grammar(copies: int) -> str:
+    """S -> a A d | b B d | a B e | b A e; A -> c; B -> c, repetido: LALR fusiona los estados de c."""
+    lines = ["P -> P S | S"]
+    for i in range(copies):
+        lines.append(f"S -> a{i} A{i} d | b{i} B{i} d | a{i} B{i} e | b{i} A{i} e")
+        lines.append(f"A{i} -> c")
+        lines.append(f"B{i} -> c")
+    return "\n".join(lines)
+
+def lr1only_input(copies: int, n_tokens: int, rng: random.Random) -> List[str]:
+    toks: List[str] = []
+    while len(toks) < n_tokens:
+        i = rng.randrange(copies)
+        toks += [rng.choice((f"a{i}", f"b{i}")), "c", rng.choice(("d", "e"))]
+    return toks
+
+FAMILIES: Dict[str, Tuple[Callable[[int], str], Callable[[int, int, random.Random], List[str]]]] = {
+    "expr": (expr_grammar, expr_input),
+    "stmt": (stmt_grammar, stmt_input),
+    "nullable": (nullable_grammar, nullable_input),
+    "lr1only": (lr1only_grammar, lr1only_input),
+    "exprll": (exprll_grammar, expr_input),
+}
+
+# (familia, tamaño, modo, tokens de entrada, construir también el AFN)
+CASES_QUICK = [
+    ("expr", 4, "lr1", 20000, True),
+    ("stmt", 5, "lr1", 20000, False),
+    ("nullable", 10, "lr1", 20000, True),
+    ("lr1only", 4, "lr1", 20000, True),
+    ("lr1only", 4, "lalr", 20000, False),    # conflictos al fusionar: recurre a LR(1)
+    ("lr1only", 4, "pager", 20000, False),
+    ("exprll", 4, "lr1", 20000, False),
+]
+CASES_FULL = CASES_QUICK + [
+    ("expr", 12, "lr1", 200000, False),
+    ("expr", 12, "lalr", 200000, False),
+    ("stmt", 40, "lr1", 200000, False),
+    ("stmt", 40, "pager", 200000, False),
+    ("nullable", 40, "lr1", 200000, False),
+    ("lr1only", 30, "lr1", 200000, False),
+    ("lr1only", 30, "pager", 200000, False),
+    ("exprll", 12, "lr1", 200000, False),
+]
+
+
+# ---------------------------------------------------------------
+# Medición
+# ---------------------------------------------------------------
+@dataclass
+class BenchResult:
+    case: str
+    productions: int
+    states: int
+    items: int
+    tokens: int
+    first_s: float
+    dfa_s: float
+    tables_s: float
+    build_s: float                    # LR1Builder completo (incluye dfa y tablas)
+    parse_s: float
+    nfa_s: Optional[float] = None
+    nfa_states: Optional[int] = None
+    peak_kb: Optional[int] = None
+    ll1_parse_s: Optional[float] = None   # LL1Parser.parse (sólo gramáticas LL(1))
+
+    @property
+    def tokens_per_s(self) -> float:
+        return self.tokens / self.parse_s if self.parse_s > 0 else 0.0
+
+
+def _best(fn: Callable[[], object], repeat: int) -> Tuple[float, object]:
+    """Mejor tiempo de `repeat` corridas (y el resultado de la última)."""
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def run_case(family: str, size: int, mode: str, n_tokens: int, with_nfa: bool,
+             repeat: int = 3, memory: bool = True, seed: int = 0) -> BenchResult:
+    make_grammar, make_input = FAMILIES[family]
+    text = make_grammar(size)
+    tokens = make_input(size, n_tokens, random.Random(seed))
+    g = Grammar()
+    g.loadFromString(text)
+
+    def first() -> First:
+        f = First(g)
+        f.compute()
+        return f
+
+    first_s, f = _best(first, repeat)
+    build = lambda: LR1Builder(g, f.firstSets, mode=mode)
+    build_s, b = _best(build, repeat)
+    if b.mode == "lr1":
+        dfa_s, _ = _best(b.build_dfa, repeat)
+    elif b.mode == "lalr":
+        dfa_s, _ = _best(b.build_lalr_dfa, repeat)
+    else:
+        dfa_s, _ = _best(b.build_pager_dfa, repeat)
+    tables_s, _ = _best(lambda: b.build_tables([]), repeat)
+    nfa_s = nfa_states = None
+    if with_nfa:
+        nfa_s, nfa = _best(b.build_nfa, 1)
+        nfa_states = len(nfa.Q)
+    peak_kb = None
+    if memory:
+        tracemalloc.start()
+        LR1Builder(g, f.firstSets, mode=mode)
+        peak_kb = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+
+    parser = LR1Parser(b)
+    parse_s, ok = _best(lambda: parser.parse(tokens), repeat)
+    if not ok:
+        raise RuntimeError(f"{family}-{size}: la entrada generada no se acepta")
+
+    ll1_parse_s = None
+    follow = Follow(g, f)
+    follow.compute()
+    table = Table(g, f, follow)
+    if not table.conflicts:
+        ll1 = LL1Parser(table, table.getNonTerminalId(g.initialState))
+        ll1_parse_s, ok = _best(lambda: ll1.parse(tokens), repeat)
+        if not ok:
+            raise RuntimeError(f"{family}-{size}: LL1Parser no acepta la entrada generada")
+
+    ACTION, GOTO, states = b.tables
+    return BenchResult(
+        case=f"{family}-{size}/{mode}" + ("" if b.mode == mode else f"->{b.mode}"),
+        productions=len(b.prod_order), states=len(states), items=sum(len(I) for I in states),
+        tokens=len(tokens), first_s=first_s, dfa_s=dfa_s, tables_s=tables_s, build_s=build_s,
+        parse_s=parse_s, nfa_s=nfa_s, nfa_states=nfa_states, peak_kb=peak_kb, ll1_parse_s=ll1_parse_s)
+
+
+def run_all(cases, repeat: int, memory: bool) -> List[BenchResult]:
+    out = []
+    for family, size, mode, n_tokens, with_nfa in cases:
+        r = run_case(family, size, mode, n_tokens, with_nfa, repeat=repeat, memory=memory)
+        print(_row(r), flush=True)
+        out.append(r)
+    return out
+
+
+# ---------------------------------------------------------------
+# Reporte y línea base
+# ---------------------------------------------------------------
+_HEADER = (f"{'caso':<24}{'prods':>6}{'estados':>9}{'ítems':>10}{'first':>9}{'nfa':>9}"
+           f"{'dfa':>9}{'tablas':>9}{'build':>9}{'parse':>9}{'tok/s':>10}{'ll1':>9}{'pico KB':>10}")
+
+def _ms(x: Optional[float]) -> str:
+    return "-" if x is None else f"{x * 1000:.1f}"
+
+def _row(r: BenchResult) -> str:
+    return (f"{r.case:<24}{r.productions:>6}{r.states:>9}{r.items:>10}{_ms(r.first_s):>9}{_ms(r.nfa_s):>9}"
+            f"{_ms(r.dfa_s):>9}{_ms(r.tables_s):>9}{_ms(r.build_s):>9}{_ms(r.parse_s):>9}"
+            f"{r.tokens_per_s:>10.0f}{_ms(r.ll1_parse_s):>9}{r.peak_kb if r.peak_kb is not None else '-':>10}")
+
+def _calibration_work() -> int:
+    # dicts, listas y enteros, como los bucles de construcción y parseo
+    d: Dict[int, int] = {}
+    stack: List[int] = []
+    acc = 0
+    for i in range(200000):
+        k = (i * 7919) & 1023
+        d[k] = d.get(k, 0) + i
+        stack.append(k)
+        if len(stack) > 64:
+            acc ^= stack.pop() + stack.pop()
+    return acc + len(d)
+
+def calibrate() -> float:
+    """Segundos de _calibration_work en esta máquina (la mejor de CALIBRATION_REPEAT)."""
+    return _best(_calibration_work, CALIBRATION_REPEAT)[0]
+
+def _relative(r: BenchResult, unit: float) -> Dict[str, object]:
+    out = asdict(r)
+    for f in TIME_FIELDS:
+        if out[f] is not None:
+            out[f] /= unit
+    return out
+
+def save_baseline(results: List[BenchResult], unit: float, path: str = BASELINE) -> None:
+    data = {"python": sys.version.split()[0],
+            # segundos de la calibración en la máquina que la guardó (informativo)
+            "calibration_s": unit,
+            "results": {r.case: _relative(r, unit) for r in results}}
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=1, sort_keys=True)
+        fh.write("\n")
+
+def load_baseline(path: str = BASELINE) -> Dict[str, Dict]:
+    """Resultados de la línea base (tiempos en unidades de calibración); ValueError si es del formato viejo."""
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    if "calibration_s" not in data:
+        raise ValueError(f"{path}: tiempos absolutos de otra versión de bench.py; regenerarla con --save")
+    if data.get("python") != sys.version.split()[0]:
+        print(f"\n(línea base de Python {data.get('python')}; ahora {sys.version.split()[0]})")
+    return data["results"]
+
+def compare(results: List[BenchResult], unit: float, base: Dict[str, Dict],
+            tolerance: float = 0.25) -> Dict[str, List[str]]:
+    """
+    Diferencias respecto de la línea base, por caso: tiempos más de
+    `tolerance` por encima de lo esperado (p. ej. 0.25 = 25 % más lentos, y
+    al menos MIN_DELTA_S) y cambios en estados/ítems. Lo esperado es el
+    tiempo guardado por `unit`, la calibración medida ahora.
+    """
+    problems: Dict[str, List[str]] = {}
+    print(f"\n{'caso':<24}" + "".join(f"{f[:-2]:>10}" for f in TIME_FIELDS) + f"{'pico':>10}")
+    for r in results:
+        old = base.get(r.case)
+        if old is None:
+            print(f"{r.case:<24}  (sin línea base)")
+            continue
+        cells, found = [], []
+        for f in TIME_FIELDS + ("peak_kb",):
+            now, before = getattr(r, f), old.get(f)
+            if now is None or not before:
+                cells.append(f"{'-':>10}")
+                continue
+            if f in TIME_FIELDS:
+                before *= unit
+            ratio = now / before
+            cells.append(f"{ratio:>9.2f}x")
+            slower = f.endswith("_s") and now - before > MIN_DELTA_S
+            if ratio > 1 + tolerance and (slower or f == "peak_kb"):
+                found.append(f"{r.case}: {f} {before:.4g} -> {now:.4g} ({ratio:.2f}x)")
+        print(f"{r.case:<24}" + "".join(cells))
+        for f in ("states", "items"):
+            if getattr(r, f) != old[f]:
+                found.append(f"{r.case}: {f} {old[f]} -> {getattr(r, f)}")
+        if found:
+            problems[r.case] = found
+    return problems
+
+def _merge_best(a: BenchResult, b: BenchResult) -> BenchResult:
+    """a con el mejor tiempo (y pico) de cada campo entre a y b."""
+    best = {f: min((x for x in (getattr(a, f), getattr(b, f)) if x is not None), default=None)
+            for f in TIME_FIELDS + ("peak_kb",)}
+    return replace(a, **best)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmarks de construcción y parseo LR(1) (y LL(1))")
+    ap.add_argument("--quick", action="store_true", help="sólo los casos pequeños")
+    ap.add_argument("--repeat", type=int, default=3, help="corridas por medición (se toma la mejor)")
+    ap.add_argument("--no-memory", action="store_true", help="no medir el pico de memoria")
+    ap.add_argument("--save", action="store_true", help="guardar los resultados como línea base")
+    ap.add_argument("--compare", action="store_true", help="comparar con la línea base")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="empeoramiento admitido (0.25 = 25%%)")
+    ap.add_argument("--baseline", default=BASELINE, help="archivo de la línea base")
+    args = ap.parse_args(argv)
+    if (args.save or args.compare) and args.repeat < MIN_REPEAT:
+        ap.error(f"--save y --compare necesitan --repeat >= {MIN_REPEAT}")
+
+    cases = CASES_QUICK if args.quick else CASES_FULL
+    print(_HEADER)
+    results = run_all(cases, args.repeat, not args.no_memory)
+    unit = 0.0
+    if args.save or args.compare:
+        unit = calibrate()
+        print(f"\ncalibración: {_ms(unit)} ms")
+    if args.save:
+        save_baseline(results, unit, args.baseline)
+        print(f"\nLínea base guardada en {args.baseline}")
+    if args.compare:
+        try:
+            base = load_baseline(args.baseline)
+        except ValueError as e:
+            print(f"\n{e}")
+            return 2
+        problems = compare(results, unit, base, args.tolerance)
+        # la velocidad de la máquina va por rachas: lo que pareció empeorar
+        # se vuelve a medir (y la calibración) y se queda el mejor tiempo visto
+        for _ in range(RECHECKS):
+            if not problems:
+                break
+            print(f"\nSe vuelven a medir: {', '.join(problems)}")
+            unit = min(unit, calibrate())
+            for k, (case, r) in enumerate(zip(cases, results)):
+                if r.case in problems:
+                    results[k] = _merge_best(r, run_case(*case, repeat=args.repeat, memory=False))
+            problems = compare([r for r in results if r.case in problems], unit, base, args.tolerance)
+        if problems:
+            print("\nRegresiones:")
+            for found in problems.values():
+                for p in found:
+                    print(f"  {p}")
+            return 1
+        print("\nSin regresiones")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
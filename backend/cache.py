@@ -0,0 +1,131 @@
+# cache.py
+from __future__ import annotations
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+def normalize_grammar(text: str) -> str:
+    """
+    Forma canónica del texto de una gramática, usada como clave de caché:
+    - descarta líneas vacías y comentarios (#), igual que Grammar.loadFromString
+    - colapsa espacios repetidos dentro de cada regla
+    Dos textos con la misma forma normalizada producen el mismo autómata.
+    """
+    lines = []
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        lines.append(" ".join(line.split()))
+    return "\n".join(lines)
+
+
+def grammar_key(text: str, *extra: str) -> str:
+    """Hash SHA-256 del texto normalizado (más parámetros extra, p. ej. el modo)."""
+    h = hashlib.sha256(normalize_grammar(text).encode("utf-8"))
+    for e in extra:
+        h.update(b"\0")
+        h.update(e.encode("utf-8"))
+    return h.hexdigest()
+
+
+class AutomatonCache:
+    """
+    Caché LRU de autómatas ya construidos, compartida por todo el proceso.
+
+    - La clave es el hash del texto normalizado de la gramática.
+    - Se acota por número de entradas (maxsize) y, opcionalmente, por un
+      peso total (max_weight), p. ej. la cantidad de ítems LR(1) guardados.
+    - Es segura entre hilos: FastAPI ejecuta los handlers síncronos en un pool.
+    """
+
+    def __init__(self, maxsize: int = 32, max_weight: Optional[int] = None,
+                 weigh: Optional[Callable[[Any], int]] = None) -> None:
+        self.maxsize = maxsize
+        self.max_weight = max_weight
+        self._weigh = weigh or (lambda _v: 1)
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._weights: Dict[str, int] = {}
+        self._total_weight = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any) -> Any:
+        weight = self._weigh(value)
+        with self._lock:
+            # Otro hilo pudo construir la misma gramática mientras tanto
+            if key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+            self._data[key] = value
+            self._weights[key] = weight
+            self._total_weight += weight
+            self._evict()
+            return value
+
+    def get_or_build(self, key: str, factory: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is not None:
+            return value
+        # Se construye fuera del lock para no serializar gramáticas distintas
+        return self.put(key, factory())
+
+    def invalidate(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._remove(key)
+            return True
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        """Elimina todas las entradas cuya clave empieza por `prefix`; retorna cuántas."""
+        with self._lock:
+            keys = [k for k in self._data if k.startswith(prefix)]
+            for k in keys:
+                self._remove(k)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._weights.clear()
+            self._total_weight = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "weight": self._total_weight,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, key: str) -> None:
+        del self._data[key]
+        self._total_weight -= self._weights.pop(key)
+
+    def _evict(self) -> None:
+        # La entrada recién insertada (la última) nunca se expulsa a sí misma
+        while len(self._data) > 1 and (
+            len(self._data) > self.maxsize
+            or (self.max_weight is not None and self._total_weight > self.max_weight)
+        ):
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
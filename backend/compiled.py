@@ -0,0 +1,447 @@
+# compiled.py
+"""
+    Tablas LR(1) compiladas a enteros y su formato binario en disco.
+
+    Símbolos: ids 0..nT-1 son terminales, nT..nT+nN-1 no terminales.
+    Producciones: la 0 es siempre la aumentada S' -> S.
+
+    Codificación de ACTION (int32):
+        0                    -> error
+        (j << 2) | SHIFT     -> shift al estado j
+        (p << 2) | REDUCE    -> reduce por la producción p
+        ACCEPT               -> accept
+    GOTO (int32): estado destino, o -1 si no hay transición.
+"""
+from __future__ import annotations
+import mmap
+import struct
+import sys
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+MAGIC = b"LR1T"
+VERSION = 1
+
+ACT_ERROR = 0
+ACT_SHIFT = 1
+ACT_REDUCE = 2
+ACT_ACCEPT = 3
+
+# magic, version, nT, nN, n_states, n_prods, n_rhs, start_prod,
+# offsets (prod_lhs, prod_off, prod_rhs, action, goto, names), names_len
+_HEADER = struct.Struct("<4s7I6QQ")
+_ALIGN = 8
+
+assert array("i").itemsize == 4
+
+
+def encode_shift(j: int) -> int:
+    return (j << 2) | ACT_SHIFT
+
+def encode_reduce(p: int) -> int:
+    return (p << 2) | ACT_REDUCE
+
+
+class _SymbolTables:
+    """
+    Parte común de las tablas densas y comprimidas: símbolos y producciones.
+    Las subclases son dataclasses con symbols, n_terminals, prod_lhs,
+    prod_off, prod_rhs e _index.
+    """
+
+    def __post_init__(self) -> None:
+        if not self._index:
+            self._index = {s: i for i, s in enumerate(self.symbols)}
+        # Arreglos derivados para el driver: |RHS| y columna GOTO del LHS
+        off = self.prod_off
+        self.prod_len = array("i", (off[p + 1] - off[p] for p in range(len(self.prod_lhs))))
+        self.prod_goto_col = array("i", (x - self.n_terminals for x in self.prod_lhs))
+
+    @property
+    def n_nonterminals(self) -> int:
+        return len(self.symbols) - self.n_terminals
+
+    @property
+    def n_prods(self) -> int:
+        return len(self.prod_lhs)
+
+    def symbol_id(self, name: str) -> int:
+        return self._index.get(name, -1)
+
+    def symbol_ids(self, tokens: Sequence[str]) -> List[int]:
+        """Interna tokens a ids de terminal; -1 si el token no es un terminal."""
+        index, nT = self._index, self.n_terminals
+        out = []
+        for tok in tokens:
+            i = index.get(tok, -1)
+            out.append(i if i < nT else -1)
+        return out
+
+    def production(self, p: int) -> Tuple[str, List[str]]:
+        rhs = self.prod_rhs[self.prod_off[p]:self.prod_off[p + 1]]
+        return self.symbols[self.prod_lhs[p]], [self.symbols[x] for x in rhs]
+
+    def action_at(self, state: int, terminal: str) -> int:
+        t = self._index.get(terminal, -1)
+        if t < 0 or t >= self.n_terminals:
+            return ACT_ERROR
+        return self.action_code(state, t)
+
+    def goto_at(self, state: int, nonterminal: str) -> int:
+        n = self._index.get(nonterminal, -1) - self.n_terminals
+        if n < 0:
+            return -1
+        return self.goto_state(state, n)
+
+
+@dataclass
+class CompiledTables(_SymbolTables):
+    symbols: List[str]             # id -> nombre (terminales primero)
+    n_terminals: int
+    n_states: int
+    prod_lhs: Sequence[int]        # id de producción -> id de símbolo del LHS
+    prod_off: Sequence[int]        # RHS de p = prod_rhs[prod_off[p]:prod_off[p+1]]
+    prod_rhs: Sequence[int]
+    action: Sequence[int]          # n_states * n_terminals
+    goto: Sequence[int]            # n_states * n_nonterminals
+    _mm: Optional[mmap.mmap] = field(default=None, repr=False)
+    _index: Dict[str, int] = field(default_factory=dict, repr=False)
+    path: Optional[str] = field(default=None, repr=False)   # archivo del que se cargó o en el que se guardó
+
+    def action_code(self, state: int, t: int) -> int:
+        """ACTION[state, t] con t id de terminal."""
+        return self.action[state * self.n_terminals + t]
+
+    def goto_state(self, state: int, n: int) -> int:
+        """GOTO[state, n] con n índice de no terminal (id - n_terminals); -1 si no hay."""
+        return self.goto[state * self.n_nonterminals + n]
+
+    def nbytes(self) -> int:
+        """Memoria de ACTION y GOTO."""
+        return 4 * (len(self.action) + len(self.goto))
+
+    def pack(self, keep_errors: Iterable[int] = ()) -> "PackedTables":
+        """Versión comprimida de ACTION/GOTO (ver PackedTables)."""
+        return pack_tables(self, keep_errors)
+
+    # ---------------------------------------------------------------
+    # Construcción desde el LR1Builder
+    # ---------------------------------------------------------------
+    @classmethod
+    def from_builder(cls, builder) -> "CompiledTables":
+        ACTION, GOTO, states = builder.tables
+        terms = sorted(builder.T)
+        nonterms = [builder.S_] + sorted(n for n in builder.N if n != builder.S_)
+        symbols = terms + nonterms
+        index = {s: i for i, s in enumerate(symbols)}
+        nT, nN, n_states = len(terms), len(nonterms), len(states)
+
+        # Tabla de producciones en el orden de la gramática (0 = S' -> S); coincide
+        # con los ids de builder.productions salvo tras una reconstrucción
+        # incremental, que deja huecos y añade las nuevas al final
+        renum = {pid: p for p, pid in enumerate(builder.prod_order)}
+        prod_lhs = array("i")
+        prod_off = array("i", [0])
+        prod_rhs = array("i")
+        for pid in builder.prod_order:
+            prod = builder.productions[pid]
+            prod_lhs.append(index[prod.left])
+            prod_rhs.extend(index[x] for x in prod.rhs)
+            prod_off.append(len(prod_rhs))
+
+        action = array("i", bytes(4 * n_states * nT))
+        for (i, a), (kind, data) in ACTION.items():
+            if kind == "shift":
+                code = encode_shift(int(data))
+            elif kind == "reduce":
+                code = encode_reduce(renum[data.id])
+            else:
+                code = ACT_ACCEPT
+            action[i * nT + index[a]] = code
+
+        goto = array("i", [-1]) * (n_states * nN)
+        for (i, A), j in GOTO.items():
+            goto[i * nN + index[A] - nT] = j
+
+        return cls(symbols=symbols, n_terminals=nT, n_states=n_states,
+                   prod_lhs=prod_lhs, prod_off=prod_off, prod_rhs=prod_rhs,
+                   action=action, goto=goto, _index=index)
+
+    # ---------------------------------------------------------------
+    # Formato binario
+    # ---------------------------------------------------------------
+    def save(self, path: str) -> None:
+        """Escribe las tablas en `path` y lo recuerda como su archivo (self.path)."""
+        self.write(path)
+        self.path = path
+
+    def write(self, path: str) -> None:
+        """Escribe las tablas en `path` sin asociarlas al archivo (p. ej. un temporal)."""
+        names = "\0".join(self.symbols).encode("utf-8")
+        sections = [self.prod_lhs, self.prod_off, self.prod_rhs, self.action, self.goto]
+
+        offsets: List[int] = []
+        pos = _pad(_HEADER.size)
+        for sec in sections:
+            offsets.append(pos)
+            pos = _pad(pos + 4 * len(sec))
+        offsets.append(pos)  # names
+
+        header = _HEADER.pack(MAGIC, VERSION, self.n_terminals, self.n_nonterminals,
+                              self.n_states, self.n_prods, len(self.prod_rhs), 0,
+                              *offsets, len(names))
+        with open(path, "wb") as f:
+            f.write(header)
+            for off, sec in zip(offsets, sections):
+                f.write(bytes(off - f.tell()))
+                f.write(_le_bytes(sec))
+            f.write(bytes(offsets[-1] - f.tell()))
+            f.write(names)
+
+    def matches_file(self, path: str) -> bool:
+        """
+        path existe y su cabecera describe estas tablas (dimensiones y
+        símbolos); sirve para no reutilizar un archivo borrado o sobrescrito.
+        """
+        try:
+            with open(path, "rb") as f:
+                head = f.read(_HEADER.size)
+                if len(head) < _HEADER.size:
+                    return False
+                (magic, version, nT, nN, n_states, n_prods, n_rhs, _start,
+                 *offsets, names_len) = _HEADER.unpack(head)
+                f.seek(offsets[-1])
+                names = f.read(names_len)
+        except OSError:
+            return False
+        return (magic == MAGIC and version == VERSION
+                and (nT, nN, n_states, n_prods, n_rhs)
+                == (self.n_terminals, self.n_nonterminals, self.n_states, self.n_prods, len(self.prod_rhs))
+                and names == "\0".join(self.symbols).encode("utf-8"))
+
+    def close(self) -> None:
+        """Libera el mmap (si las tablas se cargaron con load_tables)."""
+        if self._mm is None:
+            return
+        for name in ("prod_lhs", "prod_off", "prod_rhs", "action", "goto"):
+            view = getattr(self, name)
+            if isinstance(view, memoryview):
+                view.release()
+        self._mm.close()
+        self._mm = None
+
+
+@dataclass
+class PackedTables(_SymbolTables):
+    """
+    ACTION/GOTO comprimidas; la búsqueda sigue siendo O(1):
+
+    ACTION: cada estado tiene una reducción por defecto (la más frecuente
+    de su fila, que reemplaza también a las celdas de error) y sólo guarda
+    explícitas las demás entradas. Los estados con filas iguales comparten
+    una fila (act_row), y las filas se encajan en un único vector "peine"
+    (act_base/act_check/act_next), como en yacc/bison:
+        i = act_base[r] + t;  act_next[i] si act_check[i] == r, si no act_default[r]
+
+    GOTO: por columna (no terminal), con el destino más frecuente como
+    valor por defecto y el resto encajado en otro peine indexado por estado.
+
+    Con reducciones por defecto un error puede detectarse unas reducciones
+    más tarde, pero siempre antes de desplazar el token erróneo.
+    """
+    symbols: List[str]
+    n_terminals: int
+    n_states: int
+    prod_lhs: Sequence[int]
+    prod_off: Sequence[int]
+    prod_rhs: Sequence[int]
+    act_row: Sequence[int]         # estado -> fila compartida
+    act_default: Sequence[int]     # fila -> acción por defecto (reduce o error)
+    act_base: Sequence[int]        # fila -> desplazamiento en el peine
+    act_check: Sequence[int]       # dueño (fila) de cada celda del peine, -1 libre
+    act_next: Sequence[int]
+    goto_default: Sequence[int]    # no terminal -> destino por defecto
+    goto_base: Sequence[int]
+    goto_check: Sequence[int]      # dueño (no terminal) de cada celda, -1 libre
+    goto_next: Sequence[int]
+    _index: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    def action_code(self, state: int, t: int) -> int:
+        r = self.act_row[state]
+        i = self.act_base[r] + t
+        if self.act_check[i] == r:
+            return self.act_next[i]
+        return self.act_default[r]
+
+    def goto_state(self, state: int, n: int) -> int:
+        i = self.goto_base[n] + state
+        if self.goto_check[i] == n:
+            return self.goto_next[i]
+        return self.goto_default[n]
+
+    def nbytes(self) -> int:
+        """Memoria de los arreglos de ACTION y GOTO comprimidos."""
+        return 4 * sum(len(a) for a in (self.act_row, self.act_default, self.act_base,
+                                        self.act_check, self.act_next, self.goto_default,
+                                        self.goto_base, self.goto_check, self.goto_next))
+
+
+def pack_tables(tables: CompiledTables, keep_errors: Iterable[int] = ()) -> PackedTables:
+    """
+    Comprime ACTION/GOTO de unas tablas densas.
+    keep_errors: estados cuyas celdas de error deben conservarse (p. ej. las
+    que dejó %nonassoc); en ellos no se usa reducción por defecto.
+    """
+    nT, nN, n_states = tables.n_terminals, tables.n_nonterminals, tables.n_states
+    action, goto = tables.action, tables.goto
+    keep = set(keep_errors)
+
+    # --- ACTION: reducción por defecto y filas compartidas ---
+    rows: Dict[Tuple[int, Tuple[Tuple[int, int], ...]], int] = {}
+    row_entries: List[Tuple[Tuple[int, int], ...]] = []
+    act_row = array("i", bytes(4 * n_states))
+    act_default = array("i")
+    for s in range(n_states):
+        cells = action[s * nT:(s + 1) * nT]
+        default = ACT_ERROR
+        if s not in keep:
+            counts: Dict[int, int] = {}
+            for code in cells:
+                if code & 3 == ACT_REDUCE:
+                    counts[code] = counts.get(code, 0) + 1
+            if counts:
+                default = max(sorted(counts), key=counts.__getitem__)
+        entries = tuple((t, code) for t, code in enumerate(cells)
+                        if code != ACT_ERROR and code != default)
+        key = (default, entries)
+        r = rows.get(key)
+        if r is None:
+            r = rows[key] = len(row_entries)
+            row_entries.append(entries)
+            act_default.append(default)
+        act_row[s] = r
+    act_base, act_check, act_next = _comb(row_entries, nT)
+
+    # --- GOTO: destino por defecto por columna ---
+    goto_default = array("i", [-1]) * nN
+    columns: List[Tuple[Tuple[int, int], ...]] = []
+    for n in range(nN):
+        targets = [(s, goto[s * nN + n]) for s in range(n_states) if goto[s * nN + n] >= 0]
+        counts = {}
+        for _s, j in targets:
+            counts[j] = counts.get(j, 0) + 1
+        if counts:
+            goto_default[n] = max(sorted(counts), key=counts.__getitem__)
+        columns.append(tuple((s, j) for s, j in targets if j != goto_default[n]))
+    goto_base, goto_check, goto_next = _comb(columns, n_states)
+
+    return PackedTables(symbols=tables.symbols, n_terminals=nT, n_states=n_states,
+                        prod_lhs=tables.prod_lhs, prod_off=tables.prod_off,
+                        prod_rhs=tables.prod_rhs,
+                        act_row=act_row, act_default=act_default, act_base=act_base,
+                        act_check=act_check, act_next=act_next,
+                        goto_default=goto_default, goto_base=goto_base,
+                        goto_check=goto_check, goto_next=goto_next,
+                        _index=tables._index)
+
+
+def _comb(rows: List[Tuple[Tuple[int, int], ...]], width: int):
+    """
+    Encaja filas dispersas [(columna, valor)] en un único vector (first-fit,
+    de la más densa a la menos). Retorna (base, check, next); el vector se
+    rellena hasta max(base) + width para no comprobar límites al buscar.
+    """
+    base = array("i", bytes(4 * len(rows)))
+    check: List[int] = []
+    nxt: List[int] = []
+    first_free = 0
+    for r in sorted(range(len(rows)), key=lambda r: -len(rows[r])):
+        entries = rows[r]
+        if not entries:
+            continue
+        c0 = entries[0][0]
+        b = max(0, first_free - c0)
+        while True:
+            for c, _v in entries:
+                i = b + c
+                if i < len(check) and check[i] != -1:
+                    break
+            else:
+                break
+            b += 1
+        end = b + entries[-1][0] + 1
+        if end > len(check):
+            check.extend([-1] * (end - len(check)))
+            nxt.extend([0] * (end - len(nxt)))
+        for c, v in entries:
+            check[b + c] = r
+            nxt[b + c] = v
+        base[r] = b
+        while first_free < len(check) and check[first_free] != -1:
+            first_free += 1
+
+    size = max(base, default=0) + width
+    if len(check) < size:
+        check.extend([-1] * (size - len(check)))
+        nxt.extend([0] * (size - len(nxt)))
+    return base, array("i", check), array("i", nxt)
+
+
+def load_tables(path: str) -> CompiledTables:
+    """
+    Carga tablas compiladas con mmap: los arreglos son vistas sobre las
+    páginas del archivo (sin copiar), que varios procesos pueden compartir.
+    """
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(mm) < _HEADER.size:
+        mm.close()
+        raise ValueError(f"Archivo de tablas inválido: {path}")
+    (magic, version, nT, nN, n_states, n_prods, n_rhs, _start,
+     o_lhs, o_off, o_rhs, o_act, o_goto, o_names, names_len) = _HEADER.unpack_from(mm, 0)
+    if magic != MAGIC:
+        mm.close()
+        raise ValueError(f"Archivo de tablas inválido: {path}")
+    if version != VERSION:
+        mm.close()
+        raise ValueError(f"Versión de tablas no soportada: {version} (se espera {VERSION})")
+    if o_names + names_len > len(mm):
+        mm.close()
+        raise ValueError(f"Archivo de tablas truncado: {path}")
+
+    symbols = bytes(mm[o_names:o_names + names_len]).decode("utf-8").split("\0")
+    if len(symbols) != nT + nN:
+        mm.close()
+        raise ValueError(f"Tabla de símbolos inconsistente en {path}")
+
+    def view(off: int, n: int) -> Sequence[int]:
+        return _int_view(mm, off, n)
+
+    return CompiledTables(symbols=symbols, n_terminals=nT, n_states=n_states,
+                          prod_lhs=view(o_lhs, n_prods),
+                          prod_off=view(o_off, n_prods + 1),
+                          prod_rhs=view(o_rhs, n_rhs),
+                          action=view(o_act, n_states * nT),
+                          goto=view(o_goto, n_states * nN),
+                          _mm=mm, path=path)
+
+
+def _pad(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+def _le_bytes(seq: Sequence[int]) -> bytes:
+    arr = seq if isinstance(seq, array) else array("i", seq)
+    if sys.byteorder != "little":
+        arr = array("i", arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+def _int_view(mm: mmap.mmap, off: int, n: int) -> Sequence[int]:
+    if sys.byteorder == "little":
+        return memoryview(mm)[off:off + 4 * n].cast("i")
+    # En big-endian no se puede mapear directo: se copia y se invierte
+    arr = array("i", mm[off:off + 4 * n])
+    arr.byteswap()
+    return arr
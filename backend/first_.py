@@ -1,15 +1,9 @@
 # first.py
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import Set, List, Dict
-
-def trim(s: str) -> str:
-    return s.strip()
-
-def split(s: str, sep: str) -> List[str]:
-    if sep == ' ':
-        return [t for t in s.split(sep) if t != ""]
-    return [t.strip() for t in s.split(sep)]
+from typing import Set, List, Dict, Optional
+from analysis import GrammarAnalysis, analyze, reanalyze
+from grammar import GrammarIR
 
 
 @dataclass
@@ -26,63 +20,21 @@ class First:
         self.grammar: Grammar = g
         self.firstSets: Dict[str, Set[str]] = {}
 
-    def compute(self) -> None:
-        # 1) Inicializar conjuntos FIRST vacíos
-        for nt in self.grammar.nonTerminals:
-            self.firstSets[nt] = set()
-
-        changed = True
-        while changed:
-            changed = False
-
-            # 2) Recorrer reglas
-            for r in self.grammar.rules:
-                line = trim(r)
-                if not line:
-                    continue
-
-                pos = line.find("->")
-                if pos == -1:
-                    continue
-
-                left = trim(line[:pos])
-                right = trim(line[pos + 2:])
-
-                # 2.1) Alternativas separadas por '|'
-                alternatives = split(right, '|')
-
-                for alt in alternatives:
-                    symbols = split(trim(alt), ' ')
-                    if not symbols:
-                        continue
-
-                    sym = trim(symbols[0])
-                    if not sym:
-                        continue
-
-                    firstSym: Set[str] = set()
-
-                    # Regla 1: si es terminal entre comillas (p.ej., 'a' ó '')
-                    if sym.startswith("'") and sym.endswith("'"):
-                        if sym == "''":
-                            firstSym.add("''")  # ε representado como ''
-                        else:
-                            # quitar comillas
-                            firstSym.add(sym[1:-1])
-
-                    # Regla 2: si es no terminal, copiar FIRST(X1)
-                    elif sym in self.grammar.nonTerminals:
-                        firstSym = set(self.firstSets.get(sym, set()))
-
-                    # Caso: terminal "implícito" sin comillas
-                    else:
-                        firstSym.add(sym)
-
-                    # Insertar en FIRST(LHS)
-                    before = len(self.firstSets[left])
-                    self.firstSets[left].update(firstSym)
-                    if len(self.firstSets[left]) > before:
-                        changed = True
+    def compute(self, base: Optional["First"] = None) -> None:
+        # Las producciones salen del IR de la gramática (tokenizado una vez en
+        # grammar.py) y el punto fijo trabaja sobre bitsets de terminales (ver
+        # analysis.py). FIRST considera prefijos anulables: FIRST(A -> X Y)
+        # incluye FIRST(Y) si X ⇒* ε.
+        # Con `base` (First de una versión anterior de la gramática) sólo se
+        # recalculan los no terminales afectados por la edición.
+        ir = GrammarIR.of(self.grammar)
+        prods = ir.named_productions()
+        prev: Optional[GrammarAnalysis] = getattr(base, "analysis", None)
+        if prev is not None:
+            self.analysis = reanalyze(prev, prods, ir.nonterminals, ir.start_symbol)
+        else:
+            self.analysis = analyze(prods, ir.nonterminals, ir.start_symbol)
+        self.firstSets = self.analysis.first_sets()
 
     def print(self) -> None:
         for nt, fset in self.firstSets.items():
@@ -0,0 +1,322 @@
+# glr.py
+"""
+    Parser GLR (Tomita, con la corrección de Rekers para reglas ε) sobre las
+    tablas de lr1.py conservando los conflictos.
+
+    Las celdas ACTION sin conflicto se leen de las tablas compiladas; las que
+    tienen un conflicto sin resolver (LR1Builder.alternatives) guardan todas
+    sus acciones candidatas. Los conflictos que resolvió la precedencia
+    (%left/%right/%nonassoc) se respetan.
+
+    Pila: grafo (GSS). Cada nodo es (estado, nivel) y sus aristas apuntan a
+    nodos de niveles anteriores, etiquetadas con el nodo del bosque que
+    cubre ese tramo. Las pilas que comparten prefijo comparten nodos, y las
+    que llegan al mismo estado en el mismo nivel se funden, de modo que una
+    entrada casi determinista se analiza en tiempo casi lineal.
+
+    Resultado: bosque de derivación compartido y empaquetado (SPPF, ver
+    ParseForest): un nodo por (símbolo, inicio, fin) con una "familia"
+    (producción, hijos) por cada forma de derivarlo.
+"""
+from __future__ import annotations
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+from compiled import CompiledTables, ACT_ACCEPT, ACT_REDUCE, ACT_SHIFT, encode_reduce, encode_shift
+from tree import ParseTree
+
+END = "$"   # fin de entrada (como en lr1.py)
+
+
+class _GSSNode:
+    __slots__ = ("state", "level", "links")
+
+    def __init__(self, state: int, level: int):
+        self.state = state
+        self.level = level
+        self.links: List[Tuple[_GSSNode, int]] = []   # (nodo anterior, nodo del bosque)
+
+
+@dataclass
+class ParseForest:
+    """
+    Bosque de derivación en arreglos paralelos (como tree.ParseTree):
+        sym[i], start[i], end[i]   símbolo y tokens [inicio, fin) del nodo
+        families[i]                None en las hojas; en los nodos internos,
+                                   lista de (producción, hijos) alternativos
+    La entrada es ambigua si algún nodo alcanzable tiene más de una familia.
+    """
+    tables: CompiledTables
+    tokens: List[str]
+    sym: array = field(default_factory=lambda: array("i"))
+    start: array = field(default_factory=lambda: array("i"))
+    end: array = field(default_factory=lambda: array("i"))
+    families: List[Optional[List[Tuple[int, Tuple[int, ...]]]]] = field(default_factory=list)
+    root: int = -1
+
+    def __len__(self) -> int:
+        return len(self.sym)
+
+    def _add(self, sym: int, start: int, end: int, leaf: bool) -> int:
+        self.sym.append(sym)
+        self.start.append(start)
+        self.end.append(end)
+        self.families.append(None if leaf else [])
+        return len(self.sym) - 1
+
+    def symbol(self, i: int) -> str:
+        return self.tables.symbols[self.sym[i]]
+
+    def span(self, i: int) -> Tuple[int, int]:
+        return self.start[i], self.end[i]
+
+    def reachable(self) -> List[int]:
+        """Nodos alcanzables desde la raíz (preorden, sin repetir)."""
+        seen = {self.root}
+        order: List[int] = []
+        stack = [self.root]
+        while stack:
+            n = stack.pop()
+            order.append(n)
+            for _p, kids in self.families[n] or ():
+                for c in kids:
+                    if c not in seen:
+                        seen.add(c)
+                        stack.append(c)
+        return order
+
+    def ambiguities(self) -> List[int]:
+        """Nodos alcanzables con más de una derivación."""
+        return [n for n in self.reachable() if len(self.families[n] or ()) > 1]
+
+    def is_ambiguous(self) -> bool:
+        return bool(self.ambiguities())
+
+    def count(self) -> int:
+        """Número de árboles de derivación; -1 si son infinitos (ciclos A =>+ A)."""
+        fams = self.families
+        total: Dict[int, int] = {}
+        on_path = set()
+        stack: List[Tuple[int, bool]] = [(self.root, False)]
+        while stack:
+            n, expanded = stack.pop()
+            if n in total:
+                continue
+            if fams[n] is None:
+                total[n] = 1
+                continue
+            if expanded:
+                on_path.discard(n)
+                s = 0
+                for _p, kids in fams[n]:
+                    k = 1
+                    for c in kids:
+                        k *= total[c]
+                    s += k
+                total[n] = s
+                continue
+            on_path.add(n)
+            stack.append((n, True))
+            for _p, kids in fams[n]:
+                for c in kids:
+                    if c in on_path:
+                        return -1
+                    if c not in total:
+                        stack.append((c, False))
+        return total[self.root]
+
+    def tree(self) -> ParseTree:
+        """
+        Un árbol de derivación del bosque: en cada nodo, la familia de menor
+        altura (la primera ante empates), lo que evita los ciclos.
+        """
+        fams = self.families
+        nodes = self.reachable()
+        height: Dict[int, int] = {n: 0 for n in nodes if fams[n] is None}
+        best: Dict[int, int] = {}
+        changed = True
+        while changed:          # punto fijo: pocas pasadas salvo cadenas ε largas
+            changed = False
+            for n in reversed(nodes):
+                if fams[n] is None:
+                    continue
+                for f, (_p, kids) in enumerate(fams[n]):
+                    if all(c in height for c in kids):
+                        h = 1 + max((height[c] for c in kids), default=0)
+                        if h < height.get(n, h + 1):
+                            height[n], best[n] = h, f
+                            changed = True
+
+        t = self.tables
+        out = ParseTree(t, self.tokens)
+        # postorden iterativo: cada aparición de un nodo es un nodo del árbol
+        # (en un solo árbol sólo los nodos ε pueden aparecer más de una vez)
+        done: List[List[int]] = [[]]
+        stack: List[Tuple[int, int]] = [(self.root, 0)]
+        while stack:
+            n, i = stack.pop()
+            if fams[n] is None:
+                done[-1].append(len(out.sym))
+                out.sym.append(self.sym[n])
+                out.prod.append(-1)
+                out.pos.append(self.start[n])
+                out.first.append(-1)
+                continue
+            p, kids = fams[n][best[n]]
+            if i < len(kids):
+                if i == 0:
+                    done.append([])
+                stack.append((n, i + 1))
+                stack.append((kids[i], 0))
+                continue
+            children = done.pop() if kids else []
+            done[-1].append(len(out.sym))
+            out.first.append(len(out.kids))
+            out.kids.extend(children)
+            out.sym.append(self.sym[n])
+            out.prod.append(p)
+            out.pos.append(self.start[n])
+        out.root = done[0][0]
+        return out
+
+    def to_dict(self) -> Dict:
+        """Bosque en listas (nodos alcanzables renumerados desde 0 = raíz)."""
+        nodes = self.reachable()
+        index = {n: i for i, n in enumerate(nodes)}
+        return {
+            "symbols": list(self.tables.symbols),
+            "root": 0,
+            "sym": [self.sym[n] for n in nodes],
+            "start": [self.start[n] for n in nodes],
+            "end": [self.end[n] for n in nodes],
+            "families": [None if self.families[n] is None else
+                         [[p, [index[c] for c in kids]] for p, kids in self.families[n]]
+                         for n in nodes],
+        }
+
+
+class GLRParser:
+    """
+    Driver GLR sobre un LR1Builder construido con tolerant=True (con
+    tolerant=False la construcción ya falla ante un conflicto, así que no
+    quedan alternativas y el parser se comporta como LR(1)).
+    """
+
+    def __init__(self, builder):
+        self.tables: CompiledTables = builder.compile_tables()
+        t = self.tables
+        nT = t.n_terminals
+        # celda ACTION (estado * nT + terminal) -> todas sus acciones
+        self.multi: Dict[int, Tuple[int, ...]] = {}
+        for (i, a), candidates in builder.alternatives.items():
+            codes = []
+            for kind, data in candidates:
+                if kind == "shift":
+                    codes.append(encode_shift(data))
+                elif kind == "reduce":
+                    codes.append(encode_reduce(builder.prod_rank[data.id]))
+                else:
+                    codes.append(ACT_ACCEPT)
+            self.multi[i * nT + t.symbol_id(a)] = tuple(codes)
+
+    def parse(self, tokens: Sequence[str]) -> ParseForest:
+        """Bosque de todas las derivaciones de la entrada; ValueError si no hay ninguna."""
+        toks = list(tokens)
+        if not toks or toks[-1] != END:
+            toks.append(END)
+        t = self.tables
+        ids = t.symbol_ids(toks)
+        action, goto, multi = t.action, t.goto, self.multi
+        nT, nN = t.n_terminals, t.n_nonterminals
+        plen, pcol = t.prod_len, t.prod_goto_col
+
+        forest = ParseForest(t, toks[:-1])
+        bottom = _GSSNode(0, 0)
+        frontier: Dict[int, _GSSNode] = {0: bottom}
+
+        for ip, a in enumerate(ids):
+            if a < 0:
+                raise ValueError(f"Parse error: '{toks[ip]}' no es un terminal de la gramática")
+            here: Dict[Tuple[int, int], int] = {}     # (no terminal, inicio) -> nodo del bosque
+            todo = list(frontier.values())            # nodos del nivel por procesar
+            acted: List[_GSSNode] = []                # ya procesados
+            shifts: List[Tuple[_GSSNode, int]] = []
+            accepted: Optional[_GSSNode] = None
+
+            def codes(state: int) -> Tuple[int, ...]:
+                cell = state * nT + a
+                c = multi.get(cell)
+                return c if c is not None else (action[cell],)
+
+            def reducer(target: _GSSNode, p: int, kids: Tuple[int, ...]) -> None:
+                A = pcol[p]
+                key = (A, target.level)
+                node = here.get(key)
+                if node is None:
+                    node = here[key] = forest._add(nT + A, target.level, ip, False)
+                fam = (p, kids)
+                if fam not in forest.families[node]:
+                    forest.families[node].append(fam)
+                j = goto[target.state * nN + A]
+                st = frontier.get(j)
+                if st is None:
+                    st = frontier[j] = _GSSNode(j, ip)
+                    st.links.append((target, node))
+                    todo.append(st)
+                    return
+                for prev, _n in st.links:
+                    if prev is target:
+                        return       # misma arista: la ambigüedad ya quedó en el nodo
+                link = (target, node)
+                st.links.append(link)
+                # la arista nueva abre caminos a reducciones de nodos ya procesados
+                for other in acted:
+                    for code in codes(other.state):
+                        if code & 3 == ACT_REDUCE and plen[code >> 2]:
+                            reductions(other, code >> 2, link)
+
+            def reductions(st: _GSSNode, p: int, via: Optional[Tuple[_GSSNode, int]] = None) -> None:
+                k = plen[p]
+                if k == 0:
+                    if via is None:
+                        reducer(st, p, ())
+                    return
+                paths = [(st, k, (), via is None)]
+                while paths:
+                    n, d, kids, ok = paths.pop()
+                    if d == 0:
+                        if ok:
+                            reducer(n, p, kids)
+                        continue
+                    for link in n.links:
+                        paths.append((link[0], d - 1, (link[1],) + kids, ok or link is via))
+
+            while todo:
+                st = todo.pop()
+                acted.append(st)
+                for code in codes(st.state):
+                    kind = code & 3
+                    if kind == ACT_SHIFT:
+                        shifts.append((st, code >> 2))
+                    elif kind == ACT_REDUCE:
+                        reductions(st, code >> 2)
+                    elif kind == ACT_ACCEPT:
+                        accepted = st
+
+            if ip == len(ids) - 1:
+                if accepted is None:
+                    break
+                forest.root = next(n for prev, n in accepted.links if prev is bottom)
+                return forest
+            if not shifts:
+                break
+            leaf = forest._add(a, ip, ip + 1, True)
+            frontier = {}
+            for st, j in shifts:
+                nxt = frontier.get(j)
+                if nxt is None:
+                    nxt = frontier[j] = _GSSNode(j, ip + 1)
+                nxt.links.append((st, leaf))
+
+        states = ", ".join(str(s) for s in sorted(frontier))
+        raise ValueError(f"Parse error en estado(s) {states} con token '{toks[ip]}'")
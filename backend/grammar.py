@@ -1,7 +1,13 @@
-
 from __future__ import annotations
+import logging
+from array import array
 from dataclasses import dataclass, field
-from typing import Set, List
+from typing import Dict, Iterable, Optional, Set, List, Tuple
+
+log = logging.getLogger(__name__)
+
+EPS = "''"   # epsilon
+END = "$"    # fin de entrada
 
 def trim(s: str) -> str:
     return s.strip()
@@ -11,6 +17,152 @@ def split(s: str, sep: str) -> List[str]:
         return [t for t in s.split(sep) if t != ""]
     return [t.strip() for t in s.split(sep)]
 
+# Declaraciones de precedencia, como en yacc: "%left + -" (cada línea sube un nivel)
+PREC_DIRECTIVES = ("%left", "%right", "%nonassoc")
+
+
+def norm_symbol(sym: str) -> str:
+    """Normaliza símbolos: 'x' -> x, ''/ε -> EPS, quita espacios."""
+    sym = sym.strip()
+    if sym in (EPS, "ε"):
+        return EPS
+    if len(sym) >= 2 and sym[0] == sym[-1] == "'":
+        return sym[1:-1]
+    return sym
+
+
+def split_rule(line: str) -> Optional[Tuple[str, List[List[str]]]]:
+    """
+    "A -> α | β" -> (A, [α, β]) con los símbolos normalizados (norm_symbol);
+    las alternativas vacías o ''/ε dan RHS vacío. None si no hay "->".
+    Es el único lugar donde se separa el texto de una regla.
+    """
+    pos = line.find("->")
+    if pos == -1:
+        return None
+    alts = []
+    for alt in line[pos + 2:].split("|"):
+        alts.append([s for s in map(norm_symbol, alt.split()) if s != EPS])
+    return norm_symbol(line[:pos]), alts
+
+
+def tokenize_rules(rules: Iterable[str]) -> List[Tuple[str, List[str]]]:
+    """Reglas de texto -> producciones (A, [símbolos]) en el orden del texto."""
+    prods: List[Tuple[str, List[str]]] = []
+    for r in rules:
+        rule = split_rule(r)
+        if rule is not None:
+            prods.extend((rule[0], rhs) for rhs in rule[1])
+    return prods
+
+
+@dataclass
+class GrammarIR:
+    """
+    Gramática ya tokenizada e internada, compartida por First, Follow,
+    Table y LR1Builder (Grammar.ir la construye una vez por carga).
+
+        symbols[i]          nombre del símbolo i; los no terminales son
+                            [0, n_nonterminals), en orden de aparición como
+                            lado izquierdo, y luego van los terminales
+        prod_lhs[p]         no terminal de la producción p
+        rhs[rhs_start[p]:rhs_start[p + 1]]
+                            ids del lado derecho de p (vacío = ε)
+        nt_start[A]..nt_start[A + 1]
+                            producciones de A: contiguas, en el orden del texto
+
+    Las producciones quedan agrupadas por lado izquierdo (el orden que usa
+    LR1Builder, y por tanto compiled.py).
+    """
+    symbols: List[str]
+    symbol_id: Dict[str, int]
+    n_nonterminals: int
+    start: int                               # id del símbolo inicial; -1 si no hay
+    prod_lhs: array = field(default_factory=lambda: array("i"))
+    rhs_start: array = field(default_factory=lambda: array("i", [0]))
+    rhs: array = field(default_factory=lambda: array("i"))
+    nt_start: array = field(default_factory=lambda: array("i", [0]))
+    n_rules: int = 0                         # reglas de texto de las que sale
+
+    @classmethod
+    def from_productions(cls, prods: Iterable[Tuple[str, List[str]]], nonterminals: Iterable[str] = (),
+                         start: str = "", n_rules: int = 0) -> "GrammarIR":
+        by_lhs: Dict[str, List[List[str]]] = {}
+        for A, rhs in prods:
+            by_lhs.setdefault(A, []).append(rhs)
+        # no terminales declarados sin producciones (y el inicial) van al final
+        extra = set(nonterminals)
+        if start:
+            extra.add(start)
+        nts = list(by_lhs) + sorted(extra.difference(by_lhs))
+        symbols = list(nts)
+        sid = {A: i for i, A in enumerate(nts)}
+        ir = cls(symbols, sid, len(nts), sid.get(start, -1), n_rules=n_rules)
+        lhs, starts, body, nt_start = ir.prod_lhs, ir.rhs_start, ir.rhs, ir.nt_start
+        for A in nts:
+            a = sid[A]
+            for rhs in by_lhs.get(A, ()):
+                lhs.append(a)
+                for X in rhs:
+                    i = sid.get(X)
+                    if i is None:
+                        i = sid[X] = len(symbols)
+                        symbols.append(X)
+                    body.append(i)
+                starts.append(len(body))
+            nt_start.append(len(lhs))
+        return ir
+
+    @classmethod
+    def from_rules(cls, rules: List[str], nonterminals: Iterable[str] = (), start: str = "") -> "GrammarIR":
+        return cls.from_productions(tokenize_rules(rules), nonterminals, start, len(rules))
+
+    @classmethod
+    def of(cls, g) -> "GrammarIR":
+        """IR de un Grammar, o de cualquier objeto con rules/nonTerminals (p. ej. los de first_.py)."""
+        ir = getattr(g, "ir", None)
+        if ir is None:
+            ir = cls.from_rules(g.rules, g.nonTerminals, getattr(g, "initialState", ""))
+        return ir
+
+    # ---------------------------------------------------------------
+    # Consultas
+    # ---------------------------------------------------------------
+    @property
+    def n_productions(self) -> int:
+        return len(self.prod_lhs)
+
+    @property
+    def nonterminals(self) -> List[str]:
+        return self.symbols[:self.n_nonterminals]
+
+    @property
+    def terminals(self) -> List[str]:
+        return self.symbols[self.n_nonterminals:]
+
+    @property
+    def start_symbol(self) -> str:
+        return self.symbols[self.start] if self.start >= 0 else ""
+
+    def is_terminal(self, i: int) -> bool:
+        return i >= self.n_nonterminals
+
+    def productions(self, A: int) -> range:
+        return range(self.nt_start[A], self.nt_start[A + 1])
+
+    def rhs_ids(self, p: int) -> array:
+        return self.rhs[self.rhs_start[p]:self.rhs_start[p + 1]]
+
+    def rhs_names(self, p: int) -> List[str]:
+        syms = self.symbols
+        return [syms[i] for i in self.rhs[self.rhs_start[p]:self.rhs_start[p + 1]]]
+
+    def named_productions(self) -> List[Tuple[str, List[str]]]:
+        """Producciones (A, [símbolos]) en el orden del IR, para analysis.py."""
+        syms, lhs = self.symbols, self.prod_lhs
+        return [(syms[lhs[p]], self.rhs_names(p)) for p in range(len(lhs))]
+
+
 @dataclass
 class Grammar:
 
@@ -18,100 +170,93 @@ class Grammar:
     nonTerminals: Set[str] = field(default_factory=set)
     initialState: str = ""
     rules: List[str] = field(default_factory=list)
+    precedence: Dict[str, Tuple[int, str]] = field(default_factory=dict)   # terminal -> (nivel, left|right|nonassoc)
+    # producciones ya tokenizadas, las reglas de las que salieron y el IR
+    # (con las reglas, no terminales e inicial con que se construyó): si
+    # alguien edita `rules` o los conjuntos a mano, la clave deja de coincidir
+    _prods: List[Tuple[str, List[str]]] = field(default_factory=list, init=False, repr=False, compare=False)
+    _prods_rules: Tuple[str, ...] = field(default=(), init=False, repr=False, compare=False)
+    _ir: Optional[GrammarIR] = field(default=None, init=False, repr=False, compare=False)
+    _ir_key: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
 
     def loadFromFile(self, filename: str) -> bool:
-
-        rhsSymbols: List[str] = []
-
         try:
             with open(filename, "r", encoding="utf-8") as f:
-                for raw in f:
-                    line = trim(raw)
-                    if not line or line.startswith("#"):
-                        continue
-
-                    self.rules.append(line)
-
-                    pos = line.find("->")
-                    if pos == -1:
-                        print(f"Regla inválida: {line}")
-                        continue
-
-                    left = trim(line[:pos])
-                    if not self.nonTerminals:
-                        self.initialState = left
-                    self.nonTerminals.add(left)
-
-                    right = trim(line[pos + 2:])
-                    alternatives = split(right, '|')
-
-                    for alt in alternatives:
-                        alt = trim(alt)
-                        if not alt or alt in ("''", "ε"):
-                            continue
-                        symbols = split(alt, ' ')
-                        for sym in symbols:
-                            sym = trim(sym)
-                            if sym and sym not in ("''", "ε"):
-                                rhsSymbols.append(sym)
+                text = f.read()
         except OSError as e:
-            print(f"Error al abrir archivo: {filename} ({e})")
+            log.error("Error al abrir archivo: %s (%s)", filename, e)
             return False
-
-        for s in rhsSymbols:
-            if s not in self.nonTerminals:
-                self.terminals.add(s)
-
-        self.terminals.add("$") 
-        return True
+        return self.loadFromString(text, reset=False)
 
     def loadFromString(self, text: str, reset: bool = True) -> bool:
-       
+
         if reset:
             self.rules = []
             self.nonTerminals = set()
             self.terminals = set()
             self.initialState = ""
-
-        rhsSymbols: List[str] = []
+            self.precedence = {}
+            self._prods = []
+            self._prods_rules = ()
+        elif self._prods_rules != tuple(self.rules):
+            self._retokenize()
 
         for raw in text.splitlines():
             line = trim(raw)
             if not line or line.startswith("#"):
                 continue
+            if line.startswith("%"):
+                self._loadDirective(line)
+                continue
 
             self.rules.append(line)
 
-            pos = line.find("->")
-            if pos == -1:
-                print(f"Regla inválida: {line}")
+            rule = split_rule(line)
+            if rule is None:
+                log.warning("Regla inválida: %s", line)
                 continue
 
-            left = trim(line[:pos])
+            left, alternatives = rule
             if not self.nonTerminals:
                 self.initialState = left
             self.nonTerminals.add(left)
+            self._prods.extend((left, rhs) for rhs in alternatives)
 
-            right = trim(line[pos + 2:])
-            alternatives = split(right, '|')
-
-            for alt in alternatives:
-                alt = trim(alt)
-                if not alt or alt in ("''", "ε"):
-                    continue
-                symbols = split(alt, ' ')
-                for sym in symbols:
-                    sym = trim(sym)
-                    if sym and sym not in ("''", "ε"):
-                        rhsSymbols.append(sym)
+        self._prods_rules = tuple(self.rules)
+        self._ir = None
+        # terminales: símbolos de los lados derechos que no son no terminales
+        self.terminals.update(X for _A, rhs in self._prods for X in rhs if X not in self.nonTerminals)
+        self.terminals.add(END)  # EOF
+        return True
 
-        for s in rhsSymbols:
-            if s not in self.nonTerminals:
-                self.terminals.add(s)
+    def _retokenize(self) -> None:
+        # `rules` se editó a mano: se vuelve a tokenizar todo
+        self._prods = tokenize_rules(self.rules)
+        self._prods_rules = tuple(self.rules)
+        self._ir = None
 
-        self.terminals.add("$")  # EOF
-        return True
+    @property
+    def ir(self) -> GrammarIR:
+        """IR de las reglas; se reconstruye cuando cambian las reglas, los no terminales o el inicial."""
+        rules = tuple(self.rules)
+        if self._prods_rules != rules:
+            self._retokenize()
+        key = (rules, frozenset(self.nonTerminals), self.initialState)
+        if self._ir is None or self._ir_key != key:
+            self._ir = GrammarIR.from_productions(self._prods, self.nonTerminals,
+                                                  self.initialState, len(rules))
+            self._ir_key = key
+        return self._ir
 
+    def _loadDirective(self, line: str) -> None:
+        """%left/%right/%nonassoc t1 t2 ...: las líneas posteriores tienen más precedencia."""
+        parts = split(line, ' ')
+        if parts[0] not in PREC_DIRECTIVES:
+            log.warning("Directiva desconocida: %s", line)
+            return
+        level = 1 + max((lv for lv, _ in self.precedence.values()), default=0)
+        for t in parts[1:]:
+            self.precedence[t] = (level, parts[0][1:])
 
     def print(self) -> None:
         print(f"Estado inicial: {self.initialState}")
@@ -0,0 +1,562 @@
+# lexer.py
+"""
+    Generador de analizadores léxicos dirigidos por tabla.
+
+    Las expresiones regulares de los tokens se compilan en un único AFD:
+        regex -> AFN de Thompson -> AFD por subconjuntos -> AFD mínimo (Hopcroft)
+    El AFD trabaja sobre bytes: la entrada (bytes, bytearray, memoryview o str
+    en UTF-8) se traduce de una vez a clases de bytes con bytes.translate y
+    el bucle sólo indexa una tabla plana.
+
+    Reglas de desempate, como en lex: gana el lexema más largo y, a igual
+    longitud, la regla que aparece primero. Los ids de token que produce el
+    lexer son los ids de terminal de las tablas compiladas (compiled.py), de
+    modo que el parser los consume sin pasar por strings.
+
+    Sintaxis de las expresiones: concatenación, |, *, +, ?, {m}, {m,}, {m,n},
+    paréntesis, ., clases [a-z] y [^...], y los escapes \\d \\w \\s \\D \\W \\S
+    \\n \\t \\r \\xHH (cualquier otro carácter escapado es literal).
+"""
+from __future__ import annotations
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+END = "$"       # fin de entrada (como en lr1.py)
+NO_TOKEN = -1   # estado no final
+SKIP = -2       # regla cuyo lexema se descarta (espacios, comentarios)
+
+_ALL = (1 << 256) - 1
+
+
+class LexError(ValueError):
+    """Ningún token reconoce la entrada a partir de `pos` (offset en bytes)."""
+    def __init__(self, message: str, pos: int):
+        super().__init__(message)
+        self.pos = pos
+
+
+# ---------------------------------------------------------------
+# Expresiones regulares -> árbol
+# ---------------------------------------------------------------
+# Nodos: ("set", máscara de 256 bits) | ("cat", [n...]) | ("alt", [n...])
+#        | ("star", n) | ("opt", n) | ("eps",)
+
+def _mask(*bs: int) -> int:
+    m = 0
+    for b in bs:
+        m |= 1 << b
+    return m
+
+def _range(lo: int, hi: int) -> int:
+    return ((1 << (hi + 1)) - 1) ^ ((1 << lo) - 1)
+
+_DIGIT = _range(48, 57)
+_WORD = _DIGIT | _range(65, 90) | _range(97, 122) | _mask(95)
+_SPACE = _mask(32, 9, 10, 11, 12, 13)
+_CLASS_ESCAPES = {"d": _DIGIT, "w": _WORD, "s": _SPACE,
+                  "D": _ALL ^ _DIGIT, "W": _ALL ^ _WORD, "S": _ALL ^ _SPACE}
+_CHAR_ESCAPES = {"n": 10, "t": 9, "r": 13, "f": 12, "v": 11, "0": 0}
+
+
+class _RegexParser:
+    def __init__(self, pattern: str):
+        self.p = pattern
+        self.i = 0
+
+    def error(self, msg: str) -> ValueError:
+        return ValueError(f"Regex inválida {self.p!r} (posición {self.i}): {msg}")
+
+    def peek(self) -> Optional[str]:
+        return self.p[self.i] if self.i < len(self.p) else None
+
+    def parse(self):
+        node = self.alt()
+        if self.i != len(self.p):
+            raise self.error(f"'{self.p[self.i]}' inesperado")
+        return node
+
+    def alt(self):
+        options = [self.cat()]
+        while self.peek() == "|":
+            self.i += 1
+            options.append(self.cat())
+        return options[0] if len(options) == 1 else ("alt", options)
+
+    def cat(self):
+        parts = []
+        while self.peek() not in (None, "|", ")"):
+            parts.append(self.repeat())
+        if not parts:
+            return ("eps",)
+        return parts[0] if len(parts) == 1 else ("cat", parts)
+
+    def repeat(self):
+        node = self.atom()
+        while True:
+            c = self.peek()
+            if c == "*":
+                self.i += 1
+                node = ("star", node)
+            elif c == "+":
+                self.i += 1
+                node = ("cat", [node, ("star", node)])
+            elif c == "?":
+                self.i += 1
+                node = ("opt", node)
+            elif c == "{":
+                node = self.bounds(node)
+            else:
+                return node
+
+    def bounds(self, node):
+        close = self.p.find("}", self.i)
+        if close < 0:
+            raise self.error("falta '}'")
+        body = self.p[self.i + 1:close]
+        lo_s, comma, hi_s = body.partition(",")
+        try:
+            lo = int(lo_s)
+            hi = None if comma and not hi_s else int(hi_s) if comma else lo
+        except ValueError:
+            raise self.error(f"repetición '{{{body}}}' inválida") from None
+        if hi is not None and hi < lo:
+            raise self.error(f"repetición '{{{body}}}' inválida")
+        self.i = close + 1
+        parts = [node] * lo
+        if hi is None:
+            parts.append(("star", node))
+        else:
+            parts.extend([("opt", node)] * (hi - lo))
+        return ("cat", parts) if parts else ("eps",)
+
+    def atom(self):
+        c = self.peek()
+        if c is None:
+            raise self.error("expresión incompleta")
+        self.i += 1
+        if c == "(":
+            node = self.alt()
+            if self.peek() != ")":
+                raise self.error("falta ')'")
+            self.i += 1
+            return node
+        if c in "*+?{":
+            raise self.error(f"'{c}' sin operando")
+        if c == ".":
+            return ("set", _ALL ^ _mask(10))
+        if c == "[":
+            return ("set", self.char_class())
+        if c == "\\":
+            m = self.escape()
+            if isinstance(m, int):
+                return ("set", m)
+            c = m
+        data = c.encode("utf-8")
+        if len(data) == 1:
+            return ("set", _mask(data[0]))
+        return ("cat", [("set", _mask(b)) for b in data])
+
+    def escape(self) -> int | str:
+        """Máscara de una clase (\\d, \\xHH...) o el carácter literal escapado."""
+        c = self.peek()
+        if c is None:
+            raise self.error("escape incompleto")
+        self.i += 1
+        if c in _CLASS_ESCAPES:
+            return _CLASS_ESCAPES[c]
+        if c in _CHAR_ESCAPES:
+            return _mask(_CHAR_ESCAPES[c])
+        if c == "x":
+            h = self.p[self.i:self.i + 2]
+            try:
+                b = int(h, 16)
+            except ValueError:
+                raise self.error(f"\\x{h} inválido") from None
+            self.i += 2
+            return _mask(b)
+        return c
+
+    def class_byte(self) -> int:
+        c = self.p[self.i]
+        self.i += 1
+        if c == "\\":
+            m = self.escape()
+            if isinstance(m, int):
+                if m & (m - 1):
+                    raise self.error("una clase no puede ser extremo de un rango")
+                return m.bit_length() - 1
+            c = m
+        if ord(c) > 127:
+            raise self.error(f"'{c}' no es ASCII; usar \\xHH para bytes dentro de []")
+        return ord(c)
+
+    def char_class(self) -> int:
+        negate = self.peek() == "^"
+        if negate:
+            self.i += 1
+        m = 0
+        first = True
+        while True:
+            c = self.peek()
+            if c is None:
+                raise self.error("falta ']'")
+            if c == "]" and not first:
+                self.i += 1
+                break
+            first = False
+            if c == "\\" and self.p[self.i + 1:self.i + 2] in _CLASS_ESCAPES:
+                self.i += 2
+                m |= _CLASS_ESCAPES[self.p[self.i - 1]]
+                continue
+            lo = self.class_byte()
+            if self.peek() == "-" and self.p[self.i + 1:self.i + 2] not in ("]", ""):
+                self.i += 1
+                hi = self.class_byte()
+                if hi < lo:
+                    raise self.error(f"rango {chr(lo)}-{chr(hi)} vacío")
+                m |= _range(lo, hi)
+            else:
+                m |= _mask(lo)
+        return _ALL ^ m if negate else m
+
+
+def literal(text: str) -> str:
+    """Regex que reconoce exactamente `text`."""
+    return "".join("\\" + c if c in "\\|*+?{}()[].^$-" else c for c in text)
+
+
+# ---------------------------------------------------------------
+# Árbol -> AFN de Thompson
+# ---------------------------------------------------------------
+class _NFA:
+    def __init__(self) -> None:
+        self.eps: List[List[int]] = []
+        self.edges: List[List[Tuple[int, int]]] = []   # (máscara, destino)
+        self.final: Dict[int, int] = {}                # estado -> regla
+
+    def state(self) -> int:
+        self.eps.append([])
+        self.edges.append([])
+        return len(self.eps) - 1
+
+    def build(self, node) -> Tuple[int, int]:
+        """Fragmento (entrada, salida) de un nodo (recursión = anidamiento de la regex)."""
+        kind = node[0]
+        if kind == "set":
+            s, e = self.state(), self.state()
+            self.edges[s].append((node[1], e))
+            return s, e
+        if kind == "eps":
+            s = self.state()
+            return s, s
+        if kind == "cat":
+            s, e = self.build(node[1][0])
+            for part in node[1][1:]:
+                s2, e2 = self.build(part)
+                self.eps[e].append(s2)
+                e = e2
+            return s, e
+        if kind == "alt":
+            s, e = self.state(), self.state()
+            for part in node[1]:
+                s2, e2 = self.build(part)
+                self.eps[s].append(s2)
+                self.eps[e2].append(e)
+            return s, e
+        s2, e2 = self.build(node[1])
+        s, e = self.state(), self.state()
+        self.eps[s] += [s2, e]
+        self.eps[e2].append(e)
+        if kind == "star":
+            self.eps[e2].append(s2)
+        return s, e
+
+    def closure(self, states) -> frozenset:
+        seen = set(states)
+        stack = list(states)
+        while stack:
+            for t in self.eps[stack.pop()]:
+                if t not in seen:
+                    seen.add(t)
+                    stack.append(t)
+        return frozenset(seen)
+
+
+# ---------------------------------------------------------------
+# AFD
+# ---------------------------------------------------------------
+def _byte_classes(masks: Sequence[int]) -> Tuple[bytes, List[int]]:
+    """
+    Particiona los 256 bytes en clases que ninguna máscara distingue.
+    Retorna (tabla de traducción byte -> clase, byte representante por clase).
+    """
+    sig_to_class: Dict[int, int] = {}
+    reps: List[int] = []
+    table = bytearray(256)
+    for b in range(256):
+        bit = 1 << b
+        sig = 0
+        for k, m in enumerate(masks):
+            if m & bit:
+                sig |= 1 << k
+        c = sig_to_class.get(sig)
+        if c is None:
+            c = sig_to_class[sig] = len(reps)
+            reps.append(b)
+        table[b] = c
+    return bytes(table), reps
+
+
+def _subsets(nfa: _NFA, start: int, reps: List[int]) -> Tuple[List[List[int]], List[int]]:
+    """Construcción por subconjuntos: (transiciones por clase, -1 = sin transición; regla final)."""
+    nC = len(reps)
+    bits = [1 << b for b in reps]
+    first = nfa.closure([start])
+    index = {first: 0}
+    sets = [first]
+    delta: List[List[int]] = []
+    final: List[int] = []
+    i = 0
+    while i < len(sets):
+        S = sets[i]
+        i += 1
+        rules = [nfa.final[s] for s in S if s in nfa.final]
+        final.append(min(rules) if rules else NO_TOKEN)
+        moves: List[List[int]] = [[] for _ in range(nC)]
+        for s in S:
+            for m, t in nfa.edges[s]:
+                for c in range(nC):
+                    if m & bits[c]:
+                        moves[c].append(t)
+        row = [-1] * nC
+        for c, targets in enumerate(moves):
+            if not targets:
+                continue
+            T = nfa.closure(targets)
+            j = index.get(T)
+            if j is None:
+                j = index[T] = len(sets)
+                sets.append(T)
+            row[c] = j
+        delta.append(row)
+    return delta, final
+
+
+def _minimize(delta: List[List[int]], final: List[int]) -> Tuple[List[List[int]], List[int]]:
+    """Hopcroft sobre el AFD completado con un estado muerto; el estado 0 sigue siendo el inicial."""
+    n = len(delta)
+    nC = len(delta[0]) if delta else 0
+    dead = n
+    full = [[t if t >= 0 else dead for t in row] for row in delta] + [[dead] * nC]
+    acc = final + [NO_TOKEN]
+
+    # transiciones inversas: inv[c][t] = estados que van a t con la clase c
+    inv: List[List[List[int]]] = [[[] for _ in range(n + 1)] for _ in range(nC)]
+    for s, row in enumerate(full):
+        for c, t in enumerate(row):
+            inv[c][t].append(s)
+
+    groups: Dict[int, List[int]] = {}
+    for s, a in enumerate(acc):
+        groups.setdefault(a, []).append(s)
+    blocks: List[set] = [set(g) for g in groups.values()]
+    block_of = [0] * (n + 1)
+    for b, members in enumerate(blocks):
+        for s in members:
+            block_of[s] = b
+    pending = set(range(len(blocks)))
+    work = list(pending)
+
+    while work:
+        A = work.pop()
+        pending.discard(A)
+        splitter = list(blocks[A])
+        for c in range(nC):
+            X = set()
+            for t in splitter:
+                X.update(inv[c][t])
+            if not X:
+                continue
+            touched: Dict[int, List[int]] = {}
+            for s in X:
+                touched.setdefault(block_of[s], []).append(s)
+            for Y, inside in touched.items():
+                if len(inside) == len(blocks[Y]):
+                    continue
+                new = len(blocks)
+                moved = set(inside)
+                blocks[Y] -= moved
+                blocks.append(moved)
+                for s in moved:
+                    block_of[s] = new
+                if Y in pending:
+                    pending.add(new)
+                    work.append(new)
+                else:
+                    smaller = new if len(moved) <= len(blocks[Y]) else Y
+                    pending.add(smaller)
+                    work.append(smaller)
+
+    # renumeración: inicial = 0, orden de descubrimiento, sin el estado muerto
+    dead_block = block_of[dead]
+    order = {block_of[0]: 0}
+    queue = [block_of[0]]
+    out_delta: List[List[int]] = []
+    out_final: List[int] = []
+    for b in queue:
+        s = next(iter(blocks[b]))
+        row = []
+        for t in full[s]:
+            tb = block_of[t]
+            if tb == dead_block:
+                row.append(-1)
+                continue
+            j = order.get(tb)
+            if j is None:
+                j = order[tb] = len(queue)
+                queue.append(tb)
+            row.append(j)
+        out_delta.append(row)
+        out_final.append(acc[s])
+    return out_delta, out_final
+
+
+class Lexer:
+    """
+    Analizador léxico para una lista de reglas (nombre, regex) en orden de
+    prioridad. Reglas con nombre None se descartan (espacios, comentarios).
+    Sin bind(), el id de cada token es el índice de su regla.
+
+        n_classes   clases de bytes (columnas de la tabla)
+        class_map   tabla de traducción byte -> clase (para bytes.translate)
+        delta       array('i') de n_states * n_classes: offset de la fila del
+                    estado destino (estado * n_classes) o -1
+        accept      array('i') indexado por offset de fila: id de token,
+                    NO_TOKEN o SKIP
+    """
+
+    def __init__(self, rules: Sequence[Tuple[Optional[str], str]]):
+        if not rules:
+            raise ValueError("Lexer necesita al menos una regla")
+        self.rules = list(rules)
+        self.names: List[Optional[str]] = [name for name, _ in self.rules]
+        nfa = _NFA()
+        start = nfa.state()
+        masks = set()
+        for r, (name, pattern) in enumerate(self.rules):
+            tree = _RegexParser(pattern).parse()
+            s, e = nfa.build(tree)
+            nfa.eps[start].append(s)
+            nfa.final[e] = r
+            if e == s or e in nfa.closure([s]):
+                raise ValueError(f"La regla '{name or pattern}' reconoce la cadena vacía")
+        for out in nfa.edges:
+            masks.update(m for m, _ in out)
+
+        self.class_map, reps = _byte_classes(sorted(masks))
+        delta, final = _minimize(*_subsets(nfa, start, reps))
+        self.n_classes = nC = len(reps)
+        self.n_states = len(delta)
+        self._rule_of = final                        # regla final de cada estado
+        self.delta = array("i", [t * nC if t >= 0 else -1 for row in delta for t in row])
+        self.token_ids = [SKIP if name is None else r for r, name in enumerate(self.names)]
+        self.end_id = len(self.rules)
+        self._fill_accept()
+
+    @classmethod
+    def for_tables(cls, tables, patterns: Optional[Dict[str, str]] = None,
+                   skip: Optional[str] = r"\s+") -> "Lexer":
+        """
+        Lexer para los terminales de unas tablas compiladas: cada terminal se
+        reconoce literalmente salvo que `patterns` le asigne una regex
+        (p. ej. {"id": "[a-zA-Z_]\\w*", "num": "\\d+"}). Los literales tienen
+        prioridad, así las palabras clave ganan a los identificadores.
+        """
+        patterns = dict(patterns or {})
+        unknown = [name for name in patterns if tables.symbol_id(name) < 0 or name == END]
+        if unknown:
+            raise ValueError(f"Patrones para símbolos que no son terminales: {', '.join(sorted(unknown))}")
+        terminals = [s for s in tables.symbols[:tables.n_terminals] if s != END]
+        rules: List[Tuple[Optional[str], str]] = [(t, literal(t)) for t in terminals if t not in patterns]
+        rules += [(t, p) for t, p in patterns.items()]
+        if skip:
+            rules.append((None, skip))
+        return cls(rules).bind(tables)
+
+    def bind(self, tables) -> "Lexer":
+        """Usa los ids de terminal de `tables` (compiled.py) como ids de token."""
+        ids = []
+        for name in self.names:
+            if name is None:
+                ids.append(SKIP)
+                continue
+            i = tables.symbol_id(name)
+            if i < 0 or i >= tables.n_terminals:
+                raise ValueError(f"El token '{name}' no es un terminal de la gramática")
+            ids.append(i)
+        self.token_ids = ids
+        self.end_id = tables.symbol_id(END)
+        self._fill_accept()
+        return self
+
+    def _fill_accept(self) -> None:
+        nC = self.n_classes
+        acc = array("i", [NO_TOKEN]) * (self.n_states * nC)
+        for s, r in enumerate(self._rule_of):
+            if r != NO_TOKEN:
+                acc[s * nC] = self.token_ids[r]
+        self.accept = acc
+
+    def scan(self, data: bytes | bytearray | memoryview | str) -> Iterator[Tuple[int, int, int]]:
+        """
+        (id de token, inicio, fin) por token, con offsets en bytes; termina
+        con (id de $, n, n). Lanza LexError si ningún token reconoce la entrada.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        cls = bytes(data).translate(self.class_map)
+        delta, accept = self.delta, self.accept
+        n = len(cls)
+        pos = 0
+        while pos < n:
+            s = 0
+            i = pos
+            tok = NO_TOKEN
+            end = pos
+            while i < n:
+                s = delta[s + cls[i]]
+                if s < 0:
+                    break
+                i += 1
+                a = accept[s]
+                if a != NO_TOKEN:
+                    tok = a
+                    end = i
+            if end == pos:
+                raise LexError(f"Carácter inesperado {bytes(data[pos:pos + 1])!r} en la posición {pos}", pos)
+            if tok != SKIP:
+                yield tok, pos, end
+            pos = end
+        yield self.end_id, n, n
+
+    def tokenize(self, data: bytes | bytearray | memoryview | str) -> List[str]:
+        """Nombres de los tokens (sin $), en el formato que consume el parser por texto."""
+        names = self._names_by_id()
+        return [names[t] for t, _s, _e in self.scan(data) if t != self.end_id]
+
+    def format_tokens(self, data: bytes | bytearray | memoryview | str) -> str:
+        """Listado TOKEN(NOMBRE, "lexema") ... TOKEN(END), como el del scanner externo."""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        names = self._names_by_id()
+        lines = []
+        for t, s, e in self.scan(data):
+            if t == self.end_id:
+                lines.append("TOKEN(END)")
+            else:
+                text = bytes(data[s:e]).decode("utf-8", "replace")
+                lines.append(f'TOKEN({names[t]}, "{text}")')
+        return "\n".join(lines)
+
+    def _names_by_id(self) -> Dict[int, str]:
+        return {tid: name for tid, name in zip(self.token_ids, self.names) if name is not None}
@@ -1,32 +1,44 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import List, Tuple, Dict, Set, Optional
-from grammar import Grammar
+import logging
+import os
+import tempfile
+import time
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import List, Tuple, Dict, Set, Optional, Iterator, NamedTuple, Sequence
+from grammar import Grammar, GrammarIR, norm_symbol as norm
+from analysis import digraph
+from compiled import CompiledTables, PackedTables, load_tables, ACT_ERROR, ACT_SHIFT, ACT_REDUCE, ACT_ACCEPT
+from tree import ParseTree
+from lexer import Lexer, LexError
 
 EPS = "''"   # epsilon
 END = "$"    # fin de entrada
 
-def trim(s: str) -> str: 
-    return s.strip()
+log = logging.getLogger(__name__)
 
-def split(s: str, sep: str) -> List[str]:
-    if sep == ' ':
-        return [t for t in s.split(sep) if t != ""]
-    return [t.strip() for t in s.split(sep)]
+MODES = ("lr1", "lalr", "pager")   # lr1 = colección LR(1) canónica
 
-def norm(sym: str) -> str:
-    """Normaliza símbolos: 'x' -> x, ''/ε -> EPS, quita espacios."""
-    sym = sym.strip()
-    if sym in (EPS, "ε"):
-        return EPS
-    if len(sym) >= 2 and sym[0] == sym[-1] == "'":
-        return sym[1:-1]
-    return sym
+# Empaquetado de ítems en enteros:
+#   núcleo = (id de producción << DOT_BITS) | dot
+#   clave  = (núcleo << LOOK_BITS) | id del lookahead
+DOT_BITS = 16
+LOOK_BITS = 20
+DOT_MASK = (1 << DOT_BITS) - 1
+LOOK_MASK = (1 << LOOK_BITS) - 1
 
-@dataclass
+@dataclass(slots=True)
 class Production:
     left: str
     right: List[str]  # [] significa ε
+    id: int = field(default=-1, compare=False, repr=False)   # índice en LR1Builder.productions
+    rhs: Tuple[str, ...] = field(init=False, compare=False, repr=False)   # right como tupla
+
+    def __post_init__(self):
+        self.rhs = tuple(self.right)
 
     def __str__(self):
         return f"{self.left } -> {self.right}"
@@ -46,55 +58,114 @@ class DFA:
     accept: Set[int]                            # ids de estados de aceptación
     labels: Set[str]                            # conjunto de etiquetas usadas (sin eps)
     index: Dict[frozenset, int]                 # 
+    succ: List[List[Tuple[str, int]]] = field(default_factory=list)   # succ[i] = [(label, j)] salientes de i
+
+@dataclass
+class Conflict:
+    """Conflicto en una celda ACTION[state, lookahead] y cómo se resolvió."""
+    state: int
+    lookahead: str
+    kind: str                 # "shift/reduce" | "reduce/reduce" | "accept/reduce"
+    actions: List[str]        # acciones candidatas
+    chosen: str               # acción que queda en la tabla ("error" por %nonassoc)
+    resolution: str           # "precedence" | "associativity" | "default"
+    resolved: bool            # True si lo resolvió una declaración de precedencia
+    items: List[str] = field(default_factory=list)   # ítems del estado que participan
+
+    def __str__(self):
+        return f"Conflicto LR(1) en ACTION[{self.state},{self.lookahead}]: {' vs '.join(self.actions)}"
 
-"""
+class LR1Item:
+    """
     LR1Item representa un ítem LR(1): A -> α . β , a
-    left: A
-    right: (α β) como tupla de símbolos [α, β]
+    prod: producción internada A -> α β (left/right se leen de ella)
     dot: posición del punto (índice en right)
     look: símbolo de anticipación 'a'
-"""
-@dataclass(frozen=True)
-class LR1Item:
-    left: str
-    right: Tuple[str, ...]
-    dot: int
-    look: str
+    key: (id de producción, dot, id de look) empaquetados en un entero;
+         hash e igualdad son operaciones sobre ese entero.
+    """
+    __slots__ = ("prod", "dot", "look", "key")
+
+    def __init__(self, prod: Production, dot: int, look: str, look_id: int):
+        self.prod = prod
+        self.dot = dot
+        self.look = look
+        self.key = (((prod.id << DOT_BITS) | dot) << LOOK_BITS) | look_id
+
+    @property
+    def left(self) -> str:
+        return self.prod.left
+
+    @property
+    def right(self) -> Tuple[str, ...]:
+        return self.prod.rhs
+
+    @property
+    def core(self) -> int:
+        return self.key >> LOOK_BITS
+
+    def __hash__(self) -> int:
+        return self.key
+
+    def __reduce__(self):
+        # pickle compacto (los autómatas se construyen en otro proceso)
+        return (LR1Item, (self.prod, self.dot, self.look, self.key & LOOK_MASK))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, LR1Item) and self.key == other.key
+
+    def __repr__(self) -> str:
+        return f"LR1Item(left={self.left!r}, right={self.right!r}, dot={self.dot}, look={self.look!r})"
 
     """
         Retorna el símbolo que está después del punto, o None si está al final.
     """
     def next_symbol(self) -> Optional[str]:
-        return self.right[self.dot] if self.dot < len(self.right) else None
+        rhs = self.prod.rhs
+        return rhs[self.dot] if self.dot < len(rhs) else None
 
     def at_end(self) -> bool:
-        return self.dot >= len(self.right)
+        return self.dot >= len(self.prod.rhs)
 
     """
         Retorna un nuevo ítem con el punto avanzado una posición.
     """
     def advance(self) -> "LR1Item":
         assert not self.at_end()
-        return LR1Item(self.left, self.right, self.dot + 1, self.look)
+        return LR1Item(self.prod, self.dot + 1, self.look, self.key & LOOK_MASK)
 
 class LR1Builder:
     """
     Construye autómata LR(1) y tablas ACTION/GOTO.
     Acepta terminales con o sin comillas; ''/ε como epsilon.
+
+    incremental=True conserva lo necesario para reconstruir después a partir
+    de este autómata; base=<LR1Builder anterior> reutiliza sus estados, ítems
+    y reducciones en lo que la edición no tocó (sólo en modo lr1).
     """
     def __init__(self,
                  grammar: Grammar,
-                 firsts: Dict[str, Set[str]]
+                 firsts: Dict[str, Set[str]],
+                 mode: str = "lr1",
+                 tolerant: bool = False,
+                 incremental: bool = False,
+                 base: Optional["LR1Builder"] = None
                  ):
+        if mode not in MODES:
+            raise ValueError(f"Modo de construcción desconocido: {mode} (use {', '.join(MODES)})")
 
+        # Producciones del IR de la gramática (ya tokenizado y normalizado)
+        ir = GrammarIR.of(grammar)
         self.N: Set[str] = grammar.nonTerminals
-        self.T: Set[str] = {norm(t) for t in grammar.terminals if norm(t) != EPS}
+        self.N.update(ir.nonterminals)
+        self.T: Set[str] = set(ir.terminals)
+        self.T.add(END)  # asegura $
         self.S: str = grammar.initialState
         self.rules: List[str] = grammar.rules
 
         self.prods: Dict[str, List[Production]] = {}
-        self._parse_rules(self.rules)  # esto también infiere terminales
-        self.T.add(END)  # asegura $
+        for A, rhs in ir.named_productions():
+            self.prods.setdefault(A, []).append(Production(A, rhs))
 
         # Símbolo inicial aumentado S'
         self.S_: str = f"{self.S}'"
@@ -103,56 +174,182 @@ class LR1Builder:
         self.N.add(self.S_)
         self.prods.setdefault(self.S_, []).append(Production(self.S_, [self.S]))
 
+        # Reconstrucción incremental: sólo en LR(1) canónico y si base es compatible
+        if base is not None and not (mode == "lr1" and base._entries is not None
+                                     and self._compatible(base)):
+            base = None
+        self._incremental: bool = incremental or base is not None
+
+        # Tabla de producciones internada: productions[pid], la 0 es S' -> S.
+        # Con base, cada producción que no cambió conserva su id (y su objeto)
+        # y las eliminadas dejan un hueco (None); prod_order da el orden en la
+        # gramática, que es el que usan compiled.py y reduce/reduce.
+        changed = self._intern_productions(base)
+        if changed is None:
+            base = None
+        self._by_lhs: Dict[str, List[int]] = {}
+        for pid in self.prod_order:
+            self._by_lhs.setdefault(self.productions[pid].left, []).append(pid)
+        self.prod_rank: List[int] = [-1] * len(self.productions)
+        for rank, pid in enumerate(self.prod_order):
+            self.prod_rank[pid] = rank
+
+        # Terminales internados: ordenados, o los de base más los nuevos al final
+        # (compiled.py los renumera en orden)
+        self.term_list: List[str] = sorted(self.T) if base is None else \
+            base.term_list + sorted(self.T.difference(base.term_list))
+        self.term_id: Dict[str, int] = {t: i for i, t in enumerate(self.term_list)}
+
         # FIRST para no terminales
         self.first_nt: Dict[str, Set[str]] = firsts
+        # FIRST y anulabilidad de cada sufijo de producción, precalculados
+        self._suffix_first: List[List[Tuple[frozenset, bool]]] = self._build_suffix_first()
 
-        self.afn: NFA = self.build_nfa()
-        self.afd: DFA = self.build_dfa()
-        self.tables = self.build_tables()
+        self._afn: Optional[NFA] = None
+        self._compiled: Optional[CompiledTables] = None
+        self._packed: Optional[PackedTables] = None
+        self.mode: str = mode
 
-        print(f"No Terminales: {self.N}")
-        print(f"Terminales: {self.T}")
-        print(f"Start: {self.S}")
-        print(f"Producciones: {self.prods}")
-        print(f"FIRST: {self.first_nt}")
-       
+        # Precedencia/asociatividad declaradas (%left, %right, %nonassoc);
+        # la de una producción es la de su último terminal
+        self.prec: Dict[str, Tuple[int, str]] = {norm(t): v for t, v in grammar.precedence.items()}
+        self.prod_prec: List[Optional[Tuple[int, str]]] = [None] * len(self.productions)
+        for pid in self.prod_order:
+            last = next((X for X in reversed(self.productions[pid].rhs) if X not in self.N), None)
+            self.prod_prec[pid] = self.prec.get(last) if last is not None else None
 
-    def _parse_rules(self, rules: List[str]) -> None:
+        # Estados de la colección canónica con su cierre, ítems y reducciones
+        # (sólo si es incremental). Respecto de base:
+        # - un estado con el mismo kernel cuyo cierre no toca ningún no terminal
+        #   "sucio" (producciones o FIRST/anulabilidad cambiados) se reutiliza tal cual;
+        # - el resto se cierra de nuevo y, si tiene un estado equivalente en base
+        #   (mismo camino de símbolos desde el inicial), sólo se materializan
+        #   los ítems que difieren.
+        self._entries: Optional[List[_StateEntry]] = None
+        self._base: Optional[LR1Builder] = base
+        self._dirty: Set[str] = set()
+        if base is not None:
+            self._dirty = changed | {A for A in self.N if firsts.get(A) != base.first_nt.get(A)}
 
-        for r in rules:
-            line = trim(r)
-            if not line:
-                continue
-            pos = line.find("->")
-            if pos == -1:
-                continue
-            A = norm(trim(line[:pos]))
-            rhs = trim(line[pos+2:])
-            for alt in split(rhs, '|'):
-                alt = trim(alt)
-                if not alt or alt in (EPS, "ε"):
-                    rhs_list: List[str] = []
+        # Todos los conflictos de las tablas finales (resueltos o no).
+        # Con tolerant=False un conflicto sin resolver lanza ValueError;
+        # con tolerant=True se aplica la resolución por defecto de yacc
+        # (shift ante shift/reduce, la primera producción ante reduce/reduce).
+        self.tolerant: bool = tolerant
+        self.conflicts: List[Conflict] = []
+        # Conflictos que aparecieron al fusionar estados en modo lalr/pager
+        # (si hay alguno se recurre a la colección LR(1) canónica)
+        self.merge_conflicts: List[str] = []
+
+        # Duración de cada fase en segundos ("dfa", "tables" y, cuando se
+        # pide, "nfa"); si lalr/pager recurre a LR(1) se suman ambos intentos
+        self.timings: Dict[str, float] = {}
+
+        if mode in ("lalr", "pager"):
+            self.afd: DFA = self._timed("dfa", self.build_lalr_dfa if mode == "lalr" else self.build_pager_dfa)
+            self.tables = self._timed("tables", self.build_tables, self.conflicts)
+            # en modo tolerante se conservan las tablas fusionadas (como yacc/bison);
+            # los conflictos quedan en self.conflicts
+            unresolved = [c for c in self.conflicts if not c.resolved]
+            if unresolved and not tolerant:
+                log.info("[%s] %d conflicto(s) al fusionar estados; se usa LR(1) canónico",
+                         mode.upper(), len(unresolved))
+                self.merge_conflicts = [str(c) for c in unresolved]
+                self.mode = "lr1"
+                self.conflicts = []
+                self.afd = self._timed("dfa", self.build_dfa)
+                self.tables = self._timed("tables", self.build_tables, self.conflicts)
+        else:
+            self.afd = self._timed("dfa", self.build_dfa)
+            self.tables = self._timed("tables", self.build_tables, self.conflicts)
+
+        if not tolerant:
+            for c in self.conflicts:
+                if not c.resolved:
+                    raise ValueError(str(c))
+
+        log.debug("No Terminales: %s", self.N)
+        log.debug("Terminales: %s", self.T)
+        log.debug("Start: %s", self.S)
+        log.debug("Producciones: %s", self.prods)
+        log.debug("FIRST: %s", self.first_nt)
+
+    def _timed(self, phase: str, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.timings[phase] = self.timings.get(phase, 0.0) + time.perf_counter() - t0
+
+    def __getstate__(self):
+        # MappingProxyType no se puede serializar: se envían los dict de debajo
+        # (el autómata se construye en otro proceso y vuelve por pickle)
+        state = self.__dict__.copy()
+        ACTION, GOTO, states = state["tables"]
+        state["tables"] = (dict(ACTION), dict(GOTO), states)
+        return state
+
+    def __setstate__(self, state):
+        ACTION, GOTO, states = state["tables"]
+        state["tables"] = (MappingProxyType(ACTION), MappingProxyType(GOTO), states)
+        self.__dict__.update(state)
+
+    def _compatible(self, base: "LR1Builder") -> bool:
+        """base sirve de punto de partida: mismo S' -> S, ningún símbolo cambió de clase."""
+        if base.S_ != self.S_ or base.productions[0].rhs != (self.S,):
+            return False
+        return not (self.N & base.T or self.T & base.N)
+
+    def _intern_productions(self, base: Optional["LR1Builder"]) -> Optional[Set[str]]:
+        """
+        Numera las producciones (self.productions, self.prod_order).
+        Sin base: 0..n-1 en el orden de la gramática. Con base: las que no
+        cambiaron conservan id y objeto, las nuevas van al final y las
+        eliminadas quedan como huecos.
+        Retorna los lados izquierdos de las producciones añadidas o eliminadas,
+        o None si se numeró desde cero (sin base, o con más huecos que
+        producciones vivas).
+        """
+        ordered = [self.prods[self.S_][0]]
+        for A, plist in self.prods.items():
+            if A != self.S_:
+                ordered.extend(plist)
+
+        if base is not None:
+            free: Dict[Tuple[str, Tuple[str, ...]], deque] = {}
+            for prod in base.productions[1:]:
+                if prod is not None:
+                    free.setdefault((prod.left, prod.rhs), deque()).append(prod)
+            reused = [base.productions[0]]
+            added: List[Production] = []
+            for prod in ordered[1:]:
+                olds = free.get((prod.left, prod.rhs))
+                if olds:
+                    reused.append(olds.popleft())
                 else:
-                    syms = [norm(s) for s in split(alt, ' ')]
-                    rhs_list = [s for s in syms if s != EPS]
-                    # Inferir terminales: todo símbolo en RHS que no esté en N es terminal
-                    for s in rhs_list:
-                        if s not in self.N and s != END:
-                            # No sobreescribe N; si luego el usuario quiere que sea no terminal,
-                            # debe incluirlo en `nonterminals`.
-                            pass
-                self.prods.setdefault(A, []).append(Production(A, rhs_list))
-            # Asegurar que el lado izquierdo esté en N
-            if A not in self.N:
-                self.N.add(A)
-    
-        # Tras leer todas las reglas, define T como "símbolos en RHS que no estén en N"
-        rhs_syms: Set[str] = set()
-        for plist in self.prods.values():
-            for p in plist:
-                rhs_syms.update(p.right)
-        inferred_T = {s for s in rhs_syms if s not in self.N and s != EPS}
-        self.T |= inferred_T
+                    reused.append(prod)
+                    added.append(prod)
+            if len(base.productions) + len(added) <= 2 * len(ordered):
+                productions: List[Optional[Production]] = [None] * len(base.productions)
+                for prod in reused:
+                    if prod.id >= 0:   # las nuevas aún tienen id -1
+                        productions[prod.id] = prod
+                for prod in added:
+                    prod.id = len(productions)
+                    productions.append(prod)
+                self.prods = {}
+                for prod in reused[1:]:
+                    self.prods.setdefault(prod.left, []).append(prod)
+                self.prods[self.S_] = [reused[0]]
+                self.productions = productions
+                self.prod_order = [prod.id for prod in reused]
+                return {p.left for p in added} | {p.left for olds in free.values() for p in olds}
+
+        for pid, prod in enumerate(ordered):
+            prod.id = pid
+        self.productions = ordered
+        self.prod_order = list(range(len(ordered)))
+        return None
 
     def first_seq(self, seq: List[str]) -> Set[str]:
         """FIRST de una secuencia (incluye EPS si toda la secuencia es anulable)."""
@@ -170,11 +367,94 @@ class LR1Builder:
             out.add(EPS)
         return out
 
-    def _set_action(self, ACTION, i, a, entry):
-        if (i, a) in ACTION and ACTION[(i, a)] != entry:
-            prev = ACTION[(i, a)]
-            raise ValueError(f"Conflicto LR(1) en ACTION[{i},{a}]: {prev} vs {entry}")
-        ACTION[(i, a)] = entry
+    def _build_suffix_first(self) -> List[List[Tuple[frozenset, bool]]]:
+        """
+        Para cada producción pid y posición i: (FIRST(rhs[i:]) como ids de
+        terminal sin ε, rhs[i:] ⇒* ε). Se recorre cada RHS de derecha a
+        izquierda una sola vez; el cierre sólo combina esto con el lookahead.
+        """
+        tid = self.term_id
+        first_ids: Dict[str, Tuple[frozenset, bool]] = {}
+        for A in self.N:
+            fs = self.first_nt.get(A, ())
+            first_ids[A] = (frozenset(tid[t] for t in fs if t != EPS and t in tid), EPS in fs)
+
+        table: List[List[Tuple[frozenset, bool]]] = []
+        for prod in self.productions:
+            if prod is None:   # hueco de una producción eliminada
+                table.append([])
+                continue
+            rhs = prod.rhs
+            row: List[Tuple[frozenset, bool]] = [(frozenset(), True)] * (len(rhs) + 1)
+            for i in range(len(rhs) - 1, -1, -1):
+                X = rhs[i]
+                if X in self.N:
+                    f, nullable = first_ids[X]
+                    nxt, nxt_nullable = row[i + 1]
+                    row[i] = (f | nxt, True) if nullable and nxt_nullable else \
+                             (f | nxt, False) if nullable else (f, False)
+                else:
+                    row[i] = (frozenset((tid[X],)), False)
+            table.append(row)
+        return table
+
+    @property
+    def afn(self) -> NFA:
+        """AFN de ítems LR(1); se construye la primera vez que se pide."""
+        if self._afn is None:
+            self._afn = self._timed("nfa", self.build_nfa)
+        return self._afn
+
+    def _resolve(self, i: int, a: str, I: Set[LR1Item], shift: Optional[int],
+                 reduces: List[Production], accept: bool):
+        """
+        Resuelve una celda ACTION[i, a] con más de una acción candidata, como yacc:
+        - shift/reduce: compara la precedencia de la producción con la del
+          terminal a; a igual nivel decide la asociatividad (%left reduce,
+          %right desplaza, %nonassoc deja la celda en error).
+        - reduce/reduce: la producción que aparece antes en la gramática.
+        - sin precedencia declarada: shift.
+        Retorna (entrada elegida o None, Conflict).
+        """
+        reduces = sorted(reduces, key=lambda p: self.prod_rank[p.id])
+        candidates: List[Tuple[str, object]] = []
+        if accept:
+            candidates.append(("accept", None))
+        if shift is not None:
+            candidates.append(("shift", shift))
+        candidates.extend(("reduce", p) for p in reduces)
+
+        resolution = "default"
+        if accept:
+            kind, chosen = "accept/reduce", ("accept", None)
+        elif shift is None:
+            kind, chosen = "reduce/reduce", ("reduce", reduces[0])
+        else:
+            kind, chosen = "shift/reduce", ("shift", shift)
+            p_prec, a_prec = self.prod_prec[reduces[0].id], self.prec.get(a)
+            if p_prec is not None and a_prec is not None:
+                if p_prec[0] != a_prec[0]:
+                    resolution = "precedence"
+                    if p_prec[0] > a_prec[0]:
+                        chosen = ("reduce", reduces[0])
+                else:
+                    resolution = "associativity"
+                    if a_prec[1] == "left":
+                        chosen = ("reduce", reduces[0])
+                    elif a_prec[1] == "nonassoc":
+                        chosen = None
+
+        items = sorted(_fmt_item(it) for it in I
+                       if (it.at_end() and it.look == a and it.prod in reduces)
+                       or (shift is not None and it.next_symbol() == a))
+        conflict = Conflict(state=i, lookahead=a, kind=kind,
+                            actions=[_fmt_action(e) for e in candidates],
+                            chosen=_fmt_action(chosen) if chosen else "error",
+                            resolution=resolution,
+                            # la precedencia no decide entre dos reduce
+                            resolved=resolution != "default" and len(reduces) == 1,
+                            items=items)
+        return chosen, conflict
 
     def build_nfa(self) -> NFA:
         """
@@ -197,7 +477,7 @@ class LR1Builder:
         E: List[Tuple[LR1Item, str, LR1Item]] = []  # transiciones
 
         # ítem inicial S' -> . S , $
-        start = LR1Item(self.S_, tuple([self.S]), 0, END)
+        start = LR1Item(self.productions[0], 0, END, self.term_id[END])
         Q.add(start)
         work = [start]
 
@@ -216,15 +496,12 @@ class LR1Builder:
 
             # 2) si B es no terminal, añadir transiciones epsilon a ítems B -> . γ , look
             if B in self.N:
-                # β = símbolos después de B en la producción actual
-                beta = list(it.right[it.dot + 1 :])
-                # FIRST(β a) para determinar lookaheads de las nuevas producciones
-                lookseq = beta + [it.look]
-                la_set = self.first_seq(lookseq)
-                for prod in self.prods.get(B, []):  # cada producción B -> γ
-                    for b in la_set:
-                        look2 = it.look if b == EPS else b
-                        new_it = LR1Item(B, tuple(prod.right), 0, look2)
+                # FIRST(β a), β = símbolos después de B: tabla de sufijos + lookahead
+                first_beta, beta_nullable = self._suffix_first[it.prod.id][it.dot + 1]
+                la_ids = first_beta | {it.key & LOOK_MASK} if beta_nullable else first_beta
+                for q in self._by_lhs.get(B, ()):  # cada producción B -> γ
+                    for b in la_ids:
+                        new_it = LR1Item(self.productions[q], 0, self.term_list[b], b)
                         E.append((it, EPS, new_it))
                         if new_it not in Q:
                             Q.add(new_it)
@@ -235,177 +512,1086 @@ class LR1Builder:
 
     def build_dfa(self) -> DFA:
         """
-        Construye el AFD a partir de self.afn (si no existe, lo construye).
-        Parámetros:
-            only_terminals: si True filtra las etiquetas del AFN a solo terminales (self.T).
-            eps_label: etiqueta usada en el AFN para transiciones epsilon (por defecto "ε").
-            store: si True guarda el resultado en self.dfa.
+        Construye la colección LR(1) canónica calculando cierre y goto
+        directamente sobre conjuntos de ítems, sin materializar el AFN:
+        cada estado es un mapa núcleo -> ids de lookahead y dos estados
+        son el mismo si sus kernels (núcleos y lookaheads) coinciden.
+
+        El AFN de ítems (self.afn) sólo se construye si se pide para visualizarlo.
         Retorna:
             instancia DFA con estados (conjuntos de LR1Item), transiciones y estados de aceptación.
         """
-        # Asegurar que el AFN existe
-        if not hasattr(self, "afn") or self.afn is None:
-            self.build_nfa()
+        prods = self.productions
+        base = self._base
+        if self._incremental:
+            self._entries = []
+            self._like: List[Optional[int]] = []   # estado equivalente de base
+            self._base_index = {e.key: i for i, e in enumerate(base._entries)} if base else {}
+        start_kernel = {0: {self.term_id[END]}}
+        start_key = _kernel_key(start_kernel)
+        states: List[Dict[int, Set[int]]] = [self._closure_state(start_kernel, start_key, 0)]
+        index: Dict[frozenset, int] = {start_key: 0}
+        trans: Dict[Tuple[int, str], int] = {}
 
-        Q, E, start = self.afn.Q, self.afn.E, self.afn.start
+        # BFS con etiquetas en orden, para numerar los estados de forma reproducible
+        k = 0
+        while k < len(states):
+            moves: Dict[str, Dict[int, Set[int]]] = {}
+            for core, L in states[k].items():
+                rhs = prods[core >> DOT_BITS].rhs
+                dot = core & DOT_MASK
+                if dot < len(rhs):
+                    moves.setdefault(rhs[dot], {})[core + 1] = L
+            like = self._like[k] if base is not None else None
+            for X in sorted(moves):
+                kernel = moves[X]
+                key = _kernel_key(kernel)
+                j = index.get(key)
+                if j is None:
+                    j = index[key] = len(states)
+                    states.append(self._closure_state(
+                        kernel, key, base.afd.trans.get((like, X)) if like is not None else None))
+                trans[(k, X)] = j
+            k += 1
 
-        E_use = list(E)
+        dfa = self._to_dfa(states, trans, self._entries)
+        self._base = None   # no se retiene la versión anterior
+        self._like, self._base_index = [], {}
+        return dfa
 
-        # Construir mapas rápidos: eps_map y trans_map[label][src] -> set(dsts)
-        eps_map: Dict[LR1Item, Set[LR1Item]] = {}
-        trans_map: Dict[str, Dict[LR1Item, Set[LR1Item]]] = {}
-        labels: Set[str] = set()
+    def _closure_state(self, kernel: Dict[int, Set[int]], key: frozenset,
+                       like: Optional[int]) -> Dict[int, Set[int]]:
+        """
+        Cierre del kernel. En modo incremental registra el _StateEntry del
+        estado: el de base si se puede reutilizar, o uno nuevo que recuerda
+        su equivalente en base (`like`) para materializarse por diferencias.
+        """
+        if self._entries is None:
+            return self._closure1(kernel)
+        base = self._base
+        pos = self._base_index.get(key)
+        if pos is not None:
+            like = pos
+            entry = base._entries[pos]
+            if entry.deps.isdisjoint(self._dirty):
+                self._entries.append(entry)
+                self._like.append(pos)
+                return entry.closure
+        closure = self._closure1(kernel)
+        # el cierre depende de las producciones y del FIRST de los no
+        # terminales que aparecen en sus ítems
+        prods, N = self.productions, self.N
+        deps: Set[str] = set()
+        for pid in {core >> DOT_BITS for core in closure}:
+            deps.update(X for X in prods[pid].rhs if X in N)
+        entry = _StateEntry(key, closure, frozenset(deps))
+        if base is not None and like is not None:
+            entry.origin = base._entries[like]
+        self._entries.append(entry)
+        self._like.append(like if base is not None else None)
+        return closure
 
-        for src, lab, dst in E_use:
-            if lab == EPS:
-                eps_map.setdefault(src, set()).add(dst)
-            else:
-                trans_map.setdefault(lab, {}).setdefault(src, set()).add(dst)
-                labels.add(lab)
+    def _nullable(self) -> Set[str]:
+        """No terminales que derivan ε (punto fijo sobre las producciones)."""
+        nullable: Set[str] = set()
+        changed = True
+        while changed:
+            changed = False
+            for A, plist in self.prods.items():
+                if A in nullable:
+                    continue
+                if any(all(X in nullable for X in p.right) for p in plist):
+                    nullable.add(A)
+                    changed = True
+        return nullable
 
-        def epsilon_closure(states: Set[LR1Item]) -> Set[LR1Item]:
-            stack = list(states)
-            res = set(states)
+    def build_lalr_dfa(self) -> DFA:
+        """
+        Construye el AFD LALR(1): autómata LR(0) más lookaheads calculados
+        directamente con DeRemer–Pennello (relaciones reads/includes/lookback),
+        sin pasar por la colección LR(1) canónica.
+
+        Los estados se devuelven como conjuntos de LR1Item (un ítem por
+        lookahead), igual que build_dfa, para que build_tables y la API no cambien.
+        """
+        prods, by_lhs = self.productions, self._by_lhs
+        end_id = self.term_id[END]
+
+        def closure0(kernel) -> frozenset:
+            res = set(kernel)
+            stack = list(kernel)
             while stack:
-                u = stack.pop()
-                for v in eps_map.get(u, ()):
-                    if v not in res:
-                        res.add(v)
-                        stack.append(v)
-            return res
-
-        def move(states: Set[LR1Item], sym: str) -> Set[LR1Item]:
-            out: Set[LR1Item] = set()
-            m = trans_map.get(sym)
-            if not m:
-                return out
-            for s in states:
-                out |= m.get(s, set())
-            return out
+                core = stack.pop()
+                rhs = prods[core >> DOT_BITS].rhs
+                dot = core & DOT_MASK
+                if dot < len(rhs) and rhs[dot] in self.N:
+                    for q in by_lhs.get(rhs[dot], ()):
+                        c = q << DOT_BITS
+                        if c not in res:
+                            res.add(c)
+                            stack.append(c)
+            return frozenset(res)
+
+        # --- 1) Autómata LR(0) (núcleos enteros, ver DOT_BITS) ---
+        start = closure0({0})
+        states0: List[frozenset] = [start]
+        kernels: Dict[frozenset, int] = {frozenset({0}): 0}
+        trans: Dict[Tuple[int, str], int] = {}
+        k = 0
+        while k < len(states0):
+            I = states0[k]
+            moves: Dict[str, Set[int]] = {}
+            for core in I:
+                rhs = prods[core >> DOT_BITS].rhs
+                dot = core & DOT_MASK
+                if dot < len(rhs):
+                    moves.setdefault(rhs[dot], set()).add(core + 1)
+            for X in sorted(moves):
+                kern = frozenset(moves[X])
+                j = kernels.get(kern)
+                if j is None:
+                    j = kernels[kern] = len(states0)
+                    states0.append(closure0(kern))
+                trans[(k, X)] = j
+            k += 1
+
+        # --- 2) DeRemer–Pennello ---
+        nullable = self._nullable()
+        nt_trans = [(p, X) for (p, X) in trans if X in self.N]
+
+        # DR(p,A): terminales que se pueden desplazar justo después de A
+        DR: Dict[Tuple[int, str], Set[int]] = {}
+        reads: Dict[Tuple[int, str], List[Tuple[int, str]]] = {}
+        for (p, A) in nt_trans:
+            r = trans[(p, A)]
+            DR[(p, A)] = {self.term_id[t] for t in self.T if (r, t) in trans}
+            reads[(p, A)] = [(r, C) for C in nullable if (r, C) in trans]
+        DR[(0, self.S)].add(end_id)   # S' -> S . $
+        Read = digraph(nt_trans, reads, DR, frozenset())
 
-        # Inicial: cierre epsilon del ítem inicial
-        start_closure = epsilon_closure({start})
-        d_states: List[Set[LR1Item]] = [start_closure]
-        d_index: Dict[frozenset, int] = {frozenset(start_closure): 0}
-        d_trans: Dict[Tuple[int, str], int] = {}
+        # includes y lookback recorriendo cada producción desde cada (p,A)
+        includes: Dict[Tuple[int, str], List[Tuple[int, str]]] = {x: [] for x in nt_trans}
+        walks: List[Tuple[Tuple[int, str], int, List[int]]] = []   # ((p,A), pid, estados por posición)
+        for (p, A) in nt_trans:
+            for pid in by_lhs.get(A, ()):
+                rhs = prods[pid].rhs
+                path = [p]
+                q = p
+                for X in rhs:
+                    q = trans[(q, X)]
+                    path.append(q)
+                walks.append(((p, A), pid, path))
+                for i, B in enumerate(rhs):
+                    if B in self.N and all(Y in nullable for Y in rhs[i + 1:]):
+                        includes[(path[i], B)].append((p, A))
+        Follow = digraph(nt_trans, includes, Read, frozenset())
 
-        work = [start_closure]
-        # iterar etiquetas en orden para reproducibilidad
-        sorted_labels = sorted(labels)
+        # --- 3) Lookaheads por ítem: LA del ítem A -> α . β en q = ∪ Follow(p,A) ---
+        looks: Dict[Tuple[int, int], Set[int]] = {(0, 0): {end_id}, (trans[(0, self.S)], 1): {end_id}}
+        for (pA, pid, path) in walks:
+            la = Follow[pA]
+            for dot, q in enumerate(path):
+                looks.setdefault((q, (pid << DOT_BITS) | dot), set()).update(la)
 
+        states = [{core: looks.get((q, core), set()) for core in I}
+                  for q, I in enumerate(states0)]
+        return self._to_dfa(states, trans)
+
+    def _closure1(self, kernel: Dict[int, Set[int]]) -> Dict[int, Set[int]]:
+        """
+        Cierre LR(1) agrupado por núcleo: núcleo -> conjunto de ids de lookahead.
+        Los lookaheads se propagan por núcleo hasta el punto fijo, en lugar de
+        crear un ítem por cada par (núcleo, lookahead).
+        """
+        prods, by_lhs, suffix_first = self.productions, self._by_lhs, self._suffix_first
+        items = {c: set(L) for c, L in kernel.items()}
+        work = list(items)
         while work:
-            S = work.pop(0)
-            sid = d_index[frozenset(S)]
-            for a in sorted_labels:
-                m = move(S, a)
-                if not m:
-                    continue
-                C = epsilon_closure(m)
-                key = frozenset(C)
-                if key not in d_index:
-                    nid = len(d_states)
-                    d_index[key] = nid
-                    d_states.append(C)
-                    work.append(C)
+            core = work.pop()
+            pid = core >> DOT_BITS
+            rhs = prods[pid].rhs
+            dot = core & DOT_MASK
+            if dot >= len(rhs) or rhs[dot] not in self.N:
+                continue
+            first_beta, beta_nullable = suffix_first[pid][dot + 1]
+            la = first_beta | items[core] if beta_nullable else first_beta
+            for q in by_lhs.get(rhs[dot], ()):
+                c = q << DOT_BITS
+                cur = items.get(c)
+                if cur is None:
+                    items[c] = set(la)
+                    work.append(c)
+                elif not la <= cur:
+                    cur |= la
+                    work.append(c)
+        return items
+
+    def build_pager_dfa(self) -> DFA:
+        """
+        Construye tablas LR(1) mínimas con el algoritmo de Pager (PGM):
+        al generar un estado cuyo núcleo LR(0) ya existe, se fusiona con él si
+        sus lookaheads son "débilmente compatibles"; si no, se crea un estado nuevo.
+        Así se obtiene el mismo lenguaje que LR(1) canónico con un número de
+        estados cercano a LALR.
+
+        1) Se decide qué estados se fusionan (lookaheads crecientes, con
+           reprocesamiento de los estados cuyo núcleo creció).
+        2) Sobre el autómata final se recalculan los lookaheads exactos por
+           propagación, descartando contribuciones de aristas que cambiaron.
+        """
+        prods = self.productions
+        end_id = self.term_id[END]
+
+        # --- 1) Estructura: núcleos y transiciones ---
+        kernels: List[Tuple[int, ...]] = [(0,)]
+        kernel_la: List[List[Set[int]]] = [[{end_id}]]
+        by_core: Dict[Tuple[int, ...], List[int]] = {(0,): [0]}
+        trans: Dict[Tuple[int, str], int] = {}
+        work = deque([0])
+        queued = {0}
+
+        while work:
+            k = work.popleft()
+            queued.discard(k)
+            items = self._closure1(dict(zip(kernels[k], kernel_la[k])))
+            moves: Dict[str, Dict[int, Set[int]]] = {}
+            for core, L in items.items():
+                rhs = prods[core >> DOT_BITS].rhs
+                dot = core & DOT_MASK
+                if dot < len(rhs):
+                    moves.setdefault(rhs[dot], {})[core + 1] = L
+            for X in sorted(moves):
+                cores = tuple(sorted(moves[X]))
+                las = [moves[X][c] for c in cores]
+                target = None
+                for j in by_core.get(cores, ()):
+                    if _weakly_compatible(kernel_la[j], las):
+                        target = j
+                        break
+                if target is None:
+                    target = len(kernels)
+                    kernels.append(cores)
+                    kernel_la.append([set(L) for L in las])
+                    by_core.setdefault(cores, []).append(target)
+                    work.append(target)
+                    queued.add(target)
                 else:
-                    nid = d_index[key]
-                d_trans[(sid, a)] = nid
+                    grew = False
+                    for S, L in zip(kernel_la[target], las):
+                        if not L <= S:
+                            S |= L
+                            grew = True
+                    if grew and target not in queued:
+                        work.append(target)
+                        queued.add(target)
+                trans[(k, X)] = target
+
+        # Renumerar sólo los estados alcanzables (una arista pudo cambiar de destino)
+        order = [0]
+        renum = {0: 0}
+        i = 0
+        while i < len(order):
+            k = order[i]
+            for X in sorted({X for (s, X) in trans if s == k}):
+                j = trans[(k, X)]
+                if j not in renum:
+                    renum[j] = len(order)
+                    order.append(j)
+            i += 1
+        kernels = [kernels[k] for k in order]
+        trans = {(renum[s], X): renum[j] for (s, X), j in trans.items() if s in renum}
+
+        # --- 2) Lookaheads exactos sobre el autómata final ---
+        la: List[Dict[int, Set[int]]] = [{c: set() for c in kern} for kern in kernels]
+        la[0][0].add(end_id)
+        full: List[Dict[int, Set[int]]] = [{} for _ in kernels]
+        work = deque(range(len(kernels)))
+        queued = set(work)
+        while work:
+            k = work.popleft()
+            queued.discard(k)
+            full[k] = items = self._closure1(la[k])
+            for core, L in items.items():
+                rhs = prods[core >> DOT_BITS].rhs
+                dot = core & DOT_MASK
+                if dot < len(rhs):
+                    j = trans[(k, rhs[dot])]
+                    S = la[j][core + 1]
+                    if not L <= S:
+                        S |= L
+                        if j not in queued:
+                            work.append(j)
+                            queued.add(j)
 
-        # identificar estados de aceptación (contienen S' -> ... . , $)
+        return self._to_dfa(full, trans)
+
+    def _to_dfa(self, states: List[Dict[int, Set[int]]],
+                trans: Dict[Tuple[int, str], int],
+                entries: Optional[List[_StateEntry]] = None) -> DFA:
+        """
+        Materializa estados (núcleo -> ids de lookahead) como conjuntos de LR1Item.
+        Con entries (modo incremental) los estados ya materializados se reutilizan.
+        """
+        prods, terms = self.productions, self.term_list
+        end_id = self.term_id[END]
+        # Un mismo ítem aparece en muchos estados: se comparte un único objeto
+        interned: Dict[int, LR1Item] = {}
+        d_states: List[Set[LR1Item]] = []
         d_accept: Set[int] = set()
-        for i, st in enumerate(d_states):
-            for it in st:
-                if it.left == self.S_ and it.at_end() and it.look == END:
-                    d_accept.add(i)
-                    break
+        d_index: Dict[frozenset, int] = {}
+        for k, items in enumerate(states):
+            states[k] = None   # se libera el mapa por núcleo a medida que se materializa
+            if end_id in items.get(1, ()):   # núcleo 1 = S' -> S . , $
+                d_accept.add(k)
+            entry = entries[k] if entries is not None else None
+            if entry is not None and entry.origin is not None:
+                self._patch_items(entry, interned)
+            if entry is not None and entry.items is not None:
+                d_states.append(entry.items)
+                d_index[entry.frozen] = k
+                continue
+            S: Set[LR1Item] = set()
+            for core, L in items.items():
+                for a in L:
+                    key = (core << LOOK_BITS) | a
+                    it = interned.get(key)
+                    if it is None:
+                        it = interned[key] = LR1Item(prods[core >> DOT_BITS], core & DOT_MASK, terms[a], a)
+                    S.add(it)
+            d_states.append(S)
+            frozen = frozenset(S)
+            d_index[frozen] = k
+            if entry is not None:
+                entry.items, entry.frozen = S, frozen
+        succ: List[List[Tuple[str, int]]] = [[] for _ in d_states]
+        for (i, X), j in trans.items():
+            succ[i].append((X, j))
+        return DFA(states=d_states, trans=trans, start=0, accept=d_accept,
+                   labels={X for (_, X) in trans}, index=d_index, succ=succ)
 
-        dfa = DFA(states=d_states, trans=d_trans, start=0, accept=d_accept, labels=set(sorted_labels), index=d_index)
+    def _patch_items(self, entry: _StateEntry, interned: Dict[int, LR1Item]) -> None:
+        """
+        Materializa entry a partir de su equivalente en base: copia el conjunto
+        de ítems anterior (la copia no vuelve a calcular hashes) y sólo crea,
+        agrega o quita los ítems en que difieren los cierres. Si difieren en
+        más de la mitad, deja entry sin materializar.
+        """
+        origin, entry.origin = entry.origin, None
+        old, new = origin.closure, entry.closure
+        if old == new:
+            entry.items, entry.frozen = origin.items, origin.frozen
+            return
+        added: List[int] = []
+        removed: List[int] = []
+        for core, L in new.items():
+            O = old.get(core)
+            if O is None:
+                added.extend((core << LOOK_BITS) | a for a in L)
+            elif L != O:
+                added.extend((core << LOOK_BITS) | a for a in L - O)
+                removed.extend((core << LOOK_BITS) | a for a in O - L)
+        for core, O in old.items():
+            if core not in new:
+                removed.extend((core << LOOK_BITS) | a for a in O)
+        if 2 * (len(added) + len(removed)) > len(origin.items):
+            return
 
-        return dfa
+        prods, old_prods, terms = self.productions, self._base.productions, self.term_list
+        S = set(origin.items)
+        for key in removed:
+            core, a = key >> LOOK_BITS, key & LOOK_MASK
+            S.discard(LR1Item(old_prods[core >> DOT_BITS], core & DOT_MASK, terms[a], a))
+        for key in added:
+            it = interned.get(key)
+            if it is None:
+                core, a = key >> LOOK_BITS, key & LOOK_MASK
+                it = interned[key] = LR1Item(prods[core >> DOT_BITS], core & DOT_MASK, terms[a], a)
+            S.add(it)
+        entry.items, entry.frozen = S, frozenset(S)
+
+    def _reductions(self, closure: Dict[int, Set[int]]) -> Tuple[Dict[str, List[Production]], bool]:
+        """Reducciones (lookahead -> producciones) y accept de un estado, desde su cierre por núcleo."""
+        prods, terms = self.productions, self.term_list
+        reduces: Dict[str, List[Production]] = {}
+        accept = False
+        for core, L in closure.items():
+            prod = prods[core >> DOT_BITS]
+            if core & DOT_MASK == len(prod.rhs):
+                if prod.id == 0:
+                    accept = True   # S' -> S . sólo tiene lookahead $
+                else:
+                    for a in L:
+                        reduces.setdefault(terms[a], []).append(prod)
+        return reduces, accept
 
-    def build_tables(self):
+    def build_tables(self, conflicts: Optional[List[Conflict]] = None):
         """
-        Construye ACTION y GOTO usando el AFD almacenado en self.dfa.
+        Construye ACTION y GOTO usando el AFD almacenado en self.afd.
+        Se llama una sola vez por autómata (en __init__); el resultado queda
+        en self.tables y es de sólo lectura, para reutilizarlo sin copiar.
+        Recorre cada transición y cada ítem una vez, vía las listas de
+        adyacencia dfa.succ.
+
+        Las celdas con varias acciones se resuelven con _resolve.
 
         Parámetros:
-            use_dfa_transitions: si True utiliza directamente dfa.trans para SHIFT y GOTO.
-                                 si False, usa dfa.trans para SHIFT y calcula GOTO con self.goto().
-            ensure_dfa: si True, construye self.dfa si no existe (llama a build_dfa()).
+            conflicts: si se pasa una lista, se acumulan en ella todos los
+                       conflictos (resueltos o no); si no, el primer conflicto
+                       sin resolver lanza ValueError.
+
+        Las acciones candidatas de cada celda con un conflicto sin resolver
+        quedan en self.alternatives (las usa el parser GLR, ver glr.py).
 
         Retorna:
-            ACTION, GOTO, dfa.states
+            ACTION, GOTO (MappingProxyType), dfa.states
         """
 
         dfa = self.afd
+        T, N = self.T, self.N
+        entries = self._entries if self.mode == "lr1" else None
         ACTION: Dict[Tuple[int, str], Tuple[str, int | Production | None]] = {}
         GOTO: Dict[Tuple[int, str], int] = {}
+        self.alternatives: Dict[Tuple[int, str], List[Tuple[str, int | Production | None]]] = {}
 
-        # --- 1) SHIFTS y REDUCE/ACCEPT por ítems en cada estado del DFA ---
         for i, I in enumerate(dfa.states):
-            # (A) Si usamos dfa.trans para shifts, aplicamos esas transiciones
-            # recorremos todas las transiciones que parten de i
-            for (s, label), j in dfa.trans.items():
-                if s != i:
-                    continue
-                # shift sólo para terminales
-                if label in self.T:
-                    self._set_action(ACTION, i, label, ("shift", j))
+            # shifts (terminales) y GOTO (no terminales) desde las aristas salientes de i
+            shifts: Dict[str, int] = {}
+            for label, j in dfa.succ[i]:
+                if label in T:
+                    shifts[label] = j
+                elif label in N:
+                    GOTO[(i, label)] = j
             # las reducciones/accept deben revisarse por los ítems contenidos en I
-            for it in I:
-                if it.at_end():
-                    if it.left == self.S_ and it.look == END:
-                        self._set_action(ACTION, i, END, ("accept", None))
-                    else:
-                        prod = Production(it.left, list(it.right))
-                        self._set_action(ACTION, i, it.look, ("reduce", prod))
-
-        # --- 2) GOTO: preferir transiciones del DFA (si están), o calcular con goto() ---
-        for (s, label), j in dfa.trans.items():
-            if label in self.N:
-                GOTO[(s, label)] = j
-        
-        return ACTION, GOTO, dfa.states
+            # (en modo incremental salen del cierre y se reutilizan las de un
+            # estado que no cambió)
+            entry = entries[i] if entries is not None else None
+            if entry is not None:
+                if entry.reduces is None:
+                    entry.reduces, entry.accept = self._reductions(entry.closure)
+                reduces, accept = entry.reduces, entry.accept
+            else:
+                reduces: Dict[str, List[Production]] = {}
+                accept = False
+                for it in I:
+                    if it.at_end():
+                        if it.prod.id == 0 and it.look == END:
+                            accept = True
+                        else:
+                            reduces.setdefault(it.look, []).append(it.prod)
+
+            for a, j in shifts.items():
+                if a not in reduces:
+                    ACTION[(i, a)] = ("shift", j)
+            for a, plist in reduces.items():
+                shift = shifts.get(a)
+                acc = accept and a == END
+                if shift is None and not acc and len(plist) == 1:
+                    ACTION[(i, a)] = ("reduce", plist[0])
+                    continue
+                entry, conflict = self._resolve(i, a, I, shift, plist, acc)
+                if conflicts is None and not conflict.resolved:
+                    raise ValueError(str(conflict))
+                if conflicts is not None:
+                    conflicts.append(conflict)
+                if not conflict.resolved:
+                    self.alternatives[(i, a)] = ([("accept", None)] if acc else []) + \
+                        ([("shift", shift)] if shift is not None else []) + [("reduce", p) for p in plist]
+                if entry is not None:
+                    ACTION[(i, a)] = entry
+            if accept and END not in reduces:
+                ACTION[(i, END)] = ("accept", None)
+
+        return MappingProxyType(ACTION), MappingProxyType(GOTO), dfa.states
+
+    def compile_tables(self) -> CompiledTables:
+        """ACTION/GOTO codificadas como arreglos de enteros (ver compiled.py); se compilan una vez."""
+        if self._compiled is None:
+            self._compiled = CompiledTables.from_builder(self)
+        return self._compiled
+
+    def pack_tables(self) -> PackedTables:
+        """Tablas comprimidas (reducciones por defecto + peine); se conservan los errores de %nonassoc."""
+        if self._packed is None:
+            keep = {c.state for c in self.conflicts if c.chosen == "error"}
+            self._packed = self.compile_tables().pack(keep)
+        return self._packed
+
+    def save_tables(self, path: str) -> None:
+        """Guarda las tablas compiladas en disco; se cargan con compiled.load_tables()."""
+        self.compile_tables().save(path)
+
+def _fmt_item(it: LR1Item) -> str:
+    right = list(it.right)
+    right.insert(it.dot, "·")
+    return f"{it.left} → {' '.join(right)} , {it.look}"
+
+def _fmt_action(entry) -> str:
+    kind, data = entry
+    if kind == "shift":
+        return f"shift {data}"
+    if kind == "reduce":
+        return f"reduce {data.left} → {' '.join(data.right) if data.right else 'ε'}"
+    return "accept"
+
+@dataclass(slots=True)
+class _StateEntry:
+    """Estado de la colección canónica guardado para reconstrucciones incrementales."""
+    key: frozenset                     # kernel (_kernel_key)
+    closure: Dict[int, Set[int]]       # núcleo -> ids de lookahead
+    deps: frozenset                    # no terminales de los que depende el cierre
+    items: Optional[Set[LR1Item]] = None
+    frozen: Optional[frozenset] = None           # frozenset(items), clave de DFA.index
+    reduces: Optional[Dict[str, List[Production]]] = None
+    accept: bool = False
+    origin: Optional["_StateEntry"] = None       # equivalente en base, hasta materializarse
+
+def _kernel_key(kernel: Dict[int, Set[int]]) -> frozenset:
+    return frozenset((core, frozenset(L)) for core, L in kernel.items())
+
+def _weakly_compatible(L1: List[Set[int]], L2: List[Set[int]]) -> bool:
+    """
+    Compatibilidad débil de Pager entre dos estados con el mismo núcleo:
+    para todo i < j,  (L1i ∩ L2j) ∪ (L2i ∩ L1j) = ∅  o  L1i ∩ L1j ≠ ∅  o  L2i ∩ L2j ≠ ∅.
+    """
+    n = len(L1)
+    for i in range(n):
+        for j in range(i + 1, n):
+            if (L1[i] & L2[j]) or (L2[i] & L1[j]):
+                if not (L1[i] & L1[j]) and not (L2[i] & L2[j]):
+                    return False
+    return True
+
+class TraceStep(NamedTuple):
+    """Un paso de la traza como delta respecto del anterior (no una foto de la pila)."""
+    op: str          # "shift" | "reduce" | "accept" | "error"
+    state: int       # estado apilado (shift/reduce) o estado actual (accept/error)
+    pos: int         # índice del token de entrada que se está mirando
+    pop: int = 0     # estados desapilados (reduce)
+    prod: int = -1   # id de producción (reduce)
+
+class ParseResult(NamedTuple):
+    """Resultado de una entrada en parse_batch."""
+    accepted: bool
+    error_pos: int     # índice del token donde falló; -1 si se aceptó
+    seconds: float     # tiempo de internado + reconocimiento
+
+BATCH_CHUNK = 256   # entradas por tarea enviada al pool
+_DIFF_BLOCK = 256   # tokens por comparación en IncrementalParse.update
 
 class LR1Parser:
-    def __init__(self, builder: LR1Builder):
+    """
+    Driver LR(1) sobre tablas compiladas a enteros (ver compiled.py):
+    los tokens se internan una vez y el bucle sólo indexa arreglos planos.
+    Acepta tablas densas (CompiledTables) o comprimidas (PackedTables).
+    """
+    def __init__(self, builder: Optional[LR1Builder] = None,
+                 tables: Optional[CompiledTables | PackedTables] = None):
+        if builder is None and tables is None:
+            raise ValueError("LR1Parser necesita un LR1Builder o tablas compiladas")
         self.builder = builder
-        self.ACTION, self.GOTO, self.states = builder.build_tables()
+        if builder is not None:
+            self.ACTION, self.GOTO, self.states = builder.tables
+        self.tables: CompiledTables | PackedTables = tables if tables is not None else builder.compile_tables()
+        self._shared_path: Optional[str] = None
+
+    @classmethod
+    def from_tables(cls, tables: CompiledTables | PackedTables) -> "LR1Parser":
+        """Parser a partir de tablas precompiladas (compiled.load_tables) o comprimidas (pack_tables)."""
+        return cls(tables=tables)
 
     def parse(self, tokens: List[str]) -> bool:
         if not tokens or tokens[-1] != END:
             tokens = tokens + [END]
+        return self.parse_ids(self.tables.symbol_ids(tokens), tokens)
+
+    def parse_ids(self, ids: List[int], tokens: Optional[List[str]] = None) -> bool:
+        """Reconoce una secuencia de ids de terminales (debe terminar en el id de $)."""
+        ok, ip, state = self.run_ids(ids)
+        if not ok:
+            t = self.tables
+            a = ids[ip]
+            name = tokens[ip] if tokens is not None else t.symbols[a] if a >= 0 else "?"
+            log.info("[LR1] error en estado %d con lookahead '%s'", state, name)
+        return ok
+
+    def run_ids(self, ids: List[int]) -> Tuple[bool, int, int]:
+        """
+        Camino rápido sin traza: (aceptada, posición del token, estado).
+        Si no se acepta, posición y estado indican dónde falló.
+        """
+        t = self.tables
+        if isinstance(t, PackedTables):
+            return self._run_packed(ids)
+        action, goto = t.action, t.goto
+        nT, nN = t.n_terminals, t.n_nonterminals
+        plen, pcol = t.prod_len, t.prod_goto_col
+
+        stack: List[int] = [0]
         ip = 0
-        stack_states: List[int] = [0]
-        stack_syms: List[str] = []
+        a = ids[0]
+        while True:
+            s = stack[-1]
+            code = action[s * nT + a] if a >= 0 else ACT_ERROR
+            kind = code & 3
+            if kind == ACT_SHIFT:
+                stack.append(code >> 2)
+                ip += 1
+                a = ids[ip]
+            elif kind == ACT_REDUCE:
+                p = code >> 2
+                k = plen[p]
+                if k:
+                    del stack[-k:]
+                j = goto[stack[-1] * nN + pcol[p]]
+                if j < 0:
+                    return False, ip, stack[-1]
+                stack.append(j)
+            elif kind == ACT_ACCEPT:
+                return True, ip, s
+            else:
+                return False, ip, s
 
+    def _run_packed(self, ids: List[int]) -> Tuple[bool, int, int]:
+        """run_ids sobre tablas comprimidas, con la búsqueda en el peine en línea."""
+        t: PackedTables = self.tables
+        row, default, base, check, nxt = t.act_row, t.act_default, t.act_base, t.act_check, t.act_next
+        g_default, g_base, g_check, g_next = t.goto_default, t.goto_base, t.goto_check, t.goto_next
+        plen, pcol = t.prod_len, t.prod_goto_col
+
+        stack: List[int] = [0]
+        ip = 0
+        a = ids[0]
         while True:
-            s = stack_states[-1]
-            a = tokens[ip]
-            act = self.ACTION.get((s, a))
-            if act is None:
-                print(f"[LR1] error en estado {s} con lookahead '{a}'")
-                return False
-
-            kind, data = act
-            if kind == "shift":
-                j = int(data)  # type: ignore
-                stack_syms.append(a)
-                stack_states.append(j)
+            s = stack[-1]
+            if a >= 0:
+                r = row[s]
+                i = base[r] + a
+                code = nxt[i] if check[i] == r else default[r]
+            else:
+                code = ACT_ERROR
+            kind = code & 3
+            if kind == ACT_SHIFT:
+                stack.append(code >> 2)
                 ip += 1
-            elif kind == "reduce":
-                prod: Production = data  # type: ignore
-                k = len(prod.right)
-                for _ in range(k):
-                    stack_syms.pop()
-                    stack_states.pop()
-                t = stack_states[-1]
-                j = self.GOTO.get((t, prod.left))
-                if j is None:
-                    print(f"[LR1] GOTO indefinido desde estado {t} con {prod.left}")
-                    return False
-                stack_syms.append(prod.left)
-                stack_states.append(j)
-            elif kind == "accept":
-                return True
+                a = ids[ip]
+            elif kind == ACT_REDUCE:
+                p = code >> 2
+                k = plen[p]
+                if k:
+                    del stack[-k:]
+                n = pcol[p]
+                i = g_base[n] + stack[-1]
+                j = g_next[i] if g_check[i] == n else g_default[n]
+                if j < 0:
+                    return False, ip, stack[-1]
+                stack.append(j)
+            elif kind == ACT_ACCEPT:
+                return True, ip, s
+            else:
+                return False, ip, s
+
+    def run_bytes(self, data: bytes | bytearray | memoryview | str, lexer: Lexer) -> Tuple[bool, int, int]:
+        """
+        Lexer y parser en un solo recorrido: el parser pide cada token al AFD
+        del lexer (lexer.py) a medida que lo necesita, sin lista de tokens ni
+        strings intermedios. El lexer debe estar ligado a estas tablas
+        (Lexer.for_tables o Lexer.bind).
+        Retorna (aceptada, offset en bytes del token que falló, estado);
+        el estado es -1 si el error es léxico.
+        """
+        t = self.tables
+        action, goto = t.action_code, t.goto_state
+        plen, pcol = t.prod_len, t.prod_goto_col
+        tokens = lexer.scan(data)
+        try:
+            a, at, _end = next(tokens)
+            stack: List[int] = [0]
+            while True:
+                s = stack[-1]
+                code = action(s, a)
+                kind = code & 3
+                if kind == ACT_SHIFT:
+                    stack.append(code >> 2)
+                    a, at, _end = next(tokens)
+                elif kind == ACT_REDUCE:
+                    p = code >> 2
+                    k = plen[p]
+                    if k:
+                        del stack[-k:]
+                    j = goto(stack[-1], pcol[p])
+                    if j < 0:
+                        return False, at, stack[-1]
+                    stack.append(j)
+                elif kind == ACT_ACCEPT:
+                    return True, at, s
+                else:
+                    return False, at, s
+        except LexError as e:
+            return False, e.pos, -1
+
+    def run_one(self, tokens: Sequence[str] | str) -> ParseResult:
+        """Reconoce una entrada (lista de tokens o texto separado por espacios) y la cronometra."""
+        t0 = time.perf_counter()
+        toks = tokens.split() if isinstance(tokens, str) else list(tokens)
+        if not toks or toks[-1] != END:
+            toks.append(END)
+        ok, ip, _state = self.run_ids(self.tables.symbol_ids(toks))
+        return ParseResult(ok, -1 if ok else ip, time.perf_counter() - t0)
+
+    def parse_batch(self, inputs: Sequence[Sequence[str] | str],
+                    executor: Optional[Executor] = None,
+                    workers: Optional[int] = None,
+                    chunksize: int = BATCH_CHUNK) -> List[ParseResult]:
+        """
+        Reconoce muchas entradas con las mismas tablas, repartidas en bloques
+        sobre un pool de procesos. Los procesos no reciben las tablas por pickle:
+        las abren con mmap desde el archivo binario (compiled.py), de modo que
+        comparten las mismas páginas de sólo lectura.
+
+        executor: pool a reutilizar (si no se pasa, se crea uno con `workers`
+                  procesos y se cierra al terminar). Lotes pequeños, workers=1
+                  o tablas comprimidas (sin formato en disco) se procesan en
+                  este mismo proceso.
+        Retorna un ParseResult por entrada, en el mismo orden.
+        """
+        path = self._tables_path()
+        if path is None or workers == 1 or len(inputs) <= chunksize:
+            return [self.run_one(x) for x in inputs]
+
+        chunks = [inputs[i:i + chunksize] for i in range(0, len(inputs), chunksize)]
+        own = executor is None
+        pool = executor if executor is not None else ProcessPoolExecutor(max_workers=workers)
+        try:
+            out: List[ParseResult] = []
+            for part in pool.map(_batch_worker, [path] * len(chunks), chunks):
+                out.extend(ParseResult(*r) for r in part)
+            return out
+        finally:
+            if own:
+                pool.shutdown()
+
+    def _tables_path(self) -> Optional[str]:
+        """Archivo con las tablas densas para compartir con los procesos del pool."""
+        t = self.tables
+        if not isinstance(t, CompiledTables):
+            if self.builder is None:
+                return None
+            t = self.builder.compile_tables()
+        # el archivo propio de las tablas sólo si sigue siendo el suyo
+        if t.path is not None and t.matches_file(t.path):
+            return t.path
+        if self._shared_path is None:
+            # temporal de este parser: no se anota en t.path, porque se borra
+            # cuando el parser muere y t puede sobrevivirle (caché del builder)
+            fd, path = tempfile.mkstemp(prefix="lr1-", suffix=".lr1t")
+            os.close(fd)
+            t.write(path)
+            self._shared_path = path
+            weakref.finalize(self, _unlink_quietly, path)
+        return self._shared_path
+
+    def trace(self, tokens: List[str]) -> Iterator[TraceStep]:
+        """
+        Ejecuta el parser y produce la traza paso a paso como deltas (TraceStep),
+        sin copiar la pila ni la entrada en cada paso: O(1) por paso, de modo
+        que se puede consumir en streaming. Termina con un paso "accept" o "error".
+        """
+        if not tokens or tokens[-1] != END:
+            tokens = tokens + [END]
+        ids = self.tables.symbol_ids(tokens)
+        t = self.tables
+        action, goto = t.action_code, t.goto_state
+        plen, pcol = t.prod_len, t.prod_goto_col
+
+        stack: List[int] = [0]
+        ip = 0
+        a = ids[0]
+        while True:
+            s = stack[-1]
+            code = action(s, a) if a >= 0 else ACT_ERROR
+            kind = code & 3
+            if kind == ACT_SHIFT:
+                j = code >> 2
+                stack.append(j)
+                yield TraceStep("shift", j, ip)
+                ip += 1
+                a = ids[ip]
+            elif kind == ACT_REDUCE:
+                p = code >> 2
+                k = plen[p]
+                if k:
+                    del stack[-k:]
+                j = goto(stack[-1], pcol[p])
+                if j < 0:
+                    yield TraceStep("error", stack[-1], ip)
+                    return
+                stack.append(j)
+                yield TraceStep("reduce", j, ip, k, p)
+            elif kind == ACT_ACCEPT:
+                yield TraceStep("accept", s, ip)
+                return
+            else:
+                yield TraceStep("error", s, ip)
+                return
+
+    def parse_tree(self, tokens: Sequence[str]) -> ParseTree:
+        """
+        Reconoce la entrada y construye su árbol de derivación en un arena
+        (ver tree.py): un nodo hoja por shift y uno interno por reduce, cuyos
+        hijos son los nodos que el reduce saca de la pila.
+        Lanza ValueError si la entrada no se acepta.
+        """
+        toks = list(tokens)
+        if not toks or toks[-1] != END:
+            toks.append(END)
+        t = self.tables
+        ids = t.symbol_ids(toks)
+        action, goto = t.action_code, t.goto_state
+        plen, pcol, nT = t.prod_len, t.prod_goto_col, t.n_terminals
+
+        tree = ParseTree(t, toks[:-1])
+        sym, pos, kids = tree.sym, tree.pos, tree.kids
+        # métodos ligados: el bucle hace cuatro append por nodo
+        add_sym, add_prod, add_pos, add_first = sym.append, tree.prod.append, pos.append, tree.first.append
+        stack: List[int] = [0]
+        nodes: List[int] = []       # nodo de cada símbolo de la pila (uno menos que estados)
+        ip = 0
+        a = ids[0]
+        while True:
+            s = stack[-1]
+            code = action(s, a) if a >= 0 else ACT_ERROR
+            kind = code & 3
+            if kind == ACT_SHIFT:
+                stack.append(code >> 2)
+                nodes.append(len(sym))
+                add_sym(a)
+                add_prod(-1)
+                add_pos(ip)
+                add_first(-1)
+                ip += 1
+                a = ids[ip]
+            elif kind == ACT_REDUCE:
+                p = code >> 2
+                k = plen[p]
+                n = len(sym)
+                add_first(len(kids))
+                if k:
+                    kids.extend(nodes[-k:])
+                    add_pos(pos[nodes[-k]])
+                    del nodes[-k:]
+                    del stack[-k:]
+                else:
+                    add_pos(ip)
+                add_sym(nT + pcol[p])
+                add_prod(p)
+                j = goto(stack[-1], pcol[p])
+                if j < 0:
+                    raise ValueError(f"Parse error en estado {stack[-1]} con token '{toks[ip]}'")
+                stack.append(j)
+                nodes.append(n)
+            elif kind == ACT_ACCEPT:
+                tree.root = nodes[-1]
+                return tree
             else:
-                raise RuntimeError("Acción desconocida")
+                raise ValueError(f"Parse error en estado {s} con token '{toks[ip]}'")
+
+    def incremental(self, tokens: Sequence[str] = ()) -> "IncrementalParse":
+        """Sesión de reconocimiento incremental sobre estas tablas (ver IncrementalParse)."""
+        return IncrementalParse(self, tokens)
+
+
+class IncrementalParse:
+    """
+    Reconocimiento incremental de una entrada que se va editando, al estilo
+    de Wagner–Graham, sobre las tablas compiladas de un LR1Parser.
+
+    Las pilas son listas enlazadas persistentes (estado, resto, altura), así
+    que guardar la pila de cada posición cuesta O(1): la pila i es la de
+    justo después de desplazar el token i-1, antes de mirar el token i
+    (ninguna reducción que dependa de él se hizo todavía).
+
+    Tras editar los tokens [start, end) se retoma desde la pila de start; en
+    cuanto, ya pasada la edición, la pila coincide con una guardada en la
+    misma posición cuyo análisis siguiente no tocó ninguna edición, el resto
+    es idéntico y se reutiliza (pilas y resultado). Las pilas posteriores a
+    un error se conservan, así que corregir el error también es barato.
+    El trabajo es proporcional a la zona que la edición realmente afecta.
+    """
+    def __init__(self, parser: LR1Parser, tokens: Sequence[str] = ()):
+        self.parser = parser
+        t = parser.tables
+        self.tokens: List[str] = list(tokens)
+        self._ids: List[int] = t.symbol_ids(self.tokens) + [t.symbol_id(END)]
+        # pila y corrida que la produjo, por posición (None si no hay)
+        self._stacks: List[Optional[tuple]] = [None] * len(self._ids)
+        self._run_of: List[Optional[_Run]] = [None] * len(self._ids)
+        self._runs: "weakref.WeakSet[_Run]" = weakref.WeakSet()
+        self.accepted = False
+        self.error_pos = -1      # índice del token donde falló; -1 si se aceptó
+        self.error_state = -1    # estado en el que falló
+        self.reparsed = 0        # tokens desplazados en la última operación
+        self._stop = 0           # posición donde terminó el análisis (error o $)
+        t0 = time.perf_counter()
+        self._run(0, (0, None, 1), len(self._ids))
+        self.seconds = time.perf_counter() - t0
+
+    def result(self) -> ParseResult:
+        return ParseResult(self.accepted, self.error_pos, self.seconds)
+
+    def update(self, tokens: Sequence[str]) -> ParseResult:
+        """Reanaliza con la nueva versión completa de la entrada; el tramo editado se deduce comparando."""
+        old, new = self.tokens, list(tokens)
+        n = min(len(old), len(new))
+        # prefijo y sufijo comunes comparando por bloques (la comparación de
+        # listas es nativa) y luego token a token
+        p = 0
+        while p + _DIFF_BLOCK <= n and old[p:p + _DIFF_BLOCK] == new[p:p + _DIFF_BLOCK]:
+            p += _DIFF_BLOCK
+        while p < n and old[p] == new[p]:
+            p += 1
+        s, lo, ln = 0, len(old), len(new)
+        while s + _DIFF_BLOCK <= n - p and \
+                old[lo - s - _DIFF_BLOCK:lo - s] == new[ln - s - _DIFF_BLOCK:ln - s]:
+            s += _DIFF_BLOCK
+        while s < n - p and old[lo - 1 - s] == new[ln - 1 - s]:
+            s += 1
+        return self.edit(p, lo - s, new[p:ln - s])
+
+    def edit(self, start: int, end: int, new_tokens: Sequence[str]) -> ParseResult:
+        """Reemplaza tokens[start:end] por new_tokens y reanaliza lo necesario."""
+        if not 0 <= start <= end <= len(self.tokens):
+            raise IndexError(f"Edición fuera de rango: [{start}, {end}) con {len(self.tokens)} tokens")
+        t0 = time.perf_counter()
+        ins = list(new_tokens)
+        delta = len(ins) - (end - start)
+        self.tokens[start:end] = ins
+        self._ids[start:end] = self.parser.tables.symbol_ids(ins)
+
+        # Pilas: se conservan las de 0..start y las de end.. (desplazadas); la
+        # de end (antes del primer token que sigue a la edición) queda en
+        # start + len(ins), salvo en un borrado puro, donde esa posición es start.
+        for seq in (self._stacks, self._run_of):
+            if not ins:
+                del seq[start + 1:end + 1]
+            elif end > start:
+                seq[start + 1:end] = [None] * (len(ins) - 1)
+            else:   # inserción pura: la de start queda en ambos lugares
+                seq[start + 1:start + 1] = [None] * (len(ins) - 1) + [seq[start]]
+
+        # El análisis que hizo cada corrida desde una posición p sólo sigue
+        # valiendo si ninguna edición cayó entre p y donde la corrida terminó
+        first = start + max(len(ins), 1)
+        for run in list(self._runs):
+            if run.last < start:
+                continue
+            run.first = run.first + delta if run.first >= end else first
+            run.last += delta
+
+        if start > self._stop:
+            # el análisis ya se había detenido (error) antes del tramo editado
+            self.error_pos = self._stop
+            self.reparsed = 0
+        else:
+            self._run(start, self._stacks[start], first)
+        self.seconds = time.perf_counter() - t0
+        return self.result()
+
+    def _run(self, ip: int, stack: tuple, sync_from: int) -> None:
+        t = self.parser.tables
+        action, goto = t.action_code, t.goto_state
+        plen, pcol = t.prod_len, t.prod_goto_col
+        ids, stacks, run_of = self._ids, self._stacks, self._run_of
+        run = _Run(ip)
+        self._runs.add(run)
+        start = ip
+        stacks[ip], run_of[ip] = stack, run
+        a = ids[ip]
+        while True:
+            s = stack[0]
+            code = action(s, a) if a >= 0 else ACT_ERROR
+            kind = code & 3
+            if kind == ACT_SHIFT:
+                stack = (code >> 2, stack, stack[2] + 1)
+                ip += 1
+                if ip >= sync_from:
+                    other = run_of[ip]
+                    if other is not None and other.first <= ip <= other.last \
+                            and _same_stack(stack, stacks[ip]):
+                        # misma pila y misma entrada restante: el resto ya se analizó
+                        run.last, run.accepted, run.state = other.last, other.accepted, other.state
+                        self._finish(run, ip - start)
+                        return
+                stacks[ip], run_of[ip] = stack, run
+                a = ids[ip]
+            elif kind == ACT_REDUCE:
+                p = code >> 2
+                for _ in range(plen[p]):
+                    stack = stack[1]
+                j = goto(stack[0], pcol[p])
+                if j < 0:
+                    run.last, run.state = ip, stack[0]
+                    self._finish(run, ip - start)
+                    return
+                stack = (j, stack, stack[2] + 1)
+            else:
+                run.last, run.accepted, run.state = ip, kind == ACT_ACCEPT, s
+                self._finish(run, ip - start)
+                return
+
+    def _finish(self, run: "_Run", reparsed: int) -> None:
+        self._stop = run.last
+        self.accepted = run.accepted
+        self.error_pos = -1 if run.accepted else run.last
+        self.error_state = -1 if run.accepted else run.state
+        self.reparsed = reparsed
+
+class _Run:
+    """
+    Una pasada de IncrementalParse. Sus pilas desde `first` hasta `last`
+    (donde terminó: error o $) siguen describiendo la entrada actual.
+    """
+    __slots__ = ("first", "last", "accepted", "state", "__weakref__")
+
+    def __init__(self, first: int):
+        self.first = first
+        self.last = first
+        self.accepted = False
+        self.state = -1
+
+def _same_stack(a: tuple, b: tuple) -> bool:
+    """Compara dos pilas enlazadas; se detiene en el primer nodo compartido."""
+    if a[2] != b[2]:
+        return False
+    while a is not b:
+        if a[0] != b[0]:
+            return False
+        a, b = a[1], b[1]
+    return True
+
+
+# ---------------------------------------------------------------
+# Procesos del pool de parse_batch
+# ---------------------------------------------------------------
+_WORKER_PARSERS: "OrderedDict[str, LR1Parser]" = OrderedDict()
+_WORKER_MAX_TABLES = 8
+
+def _batch_worker(path: str, chunk: Sequence[Sequence[str] | str]) -> List[Tuple[bool, int, float]]:
+    """Tarea del pool: abre (una vez por proceso) las tablas con mmap y reconoce el bloque."""
+    # el nombre de un temporal puede reutilizarse: la clave incluye inodo y mtime
+    st = os.stat(path)
+    key = f"{path}:{st.st_ino}:{st.st_mtime_ns}"
+    parser = _WORKER_PARSERS.get(key)
+    if parser is None:
+        parser = _WORKER_PARSERS[key] = LR1Parser.from_tables(load_tables(path))
+        while len(_WORKER_PARSERS) > _WORKER_MAX_TABLES:
+            _, old = _WORKER_PARSERS.popitem(last=False)
+            old.tables.close()
+    else:
+        _WORKER_PARSERS.move_to_end(key)
+    return [tuple(parser.run_one(x)) for x in chunk]
+
+def _unlink_quietly(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
@@ -1,16 +1,39 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Dict, List, Tuple, Optional, Set
-from lr1 import LR1Builder, LR1Item, NFA, DFA
-from grammar import Grammar
+from pydantic import BaseModel, Field
+from typing import Dict, Iterator, List, Tuple, Optional, Set
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from lr1 import LR1Builder, LR1Item, LR1Parser, IncrementalParse, Conflict, NFA, DFA
+from grammar import Grammar, tokenize_rules
 from first_ import First
+from cache import AutomatonCache, grammar_key, normalize_grammar
+from compiled import CompiledTables
+from tree import ParseTree
+from lexer import Lexer, LexError
+from glr import GLRParser, ParseForest
+from metrics import Registry, CONTENT_TYPE, SIZE_BUCKETS
 from fastapi import Response, Query
-from graphviz import Source
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 EPS = "''"   
 END = "$"
 
+# Nivel de log de los módulos del backend (DEBUG muestra N, T, producciones
+# y FIRST de cada construcción)
+logging.basicConfig(level=os.environ.get("LR1_LOG_LEVEL", "WARNING").upper(),
+                    format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+log = logging.getLogger("main")
+
 app = FastAPI()
 
 ALLOWED_ORIGINS = [
@@ -26,10 +49,25 @@ app.add_middleware(
     allow_credentials=False,         # pon True solo si usas cookies/autenticación
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Automaton-View"],
 )
 
+BUILD_MODE_PATTERN = "^(lr1|lalr|pager)$"
+
 class BuildRequest(BaseModel):
     rules: str
+    mode: str = Field("lr1", pattern=BUILD_MODE_PATTERN)   # lr1 (canónico) | lalr | pager (LR(1) mínimo)
+    tolerant: bool = False             # no fallar ante conflictos: resolverlos y reportarlos
+
+class ConflictDTO(BaseModel):
+    state: int
+    lookahead: str
+    kind: str                          # "shift/reduce" | "reduce/reduce" | "accept/reduce"
+    actions: List[str]
+    chosen: str
+    resolution: str                    # "precedence" | "associativity" | "default"
+    resolved: bool
+    items: List[str]
 
 class BuildResponse(BaseModel):
     states: List[List[str]]            # cada ítem serializado "A→α|dot|look"
@@ -39,10 +77,22 @@ class BuildResponse(BaseModel):
     nonTerminals: Set[str]
     firsts: Dict[str, Set[str]]
     initialSymbol: str
+    mode: str                          # modo realmente usado (lalr/pager pueden caer a lr1)
+    mergeConflicts: List[str]          # conflictos que provocó la fusión de estados
+    conflicts: List[ConflictDTO]       # todos los conflictos de la tabla final
 
 class ParseRequest(BaseModel):
     input: str
     rules: str
+    mode: str = Field("lr1", pattern=BUILD_MODE_PATTERN)
+    tolerant: bool = False
+    # terminal -> regex: si viene (aunque sea {}), la entrada se escanea con
+    # un AFD (lexer.py) en lugar de separarse por espacios; los terminales
+    # sin patrón se reconocen literalmente
+    lexer: Optional[Dict[str, str]] = None
+    # id del cliente (p. ej. una pestaña del editor): con trace=false sus
+    # entradas sucesivas se reanalizan de forma incremental
+    session: Optional[str] = Field(None, max_length=128)
 
 class StepDTO(BaseModel):
     stack: str
@@ -51,6 +101,10 @@ class StepDTO(BaseModel):
 
 class ParseResponse(BaseModel):
     steps: List[StepDTO]
+    accepted: bool = True
+    error: Optional[str] = None
+    tree: Optional[Dict] = None        # árbol de derivación (?tree=nested|flat)
+    derivations: Optional[int] = None  # ?glr=true: nº de árboles (-1 = infinitos)
 
 def _to_list_str(x):
     if isinstance(x, set):
@@ -62,95 +116,474 @@ def _to_list_str(x):
         return [str(i) for i in x]
     return [str(x)]
 
-def parse_grammar(grammar_str: str):
+def _automaton_weight(entry) -> int:
+    # peso de una entrada de caché = nº total de ítems LR(1) en el AFD
+    adapter = entry[0]
+    return sum(len(I) for I in adapter.get_afd().states)
+
+# Caché de autómatas compartida por todos los endpoints del proceso
+AUTOMATON_CACHE = AutomatonCache(
+    maxsize=int(os.environ.get("LR1_CACHE_SIZE", "32")),
+    max_weight=int(os.environ["LR1_CACHE_MAX_ITEMS"]) if "LR1_CACHE_MAX_ITEMS" in os.environ else None,
+    weigh=_automaton_weight,
+)
+
+# --- Métricas (GET /metrics) ---
+# Las construcciones corren en build_pool(): cada una mide sus fases en el
+# proceso que la hace y los datos viajan con el _Adapter; se registran al
+# volver (_record_build). Los aciertos de caché se leen de las cachés.
+METRICS = Registry()
+PHASE_SECONDS = METRICS.histogram(
+    "lr1_phase_seconds",
+    "Duración de cada fase: grammar (carga), first, nfa, dfa, tables, dot (fuente DOT), render (Graphviz)",
+    ["phase"])
+BUILD_SECONDS = METRICS.histogram(
+    "lr1_build_seconds", "Duración total de la construcción de un autómata", ["mode", "kind"])
+AUTOMATON_STATES = METRICS.histogram(
+    "lr1_automaton_states", "Estados por autómata construido (en el AFN, uno por ítem)",
+    ["automaton"], SIZE_BUCKETS)
+AUTOMATON_EDGES = METRICS.histogram(
+    "lr1_automaton_edges", "Transiciones por autómata construido", ["automaton"], SIZE_BUCKETS)
+AUTOMATON_ITEMS = METRICS.histogram(
+    "lr1_automaton_items", "Ítems LR(1) en los estados del AFD construido", [], SIZE_BUCKETS)
+BUILD_ERRORS = METRICS.counter(
+    "lr1_build_errors_total", "Construcciones fallidas (gramática inválida o con conflictos)")
+
+def _cache_samples(field: str):
+    return lambda: {("automaton",): AUTOMATON_CACHE.stats()[field],
+                    ("render",): RENDER_CACHE.stats()[field]}
+
+METRICS.collect("lr1_cache_hits_total", "Aciertos de caché", "counter", ["cache"], _cache_samples("hits"))
+METRICS.collect("lr1_cache_misses_total", "Fallos de caché", "counter", ["cache"], _cache_samples("misses"))
+METRICS.collect("lr1_cache_evictions_total", "Entradas desalojadas", "counter", ["cache"], _cache_samples("evictions"))
+METRICS.collect("lr1_cache_entries", "Entradas en caché", "gauge", ["cache"], _cache_samples("size"))
+METRICS.collect("lr1_cache_weight", "Peso de la caché (ítems LR(1) o bytes)", "gauge", ["cache"], _cache_samples("weight"))
+METRICS.collect("lr1_builds_in_flight", "Construcciones en curso", "gauge", [],
+                lambda: {(): len(_BUILDS_IN_FLIGHT)})
+
+# Sesiones de reconocimiento incremental por autómata (una por cliente que
+# manda `session` en /parse?trace=false); las menos usadas se descartan
+PARSE_SESSIONS = int(os.environ.get("LR1_PARSE_SESSIONS", "64"))
+
+class _Adapter:
+    """Vista de un LR1Builder que usan los endpoints; es lo que se guarda en la caché."""
+
+    def __init__(self, builder: LR1Builder, first: Optional[First] = None,
+                 timings: Optional[Dict[str, float]] = None, incremental: bool = False):
+        self._b = builder
+        self._first = first   # análisis FIRST/FOLLOW, base de la siguiente edición
+        # segundos por fase de la construcción (grammar, first, dfa, tables)
+        self.timings: Dict[str, float] = dict(timings or {})
+        self.incremental = incremental   # construido a partir de una base
+        self._parser: Optional[LR1Parser] = None
+        self._glr: Optional[GLRParser] = None
+        # id de cliente -> (lock, última entrada revisada por ese cliente);
+        # check_input la reanaliza de forma incremental
+        self._sessions: "OrderedDict[str, list]" = OrderedDict()
+        self._lexers: Dict[Tuple[Tuple[str, str], ...], Lexer] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # el parser (y su archivo temporal de tablas) es propio de cada proceso
+        return {"_b": self._b, "_first": self._first,
+                "timings": self.timings, "incremental": self.incremental}
+
+    def __setstate__(self, state):
+        self.__init__(state["_b"], state["_first"], state["timings"], state["incremental"])
+
+    def get_tables(self):
+        ACTION, GOTO, _states = self._b.tables
+        return ACTION, GOTO
+
+    def get_afn(self):
+        fresh = self._b._afn is None
+        nfa = self._b.afn
+        if fresh:
+            PHASE_SECONDS.observe(self._b.timings["nfa"], phase="nfa")
+            AUTOMATON_STATES.observe(len(nfa.Q), automaton="nfa")
+            AUTOMATON_EDGES.observe(len(nfa.E), automaton="nfa")
+        return nfa
+
+    def get_afd(self):
+        return self._b.afd
+
+    def get_mode(self) -> str:
+        return self._b.mode
+
+    def get_merge_conflicts(self) -> List[str]:
+        return self._b.merge_conflicts
+
+    def get_conflicts(self) -> List[Conflict]:
+        return self._b.conflicts
+
+    def get_compiled(self) -> CompiledTables:
+        return self._b.compile_tables()
+
+    def get_parser(self) -> LR1Parser:
+        if self._parser is None:
+            self._parser = LR1Parser.from_tables(self.get_compiled())
+        return self._parser
+
+    def get_glr(self) -> GLRParser:
+        if self._glr is None:
+            self._glr = GLRParser(self._b)
+        return self._glr
+
+    def glr_parse(self, input_str: str) -> Tuple[ParseForest, int]:
+        """Bosque de derivaciones (GLR) y cuántos árboles contiene; ValueError si no hay ninguno."""
+        forest = self.get_glr().parse(input_str.split())
+        return forest, forest.count()
+
+    def get_lexer(self, patterns: Dict[str, str]) -> Lexer:
+        """AFD léxico para los terminales de la gramática (uno por conjunto de patrones)."""
+        key = tuple(sorted(patterns.items()))
+        with self._lock:
+            lexer = self._lexers.get(key)
+        if lexer is None:
+            lexer = Lexer.for_tables(self.get_compiled(), patterns)
+            with self._lock:
+                lexer = self._lexers.setdefault(key, lexer)
+        return lexer
+
+    def check_bytes(self, input_str: str, patterns: Dict[str, str]) -> Tuple[bool, Optional[str]]:
+        """Como check_input, pero lexer y parser en un solo recorrido (LR1Parser.run_bytes)."""
+        data = input_str.encode("utf-8")
+        ok, at, s = self.get_parser().run_bytes(data, self.get_lexer(patterns))
+        if ok:
+            return True, None
+        if s < 0:
+            return False, f"Carácter inesperado {data[at:at + 1]!r} en la posición {at}"
+        return False, f"Parse error en estado {s} en la posición {at}"
+
+    def check_input(self, input_str: str, session: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Camino rápido sin traza: (aceptada, mensaje de error).
+        Con `session` (id del cliente) se reanaliza sólo lo que cambió
+        respecto de la última entrada de ese mismo cliente (validación en
+        cada tecla); sin él, la entrada se reconoce entera con run_ids.
+        """
+        tokens = input_str.split()
+        if session is None:
+            p = self.get_parser()
+            ok, ip, s = p.run_ids(p.tables.symbol_ids(tokens + [END]))
+        else:
+            with self._lock:
+                entry = self._sessions.get(session)
+                if entry is None:
+                    entry = self._sessions[session] = [threading.Lock(), None]
+                    while len(self._sessions) > PARSE_SESSIONS:
+                        self._sessions.popitem(last=False)
+                else:
+                    self._sessions.move_to_end(session)
+            with entry[0]:
+                inc: Optional[IncrementalParse] = entry[1]
+                if inc is None:
+                    inc = entry[1] = self.get_parser().incremental(tokens)
+                else:
+                    inc.update(tokens)
+                ok, ip, s = inc.accepted, inc.error_pos, inc.error_state
+        if ok:
+            return True, None
+        return False, f"Parse error en estado {s} con token '{tokens[ip] if ip < len(tokens) else END}'"
+
+    def parse_tree(self, input_str: str) -> ParseTree:
+        """Árbol de derivación de la entrada (arena, ver tree.py); ValueError si no se acepta."""
+        return self.get_parser().parse_tree(input_str.split())
+
+    def iter_trace(self, input_str: str) -> Iterator[Dict]:
+        """
+        Traza como deltas serializables, uno por paso (para /parse/stream):
+        shift -> {op, state, pos, token}; reduce -> {op, state, pos, pop, prod};
+        accept/error -> {op, state, pos} y fin.
+        """
+        tokens = input_str.split() + [END]
+        for st in self.get_parser().trace(tokens):
+            if st.op == "shift":
+                yield {"op": "shift", "state": st.state, "pos": st.pos, "token": tokens[st.pos]}
+            elif st.op == "reduce":
+                yield {"op": "reduce", "state": st.state, "pos": st.pos, "pop": st.pop, "prod": st.prod}
+            elif st.op == "error":
+                yield {"op": "error", "state": st.state, "pos": st.pos, "token": tokens[st.pos]}
+            else:
+                yield {"op": st.op, "state": st.state, "pos": st.pos}
 
+    def parse_input(self, input_str: str) -> Tuple[List[Dict[str, str]], Optional[str]]:
+        """
+        Traza completa con fotos de pila/entrada por paso (formato histórico
+        de /parse) y el error, o None si se aceptó; ante un error la traza
+        termina en el paso "error".
+        Cada foto copia la pila y el resto de la entrada: O(n²) en total.
+        Para entradas largas están /parse/stream (deltas por paso) y
+        /parse?trace=false (sólo aceptación), que son lineales.
+        """
+        T = self.get_compiled()
+        symbols, plhs = T.symbols, T.prod_lhs
+
+        def fmt_reduce(p: int) -> str:
+            left, right = T.production(p)
+            rhs = " ".join(right) if right else "ε"
+            return f"reduce {left} → {rhs}"
+
+        tokens = input_str.split() + [END]
+        stack_states: List[int] = [0]
+        stack_syms:   List[str] = []
+        steps: List[Dict[str, str]] = []
+
+        def snapshot(pos: int, action: str) -> None:
+            steps.append({
+                "stack": f"[{', '.join(str(x) for x in stack_states)}] " + " ".join(stack_syms).strip(),
+                "input": " ".join(tokens[pos:]),
+                "action": action
+            })
+
+        for st in self.get_parser().trace(tokens):
+            if st.op == "shift":
+                snapshot(st.pos, f"shift {st.state}")
+                stack_syms.append(tokens[st.pos])
+                stack_states.append(st.state)
+            elif st.op == "reduce":
+                snapshot(st.pos, fmt_reduce(st.prod))
+                if st.pop:
+                    del stack_syms[-st.pop:]
+                    del stack_states[-st.pop:]
+                stack_syms.append(symbols[plhs[st.prod]])
+                stack_states.append(st.state)
+            elif st.op == "accept":
+                snapshot(st.pos, "accept")
+                snapshot(len(tokens), "accept")
+            else:
+                snapshot(st.pos, "error")
+                return steps, f"Parse error en estado {st.state} con token '{tokens[st.pos]}'"
+
+        return steps, None
+
+def _cache_key(grammar_str: str, mode: str, tolerant: bool) -> str:
+    return grammar_key(grammar_str, mode, "tolerant" if tolerant else "strict")
+
+def parse_grammar(grammar_str: str, mode: str = "lr1", tolerant: bool = False):
+    """
+    Devuelve (adapter, nonTerminals, firstSets, initialState) para la gramática.
+    Si el texto (normalizado) ya se construyó antes, reutiliza el autómata de la caché.
+    """
+    key = _cache_key(grammar_str, mode, tolerant)
+
+    def factory():
+        try:
+            entry = _compile_grammar(grammar_str, mode, tolerant, _pick_base(grammar_str, mode, tolerant))
+        except Exception:
+            BUILD_ERRORS.inc()
+            raise
+        _record_build(entry)
+        _remember_base(key, entry, mode, tolerant)
+        return entry
+
+    return AUTOMATON_CACHE.get_or_build(key, factory)
+
+# --- Reconstrucción incremental ---
+# Al editar una gramática en vivo cada versión difiere poco de la anterior:
+# se guardan los últimos autómatas LR(1) construidos y una gramática nueva se
+# construye a partir del más parecido (ver LR1Builder(base=...)), siempre que
+# difiera en a lo sumo INCREMENTAL_MAX_DIFF de sus producciones.
+INCREMENTAL_BASES = int(os.environ.get("LR1_INCREMENTAL_BASES", "4"))
+INCREMENTAL_MAX_DIFF = float(os.environ.get("LR1_INCREMENTAL_MAX_DIFF", "0.25"))
+_RECENT_BASES: "deque[Tuple[str, str, bool, Counter, _Adapter]]" = deque(maxlen=max(INCREMENTAL_BASES, 1))
+
+def _production_counts(grammar_str: str) -> Counter:
+    return Counter((A, tuple(rhs)) for A, rhs in tokenize_rules(normalize_grammar(grammar_str).splitlines()))
+
+def _pick_base(grammar_str: str, mode: str, tolerant: bool) -> Optional[_Adapter]:
+    """Autómata reciente más parecido a grammar_str (mismo modo), o None."""
+    if mode != "lr1" or INCREMENTAL_BASES <= 0:
+        return None
+    prods = _production_counts(grammar_str)
+    best, best_diff = None, None
+    for _key, m, tol, counts, adapter in list(_RECENT_BASES):
+        if m != mode or tol != tolerant:
+            continue
+        diff = sum(((counts - prods) + (prods - counts)).values())
+        if best_diff is None or diff < best_diff:
+            best, best_diff = adapter, diff
+    if best is None or best_diff > INCREMENTAL_MAX_DIFF * max(sum(prods.values()), 1):
+        return None
+    return best
+
+def _remember_base(key: str, entry, mode: str, tolerant: bool) -> None:
+    adapter = entry[0]
+    if mode != "lr1" or INCREMENTAL_BASES <= 0 or adapter._first is None:
+        return
+    counts = Counter((A, tuple(rhs)) for A, rhs in adapter._first.analysis.prods)
+    _RECENT_BASES.append((key, mode, tolerant, counts, adapter))
+
+def _forget_bases(key: Optional[str] = None) -> None:
+    """Descarta las bases guardadas (todas, o las de una clave de caché)."""
+    for item in list(_RECENT_BASES):
+        if key is None or item[0] == key:
+            try:
+                _RECENT_BASES.remove(item)
+            except ValueError:
+                pass
+
+# --- Construcción fuera del event loop ---
+# Los autómatas se construyen en un pool de procesos acotado; mientras tanto
+# el event loop sigue atendiendo otras peticiones. Peticiones simultáneas por
+# la misma gramática esperan a la misma construcción.
+# Como mucho corren BUILD_WORKERS construcciones a la vez, y cada una ocupa
+# su worker sólo mientras alguien la espera: cuando la última petición que
+# la esperaba expira (504, BUILD_TIMEOUT) o se desconecta, se cancela; si ya
+# estaba corriendo, se recicla el pool para matar su worker. Las
+# reconstrucciones incrementales corren en un hilo y no se interrumpen.
+BUILD_WORKERS = int(os.environ.get("LR1_BUILD_WORKERS", str(min(4, os.cpu_count() or 1))))
+BUILD_TIMEOUT = float(os.environ.get("LR1_BUILD_TIMEOUT", "120"))
+_BUILD_POOL: Optional[ProcessPoolExecutor] = None
+_BUILDS_IN_FLIGHT: Dict[str, "asyncio.Task"] = {}
+_BUILD_WAITERS: Dict[str, int] = {}        # peticiones esperando cada construcción
+# (loop, semáforo de BUILD_WORKERS): sólo se envía al pool lo que tiene un
+# worker libre, así cancelar lo que aún espera turno no toca el pool
+_BUILD_SLOTS: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+
+def build_pool() -> ProcessPoolExecutor:
+    global _BUILD_POOL
+    if _BUILD_POOL is None:
+        _BUILD_POOL = ProcessPoolExecutor(max_workers=BUILD_WORKERS,
+                                          mp_context=multiprocessing.get_context("spawn"))
+    return _BUILD_POOL
+
+def _drop_pool(pool: ProcessPoolExecutor, kill: bool = False) -> None:
+    """
+    Retira `pool`; la siguiente construcción crea uno nuevo. Con kill=True
+    mata además sus workers: lo que estuviera corriendo en ellos falla con
+    BrokenProcessPool y se reintenta en el pool nuevo.
+    """
+    global _BUILD_POOL
+    if _BUILD_POOL is pool:
+        _BUILD_POOL = None
+    procs = list((pool._processes or {}).values()) if kill else []
+    for p in procs:
+        p.kill()
+    pool.shutdown(wait=False)
+
+def _build_slots() -> asyncio.Semaphore:
+    global _BUILD_SLOTS
+    loop = asyncio.get_running_loop()
+    if _BUILD_SLOTS is None or _BUILD_SLOTS[0] is not loop:
+        _BUILD_SLOTS = (loop, asyncio.Semaphore(BUILD_WORKERS))
+    return _BUILD_SLOTS[1]
+
+async def _run_in_build_pool(fn, *args):
+    """
+    fn(*args) en build_pool(). Si el pool está roto (murió un worker, p. ej.
+    por falta de memoria) se reemplaza y se reintenta una vez; si vuelve a
+    romperse, 503. Así una gramática que tumba su worker no deja al resto
+    del servicio sin pool. Si se cancela con fn ya corriendo, se recicla el
+    pool para liberar el worker.
+    """
+    async with _build_slots():
+        for _attempt in range(2):
+            pool = build_pool()
+            future = None
+            try:
+                future = pool.submit(fn, *args)
+                return await asyncio.wrap_future(future)
+            except BrokenProcessPool:
+                log.warning("pool de construcción roto; se reemplaza")
+                _drop_pool(pool)
+            except asyncio.CancelledError:
+                if future is not None and not future.cancel():
+                    log.warning("construcción cancelada en curso; se recicla el pool")
+                    _drop_pool(pool, kill=True)
+                raise
+    raise HTTPException(status_code=503, detail="El pool de construcción falló dos veces con esta gramática")
+
+async def get_automaton(grammar_str: str, mode: str = "lr1", tolerant: bool = False):
+    """Versión async de parse_grammar: la construcción corre en build_pool()."""
+    key = _cache_key(grammar_str, mode, tolerant)
+    entry = AUTOMATON_CACHE.get(key)
+    if entry is not None:
+        return entry
+
+    task = _BUILDS_IN_FLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_build_in_pool(key, grammar_str, mode, tolerant))
+        _BUILDS_IN_FLIGHT[key] = task
+        task.add_done_callback(lambda t: _build_done(key, t))
+    _BUILD_WAITERS[key] = _BUILD_WAITERS.get(key, 0) + 1
+    try:
+        # shield: si esta petición se cancela o expira, la construcción sigue
+        # para las demás que la esperan...
+        return await asyncio.wait_for(asyncio.shield(task), BUILD_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"La construcción del autómata superó {BUILD_TIMEOUT:g}s")
+    finally:
+        n = _BUILD_WAITERS.pop(key) - 1
+        if n:
+            _BUILD_WAITERS[key] = n
+        elif not task.done():
+            # ...pero si era la última, se cancela y libera su worker
+            task.cancel()
+
+async def _build_in_pool(key: str, grammar_str: str, mode: str, tolerant: bool):
+    loop = asyncio.get_running_loop()
+    base = _pick_base(grammar_str, mode, tolerant)
+    try:
+        if base is not None:
+            # la base vive en este proceso (mandarla al pool costaría más que la
+            # reconstrucción incremental): se construye en un hilo
+            entry = await loop.run_in_executor(None, _compile_grammar, grammar_str, mode, tolerant, base)
+        else:
+            entry = await _run_in_build_pool(_compile_grammar, grammar_str, mode, tolerant)
+    except Exception:
+        BUILD_ERRORS.inc()
+        raise
+    _record_build(entry)
+    _remember_base(key, entry, mode, tolerant)
+    return AUTOMATON_CACHE.put(key, entry)
+
+def _build_done(key: str, task: "asyncio.Task") -> None:
+    _BUILDS_IN_FLIGHT.pop(key, None)
+    if not task.cancelled():
+        task.exception()   # marca la excepción como leída aunque nadie espere ya
+
+def _compile_grammar(grammar_str: str, mode: str = "lr1", tolerant: bool = False,
+                     base: Optional[_Adapter] = None):
+
+    t0 = time.perf_counter()
     grammar = Grammar()
     grammar.loadFromString(grammar_str)
 
+    t1 = time.perf_counter()
     firsts = First(grammar)
-    firsts.compute()
+    firsts.compute(base._first if base is not None else None)
+    t2 = time.perf_counter()
 
     builder = LR1Builder(
         grammar=grammar,
-        firsts=firsts.firstSets
+        firsts=firsts.firstSets,
+        mode=mode,
+        tolerant=tolerant,
+        incremental=mode == "lr1" and INCREMENTAL_BASES > 0,
+        base=base._b if base is not None else None
     )
 
-    class _Adapter:
-        def __init__(self, builder: LR1Builder):
-            self._b = builder
-
-        def get_tables(self):
-            ACTION, GOTO, _states = self._b.build_tables()
-            return ACTION, GOTO
-        
-        def get_afn(self):
-            return self._b.afn
-        
-        def get_afd(self):
-            return self._b.afd
-
-        def parse_input(self, input_str: str, ACTION, GOTO):
-
-            def fmt_action(entry) -> str:
-                kind, data = entry
-                if kind == "shift":
-                    return f"shift {data}"
-                if kind == "reduce":
-                    rhs = " ".join(data.right) if data.right else "ε"
-                    return f"reduce {data.left} → {rhs}"
-                return "accept"
-
-            tokens = [t for t in input_str.split() if t] + [END]
-            stack_states: List[int] = [0]
-            stack_syms:   List[str] = []
-            ip = 0
-            steps: List[Dict[str, str]] = []
-
-            while True:
-                s = stack_states[-1]
-                a = tokens[ip] if ip < len(tokens) else END
-                act = ACTION.get((s, a))
-
-                steps.append({
-                    "stack": f"[{', '.join(str(x) for x in stack_states)}] " + (" ".join(stack_syms) if stack_syms else "").strip(),
-                    "input": " ".join(tokens[ip:]),
-                    "action": fmt_action(act) if act else "error"
-                })
-
-                if not act:
-                    raise ValueError(f"Parse error en estado {s} con token '{a}'")
-
-                kind, data = act
-                if kind == "shift":
-                    j = int(data)  # type: ignore
-                    stack_syms.append(a)
-                    stack_states.append(j)
-                    ip += 1
-                elif kind == "reduce":
-                    prod: Production = data  # type: ignore
-                    k = len(prod.right)
-                    for _ in range(k):
-                        if stack_syms: stack_syms.pop()
-                        stack_states.pop()
-                    t = stack_states[-1]
-                    j = GOTO.get((t, prod.left))
-                    if j is None:
-                        raise ValueError(f"GOTO indefinido desde estado {t} con {prod.left}")
-                    stack_syms.append(prod.left)
-                    stack_states.append(j)
-                elif kind == "accept":
-                    steps.append({
-                        "stack": f"[{', '.join(str(x) for x in stack_states)}] " + (" ".join(stack_syms) if stack_syms else "").strip(),
-                        "input": "",
-                        "action": "accept"
-                    })
-                    break
-                else:
-                    raise RuntimeError("Acción desconocida")
+    timings = {"grammar": t1 - t0, "first": t2 - t1, **builder.timings}
+    adapter = _Adapter(builder, firsts, timings, incremental=base is not None)
+    return adapter, grammar.nonTerminals, firsts.firstSets, grammar.initialState
 
-            return steps
-
-    return _Adapter(builder), grammar.nonTerminals, firsts.firstSets, grammar.initialState
+def _record_build(entry) -> None:
+    """Registra en METRICS las fases y tamaños de una construcción recién hecha."""
+    G = entry[0]
+    afd = G.get_afd()
+    kind = "incremental" if G.incremental else "full"
+    for phase, secs in G.timings.items():
+        PHASE_SECONDS.observe(secs, phase=phase)
+    total = sum(G.timings.values())
+    BUILD_SECONDS.observe(total, mode=G.get_mode(), kind=kind)
+    n_items = sum(len(I) for I in afd.states)
+    AUTOMATON_STATES.observe(len(afd.states), automaton="dfa")
+    AUTOMATON_EDGES.observe(len(afd.trans), automaton="dfa")
+    AUTOMATON_ITEMS.observe(n_items)
+    log.info("construcción %s (%s): %.3fs, %d estados, %d ítems, %d transiciones [%s]",
+             G.get_mode(), kind, total, len(afd.states), n_items, len(afd.trans),
+             ", ".join(f"{p}={t:.3f}s" for p, t in G.timings.items()))
 
 def _fmt_item(it) -> str:
     right = list(it.right)
@@ -158,7 +591,19 @@ def _fmt_item(it) -> str:
     body = " ".join(right) if right else "·"
     return f"{it.left} → {body} , {it.look}\\l"
 
-def automaton_dfa_dot(states, trans, *, show_items: bool) -> str:
+def _fmt_cores(I) -> List[str]:
+    # un renglón por núcleo LR(0), con sus lookaheads agrupados: "A → α · β , a/b"
+    looks: Dict[Tuple, List[str]] = {}
+    for it in I:
+        looks.setdefault((it.left, it.dot, tuple(it.right)), []).append(it.look)
+    out = []
+    for (left, dot, right), L in sorted(looks.items()):
+        body = list(right)
+        body.insert(dot, "·")
+        out.append(f"{left} → {' '.join(body)} , {'/'.join(sorted(L))}\\l")
+    return out
+
+def automaton_dfa_dot(states, trans, *, show_items: bool, group_lookaheads: bool = False) -> str:
     lines = [
         "digraph LR1 {",
         "rankdir=LR;",
@@ -168,7 +613,10 @@ def automaton_dfa_dot(states, trans, *, show_items: bool) -> str:
     ]
 
     for i, I in enumerate(states):
-        if show_items:
+        if show_items and group_lookaheads:
+            label = f"I{i}\\l" + "".join(_fmt_cores(I))
+            lines.append(f'{i} [label="{label}"];')
+        elif show_items:
             items = sorted(I, key=lambda x: (x.left, x.dot, x.look, tuple(x.right)))
             label = f"I{i}\\l" + "".join(_fmt_item(it) for it in items)
             lines.append(f'{i} [label="{label}"];')
@@ -221,10 +669,91 @@ def automaton_nfa_dot(Q, E) -> str:
     lines.append("}")
     return "\n".join(lines)
 
+def _lr0_groups(states) -> List[int]:
+    """Agrupa los estados por su conjunto de núcleos LR(0): estado -> grupo."""
+    ids: Dict[frozenset, int] = {}
+    return [ids.setdefault(frozenset(it.core for it in I), len(ids)) for I in states]
+
+def automaton_lr0_dot(states, trans) -> str:
+    """Resumen LR(0): un nodo por grupo de estados con los mismos núcleos."""
+    group = _lr0_groups(states)
+    members: Dict[int, List[int]] = {}
+    for i, g in enumerate(group):
+        members.setdefault(g, []).append(i)
+
+    lines = [
+        "digraph LR0 {",
+        "rankdir=LR;",
+        'graph [fontname="Inter"];',
+        'node  [fontname="Inter", shape=box, style=rounded];',
+        'edge  [fontname="Inter"];',
+    ]
+    for g, ids in members.items():
+        names = ",".join(f"I{i}" for i in ids[:6]) + (f",… ({len(ids)})" if len(ids) > 6 else "")
+        lines.append(f'{g} [label="{names}"];')
+    edges = {(group[i], X, group[j]) for (i, X), j in trans.items()}
+    for gi, X, gj in sorted(edges):
+        lbl = str(X).replace('"', r'\"')
+        lines.append(f'{gi} -> {gj} [label="{lbl}"];')
+
+    lines.append("}")
+    return "\n".join(lines)
+
+# --- Presupuesto de render ---
+# Vistas de más a menos detalle. Si la pedida supera el presupuesto de nodos,
+# aristas o renglones de ítems, se usa la siguiente que quepa.
+RENDER_VIEWS = ("nfa", "items", "cores", "simple", "lr0")
+RENDER_MAX_NODES = int(os.environ.get("LR1_RENDER_MAX_NODES", "600"))
+RENDER_MAX_EDGES = int(os.environ.get("LR1_RENDER_MAX_EDGES", "3000"))
+RENDER_MAX_ITEMS = int(os.environ.get("LR1_RENDER_MAX_ITEMS", "3000"))   # renglones en etiquetas
+
+def _fits(nodes: int, edges: int, item_lines: int) -> bool:
+    return nodes <= RENDER_MAX_NODES and edges <= RENDER_MAX_EDGES and item_lines <= RENDER_MAX_ITEMS
+
+def automaton_view_dot(G: _Adapter, requested: str) -> Tuple[str, str]:
+    """
+    DOT de la vista pedida o, si no entra en el presupuesto, de la primera
+    vista más resumida que entre. Retorna (vista usada, fuente DOT).
+    """
+    afd = G.get_afd()
+    states, trans = afd.states, afd.trans
+    for view in RENDER_VIEWS[RENDER_VIEWS.index(requested):]:
+        if view == "nfa":
+            # nodos del AFN = ítems LR(1) distintos; se comprueba antes de construirlo
+            n_items = len({it.key for I in states for it in I})
+            if not _fits(n_items, 0, n_items):
+                continue
+            nfa = G.get_afn()
+            if not _fits(len(nfa.Q), len(nfa.E), len(nfa.Q)):
+                continue
+            return view, automaton_nfa_dot(nfa.Q, nfa.E)
+        if view == "items":
+            if _fits(len(states), len(trans), sum(len(I) for I in states)):
+                return view, automaton_dfa_dot(states, trans, show_items=True)
+        elif view == "cores":
+            n_cores = sum(len({it.core for it in I}) for I in states)
+            if _fits(len(states), len(trans), n_cores):
+                return view, automaton_dfa_dot(states, trans, show_items=True, group_lookaheads=True)
+        elif view == "simple":
+            if _fits(len(states), len(trans), 0):
+                return view, automaton_dfa_dot(states, trans, show_items=False)
+        else:
+            group = _lr0_groups(states)
+            n_edges = len({(group[i], X) for (i, X) in trans})
+            if _fits(max(group) + 1, n_edges, 0):
+                return view, automaton_lr0_dot(states, trans)
+    raise HTTPException(status_code=413,
+                        detail=f"El autómata ({len(states)} estados) supera el presupuesto de render "
+                               f"({RENDER_MAX_NODES} nodos, {RENDER_MAX_EDGES} aristas)")
+
 @app.post("/build", response_model=BuildResponse)
-def build(req: BuildRequest):
+async def build(req: BuildRequest, request: Request):
+
+    entry = await until_disconnect(request, get_automaton(req.rules, req.mode, req.tolerant))
+    # serializar un autómata grande también es CPU: fuera del event loop
+    return await run_in_threadpool(_build_response, *entry)
 
-    G, nonTerminals, firstSets, initialSymbol = parse_grammar(req.rules)
+def _build_response(G: _Adapter, nonTerminals, firstSets, initialSymbol) -> BuildResponse:
     afd = G.get_afd()
     states, trans = afd.states, afd.trans
     ACTION, GOTO = G.get_tables()
@@ -261,38 +790,324 @@ def build(req: BuildRequest):
                          goto=goto_ser,
                          nonTerminals=nonTerminals,
                          firsts=firsts,
-                         initialSymbol=initialSymbol
+                         initialSymbol=initialSymbol,
+                         mode=G.get_mode(),
+                         mergeConflicts=G.get_merge_conflicts(),
+                         conflicts=[ConflictDTO(**vars(c)) for c in G.get_conflicts()]
                         )
 
+async def _input_tokens(G: _Adapter, req: ParseRequest) -> str:
+    """
+    Entrada como tokens separados por espacios. Con req.lexer se escanea con
+    el AFD de la gramática: un patrón inválido es un 400 y un carácter que no
+    forma token se propaga como LexError.
+    """
+    if req.lexer is None:
+        return req.input
+    try:
+        lexer = await run_in_threadpool(G.get_lexer, req.lexer)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return " ".join(await run_in_threadpool(lexer.tokenize, req.input))
+
+# Nodos máximos del árbol anidado en /parse; más grandes se piden con ?tree=flat
+TREE_MAX_NODES = int(os.environ.get("LR1_TREE_MAX_NODES", "20000"))
+
 @app.post("/parse", response_model=ParseResponse)
-def parse(req: ParseRequest):
+async def parse(req: ParseRequest, request: Request, trace: bool = Query(True),
+                tree: Optional[str] = Query(None, pattern="^(nested|flat)$"),
+                glr: bool = Query(False)):
     
-    G, _ , _, _ = parse_grammar(req.rules)
-    ACTION, GOTO = G.get_tables()
+    # GLR necesita las tablas con los conflictos: se construyen en modo tolerante
+    G, _ , _, _ = await until_disconnect(request, get_automaton(req.rules, req.mode, req.tolerant or glr))
+
+    if glr:
+        # sin traza: el bosque (flat) o un árbol de él (nested) y el nº de derivaciones
+        try:
+            text = await _input_tokens(G, req)
+            forest, count = await run_in_threadpool(G.glr_parse, text)
+        except ValueError as e:
+            return ParseResponse(steps=[], accepted=False, error=str(e))
+        tree_out = None
+        if tree == "flat":
+            tree_out = await run_in_threadpool(forest.to_dict)
+        elif tree == "nested":
+            pt = await run_in_threadpool(forest.tree)
+            if len(pt) > TREE_MAX_NODES:
+                raise HTTPException(status_code=413,
+                                    detail=f"Árbol de {len(pt)} nodos (máximo {TREE_MAX_NODES}); usar ?tree=flat")
+            tree_out = pt.to_nested()
+        return ParseResponse(steps=[], derivations=count, tree=tree_out)
 
-    steps = G.parse_input(req.input, ACTION, GOTO) 
+    if req.lexer is not None and tree is None and not trace:
+        # sólo aceptación: lexer y parser fusionados, sin lista de tokens
+        try:
+            await run_in_threadpool(G.get_lexer, req.lexer)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        accepted, error = await run_in_threadpool(G.check_bytes, req.input, req.lexer)
+        return ParseResponse(steps=[], accepted=accepted, error=error)
+
+    try:
+        text = await _input_tokens(G, req)
+    except LexError as e:
+        return ParseResponse(steps=[], accepted=False, error=str(e))
+
+    tree_out = None
+    if tree is not None:
+        try:
+            pt = await run_in_threadpool(G.parse_tree, text)
+        except ValueError as e:
+            return ParseResponse(steps=[], accepted=False, error=str(e))
+        if tree == "nested" and len(pt) > TREE_MAX_NODES:
+            raise HTTPException(status_code=413,
+                                detail=f"Árbol de {len(pt)} nodos (máximo {TREE_MAX_NODES}); usar ?tree=flat")
+        tree_out = pt.to_flat() if tree == "flat" else pt.to_nested()
+
+    if not trace:
+        if tree_out is not None:
+            return ParseResponse(steps=[], tree=tree_out)
+        # sin traza: sólo aceptación/error, sin fotos de pila por paso
+        accepted, error = await run_in_threadpool(G.check_input, text, req.session)
+        return ParseResponse(steps=[], accepted=accepted, error=error)
+
+    # traza con fotos por paso: O(n²); /parse/stream y trace=false son lineales
+    steps, error = await run_in_threadpool(G.parse_input, text)
 
     out = [StepDTO(stack=s["stack"], input=s["input"], action=s["action"]) for s in steps]
     
-    return ParseResponse(steps=out)
+    return ParseResponse(steps=out, accepted=error is None, error=error, tree=tree_out)
+
+class BatchParseRequest(BaseModel):
+    rules: str
+    inputs: List[str]                  # cada entrada: tokens separados por espacios
+    mode: str = Field("lr1", pattern=BUILD_MODE_PATTERN)
+    tolerant: bool = False
+
+class BatchItemDTO(BaseModel):
+    accepted: bool
+    errorPos: int                      # índice del token que falló, -1 si se aceptó
+    errorToken: Optional[str] = None
+    micros: float
+
+class BatchParseResponse(BaseModel):
+    results: List[BatchItemDTO]
+    accepted: int
+    seconds: float
+    inputsPerSecond: float
+
+# Pool de procesos para /parse/batch, compartido por todas las gramáticas:
+# cada proceso abre con mmap las tablas que le toquen (ver LR1Parser.parse_batch)
+_BATCH_POOL: Optional[ProcessPoolExecutor] = None
+_BATCH_POOL_LOCK = threading.Lock()
+
+def batch_pool() -> ProcessPoolExecutor:
+    global _BATCH_POOL
+    with _BATCH_POOL_LOCK:
+        if _BATCH_POOL is None:
+            workers = int(os.environ.get("LR1_BATCH_WORKERS", str(os.cpu_count() or 1)))
+            # spawn: no se hace fork de un proceso con hilos (el pool de FastAPI)
+            _BATCH_POOL = ProcessPoolExecutor(max_workers=workers,
+                                              mp_context=multiprocessing.get_context("spawn"))
+        return _BATCH_POOL
+
+@app.post("/parse/batch", response_model=BatchParseResponse)
+async def parse_batch(req: BatchParseRequest, request: Request):
+    """Reconoce muchas entradas contra una misma gramática (tablas construidas una sola vez)."""
+    G, _, _, _ = await until_disconnect(request, get_automaton(req.rules, req.mode, req.tolerant))
+
+    t0 = time.perf_counter()
+    results = await run_in_threadpool(G.get_parser().parse_batch, req.inputs, executor=batch_pool())
+    seconds = time.perf_counter() - t0
+
+    out: List[BatchItemDTO] = []
+    for text, r in zip(req.inputs, results):
+        token = None
+        if not r.accepted:
+            tokens = text.split()
+            token = tokens[r.error_pos] if r.error_pos < len(tokens) else END
+        out.append(BatchItemDTO(accepted=r.accepted, errorPos=r.error_pos,
+                                errorToken=token, micros=r.seconds * 1e6))
+    return BatchParseResponse(results=out,
+                              accepted=sum(r.accepted for r in results),
+                              seconds=seconds,
+                              inputsPerSecond=len(results) / seconds if seconds > 0 else 0.0)
+
+STREAM_CHUNK_STEPS = 256   # pasos por bloque enviado en /parse/stream
+
+@app.post("/parse/stream")
+async def parse_stream(req: ParseRequest, request: Request):
+    """
+    Traza en NDJSON (una línea JSON por paso), enviada a medida que se genera.
+    La primera línea trae las producciones para que el cliente resuelva los
+    reduce por id y reconstruya la pila si la necesita.
+    """
+    G, _, _, _ = await until_disconnect(request, get_automaton(req.rules, req.mode, req.tolerant))
+    T = G.get_compiled()
+    try:
+        text = await _input_tokens(G, req)
+    except LexError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def lines():
+        prods = [T.production(p) for p in range(T.n_prods)]
+        header = {"op": "start", "productions": [{"left": l, "right": r} for l, r in prods]}
+        yield json.dumps(header, ensure_ascii=False) + "\n"
+        chunk: List[str] = []
+        for step in G.iter_trace(text):
+            chunk.append(json.dumps(step, ensure_ascii=False))
+            if len(chunk) >= STREAM_CHUNK_STEPS:
+                yield "\n".join(chunk) + "\n"
+                chunk = []
+        if chunk:
+            yield "\n".join(chunk) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+# --- Render con Graphviz en un subproceso asyncio ---
+RENDER_TIMEOUT = float(os.environ.get("LR1_RENDER_TIMEOUT", "60"))
+RENDER_CONCURRENCY = int(os.environ.get("LR1_RENDER_CONCURRENCY", "2"))
+DISCONNECT_POLL = 0.5      # segundos entre comprobaciones de desconexión del cliente
+_RENDER_SLOTS = asyncio.Semaphore(RENDER_CONCURRENCY)
+
+async def render_dot(dot_src: str, fmt: str = "png") -> bytes:
+    """
+    Ejecuta `dot -T<fmt>` sin bloquear el event loop: como mucho
+    RENDER_CONCURRENCY renders a la vez y cada uno con RENDER_TIMEOUT.
+    Si la tarea se cancela (timeout o cliente desconectado) se mata el proceso.
+    """
+    async with _RENDER_SLOTS:
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                "dot", f"-T{fmt}",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            raise HTTPException(status_code=503, detail="Graphviz (dot) no está instalado")
+        try:
+            out, err = await asyncio.wait_for(proc.communicate(dot_src.encode("utf-8")), RENDER_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail=f"Graphviz superó {RENDER_TIMEOUT:g}s")
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+        if proc.returncode != 0:
+            raise HTTPException(status_code=500, detail=f"dot falló: {err.decode('utf-8', 'replace')[:500]}")
+        return out
+
+async def until_disconnect(request: Request, aw):
+    """Espera `aw`, cancelándolo si el cliente cierra la conexión antes."""
+    task = asyncio.ensure_future(aw)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Cliente desconectado")
+    finally:
+        if not task.done():
+            task.cancel()
+
+RENDER_FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+
+# Imágenes ya renderizadas, por (gramática, vista, detalle, formato); acotada en bytes
+RENDER_CACHE = AutomatonCache(
+    maxsize=int(os.environ.get("LR1_RENDER_CACHE_SIZE", "64")),
+    max_weight=int(os.environ.get("LR1_RENDER_CACHE_BYTES", str(64 * 1024 * 1024))),
+    weigh=lambda entry: len(entry[0]),
+)
+
+async def render_automaton(req: BuildRequest, view: str, detail: str, fmt: str) -> Response:
+    key = f"{_cache_key(req.rules, req.mode, req.tolerant)}:{view}:{detail}:{fmt}"
+    entry = RENDER_CACHE.get(key)
+    if entry is None:
+        G, _, _, _ = await get_automaton(req.rules, req.mode, req.tolerant)
+        requested = "nfa" if view == "nfa" else detail
+        t0 = time.perf_counter()
+        used, dot_src = await run_in_threadpool(automaton_view_dot, G, requested)
+        t1 = time.perf_counter()
+        PHASE_SECONDS.observe(t1 - t0, phase="dot")
+        data = await render_dot(dot_src, fmt)
+        PHASE_SECONDS.observe(time.perf_counter() - t1, phase="render")
+        entry = RENDER_CACHE.put(key, (data, used))
+    data, used = entry
+    return Response(content=data, media_type=RENDER_FORMATS[fmt],
+                    headers={"X-Automaton-View": used})
+
+@app.post("/automaton/dfa")
+async def automaton_dfa(
+    req: BuildRequest,
+    request: Request,
+    detail: str = Query("simple", pattern="^(simple|items|cores)$"),
+    fmt: str = Query("png", alias="format", pattern="^(png|svg)$")
+):
+    """
+    AFD LR(1) como imagen. detail: simple (sólo estados), items (ítems LR(1)),
+    cores (ítems LR(0) con lookaheads agrupados). Si el grafo supera el
+    presupuesto se devuelve una vista más resumida; la cabecera
+    X-Automaton-View indica la vista usada.
+    """
+    return await until_disconnect(request, render_automaton(req, "dfa", detail, fmt))
+
+@app.post("/automaton/nfa")
+async def automaton_nfa(
+    req: BuildRequest,
+    request: Request,
+    fmt: str = Query("png", alias="format", pattern="^(png|svg)$")
+):
+    """AFN de ítems LR(1); en gramáticas grandes cae a vistas del AFD (ver /automaton/dfa)."""
+    return await until_disconnect(request, render_automaton(req, "nfa", "items", fmt))
 
 @app.post("/automaton/dfa/png")
-def automaton_dfa_png(
+async def automaton_dfa_png(
     req: BuildRequest,
-    detail: str = Query("simple", pattern="^(simple|items)$")
+    request: Request,
+    detail: str = Query("simple", pattern="^(simple|items|cores)$")
 ):
-    G, _, _, _ = parse_grammar(req.rules)
-    afd = G.get_afd()
-    dot_src = automaton_dfa_dot(afd.states, afd.trans, show_items=(detail == "items"))
-    png_bytes = Source(dot_src).pipe(format="png")
-    return Response(content=png_bytes, media_type="image/png")
+    return await until_disconnect(request, render_automaton(req, "dfa", detail, "png"))
 
 @app.post("/automaton/nfa/png")
-def automaton_nfa_png(
-    req: BuildRequest
+async def automaton_nfa_png(
+    req: BuildRequest,
+    request: Request
 ):
-    G, _, _, _ = parse_grammar(req.rules)
-    nfa = G.get_afn()
-    dot_src = automaton_nfa_dot(nfa.Q, nfa.E)
-    png_bytes = Source(dot_src).pipe(format="png")
-    return Response(content=png_bytes, media_type="image/png")
+    return await until_disconnect(request, render_automaton(req, "nfa", "items", "png"))
+
+
+class CacheStatsResponse(BaseModel):
+    size: int
+    maxsize: int
+    weight: int
+    hits: int
+    misses: int
+    evictions: int
+    renders: Dict[str, int]            # estadísticas de la caché de imágenes
+
+@app.get("/cache/stats", response_model=CacheStatsResponse)
+def cache_stats():
+    return CacheStatsResponse(**AUTOMATON_CACHE.stats(), renders=RENDER_CACHE.stats())
+
+@app.post("/cache/invalidate")
+def cache_invalidate(req: BuildRequest):
+    key = _cache_key(req.rules, req.mode, req.tolerant)
+    removed = AUTOMATON_CACHE.invalidate(key)
+    RENDER_CACHE.invalidate_prefix(key + ":")
+    _forget_bases(key)
+    return {"removed": removed}
+
+@app.delete("/cache")
+def cache_clear():
+    AUTOMATON_CACHE.clear()
+    RENDER_CACHE.clear()
+    _forget_bases()
+    return {"cleared": True}
+
+@app.get("/metrics")
+def metrics():
+    """Métricas en el formato de texto de Prometheus."""
+    return Response(content=METRICS.expose(), media_type=CONTENT_TYPE)
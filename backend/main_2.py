@@ -2,7 +2,7 @@ from __future__ import annotations
 from pathlib import Path
 
 from grammar import Grammar
-from first import First
+from first_ import First
 from follow import Follow
 
 from table import Table
@@ -0,0 +1,154 @@
+# metrics.py
+"""
+    Métricas del proceso en el formato de texto de Prometheus (versión 0.0.4),
+    sin dependencias externas.
+
+    Counter y Histogram guardan una serie por combinación de etiquetas
+    (en el orden de `labels`); las métricas que ya lleva otro objeto (p. ej.
+    los aciertos de cache.AutomatonCache) se registran con Registry.collect,
+    que las lee en el momento de exponerlas.
+"""
+from __future__ import annotations
+import bisect
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# segundos: de una gramática de juguete a una construcción que roza el timeout
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# cantidades (estados, ítems, aristas)
+SIZE_BUCKETS = (10, 30, 100, 300, 1000, 3000, 10000, 30000, 100000, 300000, 1000000)
+
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name}: se esperaban las etiquetas {self.labels}, no {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labels, k)} {_fmt(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    """Cubetas acumulativas (le), suma y cantidad por serie."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = TIME_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # serie -> [conteo por cubeta (no acumulado, la última es +Inf), suma]
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            s[0][i] += 1
+            s[1][0] += value
+
+    def count(self, **labels: str) -> int:
+        s = self._series.get(self._key(labels))
+        return sum(s[0]) if s is not None else 0
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), t[0])) for k, (c, t) in self._series.items())
+        out = self.header()
+        for key, (counts, total) in items:
+            acc = 0
+            for le, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                le_label = 'le="' + _fmt(le) + '"'
+                out.append(f"{self.name}_bucket{_labels(self.labels, key, le_label)} {acc}")
+            out.append(f"{self.name}_sum{_labels(self.labels, key)} {_fmt(total)}")
+            out.append(f"{self.name}_count{_labels(self.labels, key)} {acc}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        # (nombre, ayuda, tipo, etiquetas, función que da {valores de etiquetas: valor})
+        self._collectors: List[Tuple[str, str, str, Tuple[str, ...],
+                                     Callable[[], Dict[Tuple[str, ...], float]]]] = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        m = Counter(name, help, labels)
+        self._metrics.append(m)
+        return m
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = TIME_BUCKETS) -> Histogram:
+        m = Histogram(name, help, labels, buckets)
+        self._metrics.append(m)
+        return m
+
+    def collect(self, name: str, help: str, kind: str, labels: Sequence[str],
+                fn: Callable[[], Dict[Tuple[str, ...], float]]) -> None:
+        """Métrica cuyo valor se lee al exponer (kind: counter o gauge)."""
+        self._collectors.append((name, help, kind, tuple(labels), fn))
+
+    def expose(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics:
+            lines.extend(m.expose())
+        for name, help, kind, labels, fn in self._collectors:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, v in sorted(fn().items()):
+                lines.append(f"{name}{_labels(labels, key)} {_fmt(v)}")
+        return "\n".join(lines) + "\n"
+
@@ -0,0 +1,134 @@
+# parser.py
+"""
+    Parser predictivo LL(1) sobre la tabla de table.py, compilada a enteros.
+
+    Símbolos: los terminales conservan su id de la tabla (tsVec) y los no
+    terminales van a continuación (nT + id de ntsVec).
+
+        predict[A * nT + a]   producción que predice el no terminal A ante
+                              el terminal a; -1 = error
+        rhs[rhs_start[p]:rhs_start[p + 1]]
+                              lado derecho de p, AL REVÉS (se copia tal cual
+                              a la pila); el ε explícito ('') no ocupa lugar
+
+    El driver recorre ids de terminales con una pila de enteros
+    preasignada (se duplica si se llena): sin diccionarios ni objetos
+    Symbol en el bucle.
+"""
+from __future__ import annotations
+import logging
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+from table import Table, TERMINAL
+
+log = logging.getLogger(__name__)
+
+END = "$"   # fin de entrada (como en lr1.py)
+
+
+class LL1Parser:
+    """
+    LL1Parser(table, start_id): start_id es el id del símbolo inicial en la
+    tabla (table.getNonTerminalId). La tabla debe ser LL(1)
+    (table.conflicts vacío); si no, cada celda usa la última producción
+    escrita.
+    """
+
+    def __init__(self, table: Table, start: int):
+        if not 0 <= start < len(table.ntsVec):
+            raise ValueError(f"Símbolo inicial inválido: {start}")
+        nT, nN = len(table.tsVec), len(table.ntsVec)
+        self.n_terminals: int = nT
+        self.n_nonterminals: int = nN
+        self.symbols: List[str] = table.tsVec + table.ntsVec
+        self.start: int = nT + start
+        eps = table.termMap.get("''", -1)
+        self.end_id: int = table.termMap[END]
+        # terminales de entrada (sin el ε explícito)
+        self.term_id: Dict[str, int] = {t: i for t, i in table.termMap.items() if i != eps}
+
+        self.predict: array = array("i", [-1]) * (nN * nT)
+        self.prod_lhs: array = array("i")
+        self.rhs_start: array = array("i", [0])
+        self.rhs: List[int] = []
+        # celdas con el mismo lado derecho comparten producción
+        interned: Dict[Tuple[int, Tuple[int, ...]], int] = {}
+        for (A, a), body in table.parserTable.items():
+            if A < 0 or a < 0:
+                continue
+            ids = tuple(nT + s.value if s.type != TERMINAL else s.value
+                        for s in body if not (s.type == TERMINAL and s.value == eps))
+            p = interned.get((A, ids))
+            if p is None:
+                p = interned[(A, ids)] = len(self.prod_lhs)
+                self.prod_lhs.append(A)
+                self.rhs.extend(reversed(ids))
+                self.rhs_start.append(len(self.rhs))
+            self.predict[A * nT + a] = p
+
+    def production(self, p: int) -> str:
+        """A -> X Y ... (para mensajes y depuración)."""
+        body = [self.symbols[x] for x in reversed(self.rhs[self.rhs_start[p]:self.rhs_start[p + 1]])]
+        return f"{self.symbols[self.n_terminals + self.prod_lhs[p]]} -> {' '.join(body) or 'ε'}"
+
+    def symbol_ids(self, tokens: Sequence[str]) -> List[int]:
+        """Ids de terminales; -1 para lo que no es un terminal de la gramática."""
+        get = self.term_id.get
+        return [get(t, -1) for t in tokens]
+
+    def parse(self, tokens: List[str]) -> bool:
+        if not tokens or tokens[-1] != END:
+            tokens = tokens + [END]
+        return self.parse_ids(self.symbol_ids(tokens), tokens)
+
+    def parse_ids(self, ids: List[int], tokens: Optional[List[str]] = None) -> bool:
+        """Reconoce una secuencia de ids de terminales (debe terminar en el id de $)."""
+        ok, ip, top = self.run_ids(ids)
+        if not ok:
+            a = ids[ip]
+            name = tokens[ip] if tokens is not None else self.symbols[a] if a >= 0 else "?"
+            log.info("[LL1] error con '%s' en la cima de la pila y lookahead '%s'", self.symbols[top], name)
+        return ok
+
+    def run_ids(self, ids: Sequence[int]) -> Tuple[bool, int, int]:
+        """
+        (aceptada, posición del token, símbolo en la cima). Si no se acepta,
+        posición y cima indican dónde falló.
+        """
+        nT, end = self.n_terminals, self.end_id
+        predict, rhs, rstart = self.predict, self.rhs, self.rhs_start
+
+        cap = max(64, len(ids) + 2)
+        stack = [0] * cap
+        stack[0] = end
+        stack[1] = self.start
+        sp = 2
+        ip = 0
+        a = ids[0]
+        if a < 0:
+            return False, 0, self.start
+        while True:
+            X = stack[sp - 1]
+            if X < nT:
+                if X != a:
+                    return False, ip, X
+                if a == end:
+                    return True, ip, X
+                sp -= 1
+                ip += 1
+                a = ids[ip]
+                if a < 0:
+                    return False, ip, stack[sp - 1]
+                continue
+            p = predict[(X - nT) * nT + a]
+            if p < 0:
+                return False, ip, X
+            lo = rstart[p]
+            n = rstart[p + 1] - lo
+            sp -= 1
+            if n:
+                while sp + n > cap:
+                    stack.extend([0] * cap)
+                    cap += cap
+                stack[sp:sp + n] = rhs[lo:lo + n]
+                sp += n
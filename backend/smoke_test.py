@@ -1,44 +1,174 @@
 # smoke_test.py
-from lr1 import LR1Builder, LR1Parser, END, print_lr1_tables
-from first import First
+import gc
+import os
+import random
+import tempfile
+from lr1 import LR1Builder, LR1Parser, END
+from first_ import First
+from glr import GLRParser
 from follow import Follow
 from grammar import Grammar
 
-# Puedes escribir terminales con o sin comillas; el builder normaliza.
-nonterm = {"S","C"}
-term = {"c","d"}  
 
-rules = [
-    "S  -> C C",
-    "C -> c C",
-    "C  -> d"
-]
+def build(text: str, **kw) -> LR1Builder:
+    g = Grammar()
+    g.loadFromString(text)
+    f = First(g)
+    f.compute()
+    return LR1Builder(g, f.firstSets, **kw)
 
-start = "S"
 
-gramatica = Grammar()
-gfile = "inputs/input-1.txt"
-if not gramatica.loadFromFile(gfile):
-    print("Error al cargar la gramática.")
-    
-print("=== Gramática cargada ===")
-gramatica.print()
+def check_parse_batch_twice() -> None:
+    # dos parsers seguidos sobre el mismo builder: el temporal del primero
+    # se borra al morir y no debe quedar como archivo de las tablas cacheadas
+    b = build("S -> S a | b")
+    inputs = [["b"] + ["a"] * (i % 7) for i in range(200)]
+    p = LR1Parser(b)
+    first = p.parse_batch(inputs, workers=2, chunksize=50)
+    del p
+    gc.collect()
+    second = LR1Parser(b).parse_batch(inputs, workers=2, chunksize=50)
+    assert [r.accepted for r in first] == [r.accepted for r in second] == [True] * len(inputs)
+    assert b.compile_tables().path is None
 
-primeros = First(gramatica)
-primeros.compute()
-print("\n=== Conjuntos First ===")
-primeros.print()
+    # un archivo guardado y luego sobrescrito con otras tablas no se reutiliza
+    t = b.compile_tables()
+    fd, path = tempfile.mkstemp(suffix=".lr1t")
+    os.close(fd)
+    try:
+        t.save(path)
+        assert LR1Parser(b)._tables_path() == path
+        build("S -> a S | c").compile_tables().write(path)
+        p = LR1Parser(b)
+        assert p._tables_path() != path
+        assert all(r.accepted for r in p.parse_batch(inputs, workers=2, chunksize=50))
+    finally:
+        os.unlink(path)
+    print("parse_batch con dos parsers seguidos: OK")
 
-siguientes = Follow(gramatica, primeros)
-siguientes.compute()
-print("\n=== Conjuntos Follow ===")
-siguientes.print()
 
-b = LR1Builder(nonterm, term, rules, start, primeros.firstSets)
-p = LR1Parser(b)
+def canonical_tables(b: LR1Builder):
+    # ACTION/GOTO con los estados renumerados en orden BFS desde el 0, para
+    # comparar autómatas que numeraron sus estados de otra manera
+    order = {0: 0}
+    queue = [0]
+    succ: dict = {}
+    for (i, X), j in b.afd.trans.items():
+        succ.setdefault(i, []).append((X, j))
+    for i in queue:
+        for _X, j in sorted(succ.get(i, ())):
+            if j not in order:
+                order[j] = len(order)
+                queue.append(j)
+    ACTION, GOTO, _states = b.tables
+    action = {}
+    for (i, a), (kind, data) in ACTION.items():
+        if kind == "shift":
+            data = order[data]
+        elif kind == "reduce":
+            data = (data.left, tuple(data.rhs))
+        action[(order[i], a)] = (kind, data)
+    goto = {(order[i], A): order[j] for (i, A), j in GOTO.items()}
+    return action, goto
 
-print_lr1_tables(b, show_states=True)
 
-# Prueba de parseo
-tokens = ["c","d","d", END]
-print("OK?", p.parse(tokens))
+def check_incremental_build() -> None:
+    # reconstruir a partir de la versión anterior da las mismas tablas que desde cero
+    versions = [
+        "E -> E + T | T\nT -> T * F | F\nF -> ( E ) | id",
+        "E -> E + T | E - T | T\nT -> T * F | F\nF -> ( E ) | id",
+        "E -> E + T | E - T | T\nT -> T * F | F\nF -> ( E ) | id | - F",
+        "E -> E + T | T\nT -> T * F | F\nF -> ( E ) | id | num | F [ E ]",
+    ]
+    prev = build(versions[0], incremental=True)
+    for text in versions[1:]:
+        inc = build(text, incremental=True, base=prev)
+        assert canonical_tables(inc) == canonical_tables(build(text)), text
+        prev = inc
+    print("reconstrucción incremental igual a la completa: OK")
+
+
+def check_incremental_parse() -> None:
+    # tras cada edición, la sesión incremental coincide con reanalizar desde cero
+    p = LR1Parser(build("E -> E + T | T\nT -> T * F | F\nF -> ( E ) | id"))
+    rng = random.Random(18)
+    tokens = "id + ( id * id ) * id".split()
+    session = p.incremental(tokens)
+
+    def edit(start: int, end: int, new: list) -> bool:
+        r = session.edit(start, end, new)
+        tokens[start:end] = new
+        ok, ip, _state = p.run_ids(p.tables.symbol_ids(tokens + [END]))
+        assert session.tokens == tokens
+        assert (r.accepted, r.error_pos) == (ok, -1 if ok else ip), tokens
+        return ok
+
+    grow = [["(", "id", "+", "id", ")"], ["id", "*", "id"], ["id", "+", "id"]]
+    accepted = 0
+    for _ in range(200):
+        if rng.random() < 0.5:
+            # un id por una expresión: la entrada sigue siendo válida
+            k = rng.choice([k for k, t in enumerate(tokens) if t == "id"])
+            accepted += edit(k, k + 1, rng.choice(grow))
+        else:
+            # un token suelto (casi siempre la rompe) y luego se deshace
+            k = rng.randint(0, len(tokens))
+            edit(k, k, [rng.choice(["+", "*", "(", ")", "id"])])
+            accepted += edit(k, k + 1, [])
+    assert accepted > 100
+    print("IncrementalParse igual a run_ids tras cada edición: OK")
+
+
+def check_glr_counts() -> None:
+    # E -> E + E | a: los árboles de n operandos son el número de Catalan C(n-1)
+    g = GLRParser(build("E -> E + E | a", tolerant=True))
+    counts = [g.parse(" + ".join(["a"] * n).split()).count() for n in range(1, 6)]
+    assert counts == [1, 1, 2, 5, 14], counts
+    # con un ciclo S =>+ S hay infinitos árboles
+    assert GLRParser(build("S -> S | a", tolerant=True)).parse(["a"]).count() == -1
+    assert GLRParser(build("S -> A | a\nA -> S", tolerant=True)).parse(["a"]).count() == -1
+    print("GLR: conteos de Catalan y ciclos: OK")
+
+
+if __name__ == "__main__":
+
+    # Puedes escribir terminales con o sin comillas; el builder normaliza.
+    gramatica = Grammar()
+    gfile = "inputs/input-1.txt"
+    if not gramatica.loadFromFile(gfile):
+        print("Error al cargar la gramática.")
+
+    print("=== Gramática cargada ===")
+    gramatica.print()
+
+    primeros = First(gramatica)
+    primeros.compute()
+    print("\n=== Conjuntos First ===")
+    primeros.print()
+
+    siguientes = Follow(gramatica, primeros)
+    siguientes.compute()
+    print("\n=== Conjuntos Follow ===")
+    siguientes.print()
+
+    b = LR1Builder(gramatica, primeros.firstSets)
+    p = LR1Parser(b)
+
+    ACTION, GOTO, states = b.tables
+    print(f"\n=== Tablas LR(1): {len(states)} estados ===")
+    for (i, a), (kind, data) in sorted(ACTION.items()):
+        if kind == "reduce":
+            data = f"{data.left} → {' '.join(data.rhs) or 'ε'}"
+        print(f"ACTION[{i}, {a}] = {kind} {data if data is not None else ''}".rstrip())
+    for (i, A), j in sorted(GOTO.items()):
+        print(f"GOTO[{i}, {A}] = {j}")
+
+    # Prueba de parseo
+    tokens = ["c","d","d", END]
+    print("OK?", p.parse(tokens))
+
+    print()
+    check_parse_batch_twice()
+    check_incremental_build()
+    check_incremental_parse()
+    check_glr_counts()
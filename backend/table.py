@@ -2,14 +2,7 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from typing import Dict, List, Tuple, Set
-
-def trim(s: str) -> str:
-    return s.strip()
-
-def split(s: str, sep: str) -> List[str]:
-    if sep == ' ':
-        return [t for t in s.split(sep) if t != ""]
-    return [t.strip() for t in s.split(sep)]
+from grammar import GrammarIR
 
 
 # -------------------------
@@ -35,6 +28,8 @@ class Table:
       * También soporta epsilon explícito como terminal "''" (ver abajo)
     - ntMap / termMap: mapeos nombre -> id
     - ntsVec / tsVec: id -> nombre
+    - conflicts: celdas (no terminal, terminal) reclamadas por más de una
+      producción (la gramática no es LL(1); queda la última escrita)
     """
 
     def __init__(self, g, first, follow) -> None:
@@ -43,18 +38,33 @@ class Table:
         self.ntsVec: List[str] = []
         self.termMap: Dict[str, int] = {}
         self.tsVec: List[str] = []
+        self.conflicts: List[Tuple[str, str]] = []
+        owner: Dict[Tuple[int, int], int] = {}   # celda -> producción del IR que la escribió
+
+        def put(key: Tuple[int, int], p: int, rhs: List[Symbol]) -> None:
+            q = owner.setdefault(key, p)
+            if q != p:
+                owner[key] = p
+                cell = (self.ntsVec[key[0]], self.tsVec[key[1]])
+                if cell not in self.conflicts:
+                    self.conflicts.append(cell)
+            self.parserTable[key] = rhs
+
+        # Producciones ya tokenizadas (grammar.GrammarIR): mismos símbolos
+        # normalizados que First/Follow
+        ir = GrammarIR.of(g)
 
         # -------------------------
         # IDs para no terminales (usar orden determinista)
         # -------------------------
-        for i, nt in enumerate(sorted(g.nonTerminals)):
+        for i, nt in enumerate(sorted(ir.nonterminals)):
             self.ntMap[nt] = i
             self.ntsVec.append(nt)
 
         # -------------------------
         # IDs para terminales (orden determinista)
         # -------------------------
-        for i, t in enumerate(sorted(g.terminals)):
+        for i, t in enumerate(sorted(set(ir.terminals) | {"$"})):
             self.termMap[t] = i
             self.tsVec.append(t)
 
@@ -64,78 +74,58 @@ class Table:
             self.termMap["''"] = eid
             self.tsVec.append("''")
 
+        # Symbol de cada id del IR
+        as_symbol = [Symbol(NONTERMINAL, self.ntMap[x]) if not ir.is_terminal(i)
+                     else Symbol(TERMINAL, self.termMap[x]) for i, x in enumerate(ir.symbols)]
+
         # -------------------------
         # Construcción de la tabla
         # -------------------------
-        for ruleStr in g.rules:
-            pos = ruleStr.find("->")
-            if pos == -1:
+        for p in range(ir.n_productions):
+            lhs = ir.symbols[ir.prod_lhs[p]]
+            lhs_id = self.getNonTerminalId(lhs)
+            rhs_ids = ir.rhs_ids(p)
+
+            # --- Manejo de ε explícito ---
+            # Si la alternativa es vacía o ''/ε, rellenar con FOLLOW(lhs)
+            if not rhs_ids:
+                for term in follow.followSets.get(lhs, set()):
+                    t_id = self.getTerminalId("$" if term == "''" else term)
+                    # En la versión C++ empujan un TERMINAL "''" como RHS de la producción
+                    put((lhs_id, t_id), p, [Symbol(TERMINAL, self.termMap["''"])])
                 continue
 
-            lhs = trim(ruleStr[:pos])       # LHS (no terminal)
-            rhs = trim(ruleStr[pos + 2:])   # RHS (alternativas)
-
-            alternatives = split(rhs, '|')
-
-            for alt in alternatives:
-                alt = trim(alt)
-
-                # --- Manejo de ε explícito ---
-                # Si la alternativa es vacía o ''/ε, rellenar con FOLLOW(lhs)
-                if not alt or alt in ("''", "ε"):
-                    for term in follow.followSets.get(lhs, set()):
-                        lhs_id = self.getNonTerminalId(lhs)
-                        t_id = self.getTerminalId("$" if term == "''" else term)
-                        # En la versión C++ empujan un TERMINAL "''" como RHS de la producción
-                        self.parserTable[(lhs_id, t_id)] = [Symbol(TERMINAL, self.termMap["''"])]
-                    continue
-
-                # --- Calcular FIRST(α) y si α ⇒* ε ---
-                first_alpha: Set[str] = set()
-                can_be_epsilon = True
-                symbols = split(alt, ' ')
-
-                for s in symbols:
-                    s = trim(s)
-                    if s in g.nonTerminals:
-                        first_s = set(first.firstSets.get(s, set()))
-                    else:
-                        # terminal (implícito o explícito ya “normalizado” en Grammar)
-                        first_s = {s}
-
-                    # FIRST(α) += FIRST(s) - {ε}
-                    for f in first_s:
-                        if f != "''":
-                            first_alpha.add(f)
-
-                    # Si FIRST(s) no contiene ε, paramos la cadena anulable
-                    if "''" not in first_s:
-                        can_be_epsilon = False
-                        break
-
-                # --- Insertar producción para cada terminal de FIRST(α) ---
-                lhs_id = self.getNonTerminalId(lhs)
-                for term in first_alpha:
-                    tid = self.getTerminalId(term)
-                    # Construir RHS como lista de Symbols (NT o T)
-                    rhs_syms: List[Symbol] = []
-                    for sym in symbols:
-                        if sym in self.ntMap:
-                            rhs_syms.append(Symbol(NONTERMINAL, self.ntMap[sym]))
-                        elif sym in self.termMap:
-                            rhs_syms.append(Symbol(TERMINAL, self.termMap[sym]))
-                        else:
-                            # Si el símbolo no está en termMap pero es terminal válido,
-                            # podrías normalizar aquí (p. ej., quitar comillas si decides usarlas en gramática).
-                            # Por ahora, sólo lo añadimos si existe.
-                            pass
-                    self.parserTable[(lhs_id, tid)] = rhs_syms
-
-                # --- Si α ⇒* ε, agregar entradas con FOLLOW(LHS) y RHS = ε (lista vacía) ---
-                if can_be_epsilon:
-                    for term in follow.followSets.get(lhs, set()):
-                        tid = self.getTerminalId("$" if term == "''" else term)
-                        self.parserTable[(lhs_id, tid)] = []  # producción ε
+            # --- Calcular FIRST(α) y si α ⇒* ε ---
+            first_alpha: Set[str] = set()
+            can_be_epsilon = True
+
+            for x in rhs_ids:
+                s = ir.symbols[x]
+                if not ir.is_terminal(x):
+                    first_s = first.firstSets.get(s, set())
+                else:
+                    first_s = {s}
+
+                # FIRST(α) += FIRST(s) - {ε}
+                for f in first_s:
+                    if f != "''":
+                        first_alpha.add(f)
+
+                # Si FIRST(s) no contiene ε, paramos la cadena anulable
+                if "''" not in first_s:
+                    can_be_epsilon = False
+                    break
+
+            # --- Insertar producción para cada terminal de FIRST(α) ---
+            rhs_syms: List[Symbol] = [as_symbol[x] for x in rhs_ids]
+            for term in first_alpha:
+                put((lhs_id, self.getTerminalId(term)), p, list(rhs_syms))
+
+            # --- Si α ⇒* ε, agregar entradas con FOLLOW(LHS) y RHS = ε (lista vacía) ---
+            if can_be_epsilon:
+                for term in follow.followSets.get(lhs, set()):
+                    tid = self.getTerminalId("$" if term == "''" else term)
+                    put((lhs_id, tid), p, [])  # producción ε
 
     # -------------------------
     # Utilidades públicas
@@ -0,0 +1,140 @@
+# tree.py
+"""
+    Árbol de derivación (sintaxis concreta) guardado en un arena.
+
+    Un nodo es un entero i; sus datos viven en arreglos paralelos de int32
+    en lugar de un objeto Python por nodo (~20 bytes por nodo), así que el
+    árbol de una entrada de millones de tokens cabe en memoria y se recorre
+    o serializa sin crear objetos.
+
+        sym[i]    id de símbolo (numeración de compiled.py): terminal en las
+                  hojas, no terminal en los nodos internos
+        prod[i]   id de producción del nodo interno; -1 en las hojas
+        pos[i]    índice del primer token que cubre (en una hoja, el suyo;
+                  en un nodo ε, la posición donde se redujo)
+        first[i]  nodo interno: posición de su primer hijo en `kids`; hoja: -1
+        kids      hijos de cada nodo interno, contiguos y en orden
+                  (tantos como símbolos tiene el lado derecho de su producción)
+
+    Los nodos se crean de abajo hacia arriba (uno por shift y uno por
+    reduce), así que todo hijo tiene un id menor que su padre.
+"""
+from __future__ import annotations
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+@dataclass
+class ParseTree:
+    tables: object                          # CompiledTables o PackedTables (símbolos y producciones)
+    tokens: List[str]                       # tokens de la entrada, sin $
+    sym: array = field(default_factory=lambda: array("i"))
+    prod: array = field(default_factory=lambda: array("i"))
+    pos: array = field(default_factory=lambda: array("i"))
+    first: array = field(default_factory=lambda: array("i"))
+    kids: array = field(default_factory=lambda: array("i"))
+    root: int = -1
+
+    def __len__(self) -> int:
+        return len(self.sym)
+
+    def nbytes(self) -> int:
+        """Memoria de los arreglos del arena."""
+        return 4 * (4 * len(self.sym) + len(self.kids))
+
+    # ---------------------------------------------------------------
+    # Acceso a nodos
+    # ---------------------------------------------------------------
+    def is_leaf(self, i: int) -> bool:
+        return self.prod[i] < 0
+
+    def symbol(self, i: int) -> str:
+        return self.tables.symbols[self.sym[i]]
+
+    def text(self, i: int) -> str:
+        """Texto del token (hoja) o nombre del no terminal."""
+        return self.tokens[self.pos[i]] if self.prod[i] < 0 else self.symbol(i)
+
+    def children(self, i: int) -> array:
+        p = self.prod[i]
+        if p < 0:
+            return array("i")
+        f = self.first[i]
+        return self.kids[f:f + self.tables.prod_len[p]]
+
+    def span(self, i: int) -> Tuple[int, int]:
+        """Tokens [inicio, fin) que cubre el nodo."""
+        start = self.pos[i]
+        plen = self.tables.prod_len
+        while self.prod[i] >= 0:
+            k = plen[self.prod[i]]
+            if k == 0:
+                return start, self.pos[i]
+            i = self.kids[self.first[i] + k - 1]
+        return start, self.pos[i] + 1
+
+    def preorder(self, i: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """(nodo, profundidad) en preorden, sin recursión."""
+        plen, prod, first, kids = self.tables.prod_len, self.prod, self.first, self.kids
+        stack = [(self.root if i is None else i, 0)]
+        while stack:
+            n, d = stack.pop()
+            yield n, d
+            p = prod[n]
+            if p >= 0:
+                f = first[n]
+                for c in reversed(kids[f:f + plen[p]]):
+                    stack.append((c, d + 1))
+
+    # ---------------------------------------------------------------
+    # Serialización
+    # ---------------------------------------------------------------
+    def to_sexpr(self) -> str:
+        """(E (T (F 1))) — una línea, sin recursión."""
+        out: List[str] = []
+        plen, prod, first, kids = self.tables.prod_len, self.prod, self.first, self.kids
+        stack: List[int] = [self.root]          # -1 marca el cierre de un paréntesis
+        while stack:
+            n = stack.pop()
+            if n < 0:
+                out.append(")")
+                continue
+            if out:
+                out.append(" ")
+            p = prod[n]
+            if p < 0:
+                out.append(self.tokens[self.pos[n]])
+                continue
+            out.append("(" + self.symbol(n))
+            stack.append(-1)
+            f = first[n]
+            stack.extend(reversed(kids[f:f + plen[p]]))
+        return "".join(out)
+
+    def to_nested(self) -> Dict:
+        """{"symbol", "token"} por hoja y {"symbol", "children"} por nodo interno."""
+        plen, prod, first, kids = self.tables.prod_len, self.prod, self.first, self.kids
+        made: Dict[int, Dict] = {}
+        # los hijos tienen ids menores que el padre: basta recorrer en orden
+        for n in range(self.root + 1):
+            p = prod[n]
+            if p < 0:
+                made[n] = {"symbol": self.symbol(n), "token": self.tokens[self.pos[n]]}
+            else:
+                f = first[n]
+                made[n] = {"symbol": self.symbol(n),
+                           "children": [made.pop(c) for c in kids[f:f + plen[p]]]}
+        return made[self.root]
+
+    def to_flat(self) -> Dict:
+        """El arena tal cual (listas de enteros), para enviarlo sin anidar."""
+        return {
+            "symbols": list(self.tables.symbols),
+            "root": self.root,
+            "sym": self.sym.tolist(),
+            "prod": self.prod.tolist(),
+            "pos": self.pos.tolist(),
+            "first": self.first.tolist(),
+            "kids": self.kids.tolist(),
+        }
@@ -1,5 +1,18 @@
 const API = "http://localhost:8000";
 
+export type BuildMode = "lr1" | "lalr" | "pager";
+
+export type Conflict = {
+  state: number;
+  lookahead: string;
+  kind: "shift/reduce" | "reduce/reduce" | "accept/reduce";
+  actions: string[];
+  chosen: string;
+  resolution: "precedence" | "associativity" | "default";
+  resolved: boolean;
+  items: string[];
+};
+
 export type BuildResponse = {
   states: string[][];
   transitions: Record<string, number>;
@@ -13,27 +26,76 @@ export type BuildResponse = {
   nonTerminals: string[];
   firsts: Record<string, string[]>;
   initialSymbol: string;
+  mode: BuildMode;
+  mergeConflicts: string[];
+  conflicts: Conflict[];
 };
 
 export type ParseResponse = {
   steps: { stack: string; input: string; action: string }[];
+  accepted: boolean;
+  error: string | null;
+  tree?: ParseTreeNode | FlatParseTree | null;
+  derivations?: number | null;   // /parse?glr=true: nº de árboles (-1 = infinitos)
+};
+
+// Árbol de derivación de /parse?tree=nested (hojas con token, nodos internos con hijos)
+export type ParseTreeNode =
+  | { symbol: string; token: string }
+  | { symbol: string; children: ParseTreeNode[] };
+
+// /parse?tree=flat: el arena del backend tal cual (arreglos paralelos por nodo)
+export type FlatParseTree = {
+  symbols: string[];
+  root: number;
+  sym: number[];
+  prod: number[];
+  pos: number[];
+  first: number[];
+  kids: number[];
 };
 
-export async function buildOnServer(rules: string): Promise<BuildResponse> {
+// Líneas NDJSON de /parse/stream
+export type TraceEvent =
+  | { op: "start"; productions: { left: string; right: string[] }[] }
+  | { op: "shift"; state: number; pos: number; token: string }
+  | { op: "reduce"; state: number; pos: number; pop: number; prod: number }
+  | { op: "accept"; state: number; pos: number }
+  | { op: "error"; state: number; pos: number; token: string };
+
+export async function buildOnServer(rules: string, mode: BuildMode = "lr1", tolerant = false): Promise<BuildResponse> {
   const res = await fetch(`${API}/build`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ rules }),
+    body: JSON.stringify({ rules, mode, tolerant }),
+  });
+  if (!res.ok) throw new Error(await res.text());
+  return res.json();
+}
+
+export async function parseOnServer(input: string, rules: string, mode: BuildMode = "lr1", tolerant = false,
+                                    tree?: "nested" | "flat"): Promise<ParseResponse> {
+  const res = await fetch(tree ? `${API}/parse?tree=${tree}` : `${API}/parse`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ input, rules, mode, tolerant }),
   });
   if (!res.ok) throw new Error(await res.text());
   return res.json();
 }
 
-export async function parseOnServer(input: string, rules: string): Promise<ParseResponse> {
-  const res = await fetch(`${API}/parse`, {
+export type BatchParseResponse = {
+  results: { accepted: boolean; errorPos: number; errorToken: string | null; micros: number }[];
+  accepted: number;
+  seconds: number;
+  inputsPerSecond: number;
+};
+
+export async function parseBatchOnServer(inputs: string[], rules: string, mode: BuildMode = "lr1", tolerant = false): Promise<BatchParseResponse> {
+  const res = await fetch(`${API}/parse/batch`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ input, rules }),
+    body: JSON.stringify({ inputs, rules, mode, tolerant }),
   });
   if (!res.ok) throw new Error(await res.text());
   return res.json();
@@ -59,14 +121,15 @@ export async function downloadAutomatonPNG(grammar: string, detail: "simple" | "
 
 
 export async function fetchAutomaton(
-  _kind: "svg" | "png",               
+  kind: "svg" | "png",
   grammar: string,
-  detail: "simple" | "items" | "nfa" = "simple"
+  detail: "simple" | "items" | "cores" | "nfa" = "simple"
 ): Promise<Blob> {
+  // Grafos grandes se devuelven resumidos; la vista usada viene en X-Automaton-View
   const endpoint =
     detail === "nfa"
-      ? `${API}/automaton/nfa/png`
-      : `${API}/automaton/dfa/png?detail=${detail}`;
+      ? `${API}/automaton/nfa?format=${kind}`
+      : `${API}/automaton/dfa?detail=${detail}&format=${kind}`;
 
   const res = await fetch(endpoint, {
     method: "POST",